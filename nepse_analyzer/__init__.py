@@ -0,0 +1,16 @@
+"""
+NEPSE Analyzer package
+The modules import each other by their plain names (``from basic_app import
+NepseAnalyzer``) so they keep working as scripts run from this directory.
+Importing the package puts this directory on sys.path once, which lets
+nepse_launcher.py and ``python -m nepse_analyzer`` load the same modules
+in-process. Nothing heavy is imported here.
+"""
+
+import os
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, PACKAGE_DIR)
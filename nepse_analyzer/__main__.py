@@ -0,0 +1,52 @@
+"""
+Entry point for ``python -m nepse_analyzer``
+
+    python -m nepse_analyzer web [--profile] [--live]
+    python -m nepse_analyzer cli [analyze NABIL ... | screen ... | ...]
+    python -m nepse_analyzer benchmarks [--compare]
+    python -m nepse_analyzer service [--port 8765 | --unix PATH]
+
+Each tool is imported only when selected, so startup costs just the
+modules the chosen tool needs.
+"""
+
+import sys
+
+import nepse_analyzer  # noqa: F401  (puts the package directory on sys.path)
+
+TOOLS = {
+    'web': 'Built-in web interface (basic_app)',
+    'cli': 'Command line analysis (interactive or batch)',
+    'benchmarks': 'Benchmark suite',
+    'service': 'Resident analysis service the other tools attach to',
+}
+
+
+def main(argv=None):
+    """Dispatch to one of the bundled tools"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in TOOLS:
+        print("Usage: python -m nepse_analyzer <tool> [args...]")
+        for name, description in TOOLS.items():
+            print(f"  {name:<12} {description}")
+        return 0 if not argv or argv[0] in ('-h', '--help') else 2
+
+    tool, args = argv[0], argv[1:]
+    if tool == 'web':
+        import basic_app
+        basic_app.main(profile='--profile' in args, live='--live' in args)
+        return 0
+    if tool == 'cli':
+        import cli
+        return cli.main(args)
+    if tool == 'benchmarks':
+        import benchmarks
+        return benchmarks.main(args)
+    if tool == 'service':
+        import service
+        return service.main(args)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Alert rule engine for NEPSE
+User-defined rules such as "rsi(14) < 30 and volume > 1.5 * avg_volume" are
+screener expressions (screener.compile_expression), so a condition that
+works as a screen works as an alert and vice versa. Updates mark the
+(symbol, input) cells that changed; evaluation only revisits the symbols of
+rules with a changed input and runs each rule vectorized over them on one
+shared ScreenData, so a subexpression used by several rules is computed once.
+
+Inputs supplied through update()/update_analysis() are used as given; any
+other indicator a rule reads, e.g. rsi(7), is computed from the price
+history set with update_history().
+
+Alerts are edge-triggered (a rule fires when it becomes true for a symbol
+and re-arms once it is false again) and are delivered to pluggable sinks.
+"""
+
+import json
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+import metrics
+from screener import ANALYSIS_INDICATORS, NUMERIC_FIELDS, ScreenData, compile_expression, render
+
+# AdvancedNepseAnalyzer.analyze_stock() values update_analysis() supplies (expression -> result key)
+ANALYSIS_INPUTS = dict(ANALYSIS_INDICATORS, **{
+    'close': 'current_price',
+    'change': 'change',
+    'change_percent': 'change_percent',
+    'volume': 'volume',
+    'avg_volume(20)': 'avg_volume',
+})
+
+
+def _numeric(node) -> bool:
+    """Whether a leaf node is a numeric field or an indicator call"""
+    return node[0] == 'call' or (node[0] == 'field' and node[1] in NUMERIC_FIELDS)
+
+
+def inputs(node) -> List[tuple]:
+    """Field and indicator nodes an expression tree reads, in order"""
+    kind = node[0]
+    if kind in ('field', 'call'):
+        return [node]
+    if kind in ('neg', 'not', 'in'):
+        children = [node[1]]
+    elif kind in ('arith', 'cmp'):
+        children = [node[2], node[3]]
+    elif kind in ('and', 'or'):
+        children = node[1]
+    else:
+        children = []
+    found = []
+    for child in children:
+        for leaf in inputs(child):
+            if leaf not in found:
+                found.append(leaf)
+    return found
+
+
+def input_node(name: str) -> Optional[tuple]:
+    """Node of an update key such as 'close', 'rsi(14)' or 'sma_20'; None if it is no numeric input"""
+    try:
+        node = compile_expression(name).tree
+    except ValueError:
+        return None
+    return node if node[0] in ('field', 'call') and _numeric(node) else None
+
+
+class Rule:
+    """A named alert condition, optionally limited to some symbols"""
+
+    def __init__(self, name: str, expression: str, symbols: Optional[Iterable[str]] = None,
+                 message: Optional[str] = None):
+        self.name = name
+        self.expression = expression
+        self.compiled = compile_expression(expression)
+        if self.compiled.type != 'bool':
+            raise ValueError(f"Not a condition: {expression}")
+        self.inputs = inputs(self.compiled.tree)
+        self.symbols = None if symbols is None else [symbol.upper() for symbol in symbols]
+        self.message = message or expression
+
+    def fields(self) -> List[str]:
+        """Fields and indicators the rule reads, as expression text"""
+        return [render(node) for node in self.inputs]
+
+
+# --- Sinks -----------------------------------------------------------------
+
+class AlertSink:
+    """Destination for fired alerts"""
+
+    def notify(self, alert: Dict):
+        raise NotImplementedError
+
+
+class PrintSink(AlertSink):
+    """Print alerts to stdout"""
+
+    def notify(self, alert: Dict):
+        print(f"🔔 {alert['timestamp']} {alert['symbol']}: {alert['rule']} ({alert['message']})")
+
+
+class MemorySink(AlertSink):
+    """Keep the most recent alerts in memory"""
+
+    def __init__(self, maxlen: int = 1000):
+        self.alerts = deque(maxlen=maxlen)
+
+    def notify(self, alert: Dict):
+        self.alerts.append(alert)
+
+
+class CallbackSink(AlertSink):
+    """Hand every alert to a function"""
+
+    def __init__(self, callback: Callable[[Dict], None]):
+        self.callback = callback
+
+    def notify(self, alert: Dict):
+        self.callback(alert)
+
+
+class JsonLinesSink(AlertSink):
+    """Append alerts to a local JSON Lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def notify(self, alert: Dict):
+        with open(self.path, 'a') as handle:
+            handle.write(json.dumps(alert, default=str) + "\n")
+
+
+# --- Engine ----------------------------------------------------------------
+
+class AlertEngine:
+    """Incrementally evaluated alert rules over per-symbol indicator values"""
+
+    def __init__(self, sinks: Optional[List[AlertSink]] = None):
+        self.sinks = list(sinks or [])
+        self.rules: Dict[str, Rule] = {}
+        self.symbols: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._capacity = 16
+
+        # input node -> supplied value per row (NaN = compute from the history)
+        self._values: Dict[tuple, np.ndarray] = {}
+        # input node -> rows whose supplied value changed since the last evaluation
+        self._changed: Dict[tuple, np.ndarray] = {}
+        # Rows whose history or sector changed; every rule re-checks them
+        self._row_changed = np.zeros(self._capacity, dtype=bool)
+        self._sectors: Dict[str, str] = {}
+        self._closes: Dict[str, np.ndarray] = {}
+        self._volumes: Dict[str, np.ndarray] = {}
+        # ScreenData over the histories, rebuilt once they change
+        self._history: Optional[ScreenData] = None
+        # Rules added since the last evaluation check every symbol once
+        self._fresh = set()
+        self._active = set()
+
+    def add_sink(self, sink: AlertSink):
+        """Register another alert destination"""
+        self.sinks.append(sink)
+
+    def add_rule(self, name: str, expression: str, symbols: Optional[Iterable[str]] = None,
+                 message: Optional[str] = None) -> Rule:
+        """Add (or replace) a rule; an invalid expression raises ValueError"""
+        rule = Rule(name, expression, symbols, message)
+        self.remove_rule(name)
+        self.rules[name] = rule
+        for symbol in rule.symbols or ():
+            self._row(symbol)
+        for node in rule.inputs:
+            if _numeric(node):
+                self._input(node)
+        self._fresh.add(name)
+        return rule
+
+    def remove_rule(self, name: str):
+        """Drop a rule and its alert state"""
+        if self.rules.pop(name, None) is not None:
+            self._active = {key for key in self._active if key[0] != name}
+            self._fresh.discard(name)
+
+    def _row(self, symbol: str) -> int:
+        """Row of a symbol, adding it (and growing the value arrays) on first use"""
+        row = self._rows.get(symbol)
+        if row is not None:
+            return row
+        row = self._rows[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        if row >= self._capacity:
+            self._capacity *= 2
+            for node, values in self._values.items():
+                self._values[node] = np.concatenate([values, np.full(len(values), np.nan)])
+                self._changed[node] = np.concatenate([self._changed[node], np.zeros(len(values), dtype=bool)])
+            self._row_changed = np.concatenate([self._row_changed, np.zeros(len(self._row_changed), dtype=bool)])
+        self._row_changed[row] = True
+        self._history = None
+        return row
+
+    def _input(self, node) -> np.ndarray:
+        """Supplied values of an input node, adding the node on first use"""
+        values = self._values.get(node)
+        if values is None:
+            values = self._values[node] = np.full(self._capacity, np.nan)
+            self._changed[node] = np.zeros(self._capacity, dtype=bool)
+        return values
+
+    def update(self, symbol: str, values: Dict[str, Optional[float]]):
+        """
+        Set input values for a symbol, keyed by expression text ('close',
+        'rsi(14)', 'sma_20'); only cells that differ are marked changed
+        """
+        row = self._row(symbol.upper())
+        for name, value in values.items():
+            node = input_node(name)
+            if node is None:
+                continue
+            column = self._input(node)
+            value = np.nan if value is None else float(value)
+            old = column[row]
+            if old != value and not (np.isnan(old) and np.isnan(value)):
+                column[row] = value
+                self._changed[node][row] = True
+
+    def update_history(self, symbol: str, closes, volumes=None):
+        """Price history the inputs not supplied through update() are computed from"""
+        symbol = symbol.upper()
+        row = self._row(symbol)
+        self._closes[symbol] = np.asarray(closes, dtype=np.float64)
+        if volumes is None:
+            self._volumes.pop(symbol, None)
+        else:
+            self._volumes[symbol] = np.asarray(volumes, dtype=np.float64)
+        self._row_changed[row] = True
+        self._history = None
+
+    def update_analysis(self, analysis: Dict):
+        """Feed an AdvancedNepseAnalyzer.analyze_stock() result"""
+        if 'error' in analysis:
+            return
+        symbol = analysis['symbol'].upper()
+        row = self._row(symbol)
+        sector = analysis.get('sector')
+        if sector is not None and self._sectors.get(symbol) != sector:
+            self._sectors[symbol] = sector
+            self._row_changed[row] = True
+        self.update(symbol, {
+            expression: analysis[key] for expression, key in ANALYSIS_INPUTS.items() if key in analysis
+        })
+
+    def _screen_data(self) -> ScreenData:
+        """ScreenData for one evaluation: supplied values, the other inputs from the histories"""
+        if self._history is None:
+            closes = {symbol: self._closes.get(symbol, ()) for symbol in self.symbols}
+            volumes = {symbol: self._volumes[symbol] for symbol in self.symbols if symbol in self._volumes}
+            self._history = ScreenData.from_series(closes, volumes or None, self._sectors)
+        history = self._history
+        data = ScreenData(history.symbols, history.close, history.volume, sectors=self._sectors)
+        rows = np.arange(len(self.symbols))
+        for node, values in self._values.items():
+            values = values[:len(self.symbols)].copy()
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = history.evaluate(node, rows[missing])
+            data.set_values(render(node), values)
+        return data
+
+    def _pending(self) -> List[tuple]:
+        """(rule, rows) pairs to re-check: rows with a changed input of the rule"""
+        count = len(self.symbols)
+        pending = []
+        for rule in self.rules.values():
+            if rule.symbols is None:
+                rows = np.arange(count)
+            else:
+                rows = np.array([self._rows[symbol] for symbol in rule.symbols], dtype=np.int64)
+            if rule.name not in self._fresh:
+                touched = self._row_changed[rows].copy()
+                for node in rule.inputs:
+                    if node in self._changed:
+                        touched |= self._changed[node][rows]
+                rows = rows[touched]
+            if len(rows):
+                pending.append((rule, rows))
+
+        self._fresh.clear()
+        self._row_changed[:] = False
+        for changed in self._changed.values():
+            changed[:] = False
+        return pending
+
+    @metrics.timed('nepse_alert_eval_seconds')
+    def evaluate(self) -> List[Dict]:
+        """Re-evaluate rules touched by changes since the last call; returns new alerts"""
+        pending = self._pending()
+        if not pending:
+            return []
+        data = self._screen_data()
+
+        alerts = []
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for rule, rows in pending:
+            passed = data.evaluate(rule.compiled.tree, rows)
+            for row, holds in zip(rows, passed):
+                key = (rule.name, self.symbols[row])
+                if not holds:
+                    self._active.discard(key)
+                    continue
+                if key in self._active:
+                    continue
+                self._active.add(key)
+                alerts.append({
+                    'rule': rule.name,
+                    'symbol': key[1],
+                    'message': rule.message,
+                    'timestamp': timestamp,
+                    'values': {
+                        render(node): _reported(data.evaluate(node, np.array([row]))[0])
+                        for node in rule.inputs
+                    }
+                })
+
+        metrics.inc('nepse_alerts_total', len(alerts))
+        self._dispatch(alerts)
+        return alerts
+
+    def _dispatch(self, alerts: List[Dict]):
+        """Send alerts to every sink; a failing sink does not stop the others"""
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink.notify(alert)
+                except Exception as e:
+                    print(f"Error delivering alert to {type(sink).__name__}: {e}")
+
+    def active_alerts(self) -> List[tuple]:
+        """(rule, symbol) pairs whose condition currently holds"""
+        return sorted(self._active)
+
+
+def _reported(value):
+    """Input value as shown in an alert (None when missing)"""
+    if isinstance(value, str):
+        return value
+    return None if np.isnan(value) else round(float(value), 4)
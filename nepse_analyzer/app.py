@@ -30,7 +30,7 @@ def main():
     st.sidebar.title("Navigation")
     page = st.sidebar.selectbox(
         "Choose a page",
-        ["Live Charts", "Technical Analysis", "Stock Screener", "Portfolio Tracker"]
+        ["Live Charts", "Technical Analysis", "Stock Screener", "Sector Rotation", "Portfolio Tracker"]
     )
     
     if page == "Live Charts":
@@ -39,9 +39,19 @@ def main():
         show_technical_analysis()
     elif page == "Stock Screener":
         show_stock_screener()
+    elif page == "Sector Rotation":
+        show_sector_rotation()
     elif page == "Portfolio Tracker":
         show_portfolio_tracker()
 
+@st.cache_resource
+def get_live_feed():
+    """One live market feed per Streamlit server, shared by every session: (latest quotes, order books)"""
+    from basic_app import start_live_feed
+    from market_depth import DepthStore
+    depth = DepthStore()
+    return start_live_feed(depth=depth), depth
+
 def show_live_charts():
     st.header("📊 Live Stock Charts")
     
@@ -56,9 +66,14 @@ def show_live_charts():
     # Generate sample data for demonstration
     sample_data = generate_sample_stock_data(selected_symbol)
     
-    # Display current price
+    # Display current price (the live feed's last traded price when it has one)
     current_price = sample_data['Close'].iloc[-1]
     prev_price = sample_data['Close'].iloc[-2]
+    live_quotes, depth = get_live_feed()
+    quote = live_quotes.get('quote', selected_symbol)
+    if quote is not None and quote.get('change') is not None:
+        current_price = quote['price']
+        prev_price = current_price - quote['change']
     change = current_price - prev_price
     change_percent = (change / prev_price) * 100
     
@@ -72,6 +87,19 @@ def show_live_charts():
     with col4:
         st.metric("Low", f"Rs. {sample_data['Low'].iloc[-1]:.2f}")
     
+    # Order book from the live feed's depth polls
+    book = depth.summary(selected_symbol)
+    if book is not None and book['best_bid'] is not None and book['best_ask'] is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Best Bid", f"Rs. {book['best_bid']:.2f}", f"{book['bid_depth']:,.0f} shares")
+        with col2:
+            st.metric("Best Ask", f"Rs. {book['best_ask']:.2f}", f"{book['ask_depth']:,.0f} shares")
+        with col3:
+            st.metric("Spread", f"{book['spread_bps']:.0f} bps")
+        with col4:
+            st.metric("Order Imbalance", f"{book['imbalance_ema']:+.2f}")
+    
     # Candlestick chart
     fig = create_candlestick_chart(sample_data, selected_symbol)
     st.plotly_chart(fig, use_container_width=True)
@@ -94,6 +122,35 @@ def show_stock_screener():
     st.header("🔎 Stock Screener")
     st.info("Stock screening and filtering tools will be implemented here.")
 
+@st.cache_data(ttl=300)
+def get_sector_analytics():
+    """Sector rotation table, relative strength and monthly heatmap from the analyzer"""
+    from cli import AdvancedNepseAnalyzer
+    analytics = AdvancedNepseAnalyzer().get_sector_analytics()
+    return analytics.rotation_table(), analytics.relative_strength(20), analytics.rotation_heatmap()
+
+def show_sector_rotation():
+    st.header("🔄 Sector Rotation")
+    st.warning("⚠️ Currently displaying sample data. Real NEPSE API integration in progress.")
+    
+    rotation, strength, heatmap = get_sector_analytics()
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Returns by Sector (%)")
+        st.dataframe(rotation, use_container_width=True)
+    with col2:
+        st.subheader("Relative Strength vs Market (20d, %)")
+        fig = px.bar(strength, orientation='h', labels={'value': '%', 'sector': ''})
+        fig.update_layout(template="plotly_dark", showlegend=False)
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.subheader("Monthly Sector Returns (%)")
+    heatmap = heatmap.rename(columns=lambda period: period.strftime('%b %Y'))
+    fig = px.imshow(heatmap, color_continuous_scale='RdYlGn', color_continuous_midpoint=0, aspect='auto')
+    fig.update_layout(template="plotly_dark")
+    st.plotly_chart(fig, use_container_width=True)
+
 def show_portfolio_tracker():
     st.header("💼 Portfolio Tracker")
     st.info("Portfolio tracking and performance analysis will be implemented here.")
@@ -13,18 +13,29 @@ import time
 from datetime import datetime, timedelta
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import html
+import logging
 import os
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+import profiling
+from market_breadth import MarketBreadth, default_indices
+from rankings import MarketRankings
+from symbol_master import SymbolMaster
+
+logger = logging.getLogger(__name__)
 
 class NepseAnalyzer:
     """Basic NEPSE analyzer using built-in libraries"""
     
-    def __init__(self):
-        self.stocks = [
-            "NABIL", "SCB", "EBL", "BOKL", "NICA", "PRVU", 
-            "GBIME", "CBL", "SANIMA", "MBL", "KBL", "ADBL"
-        ]
+    def __init__(self, symbol_master=None):
+        self.symbol_master = symbol_master or SymbolMaster.default()
+        self.stocks = self.symbol_master.symbols()
         self.current_data = {}
         self.historical_data = {}
+        self.market = None
+        self.rankings = None
         
     def generate_sample_data(self, symbol, days=30):
         """Generate sample stock data for demonstration"""
@@ -92,34 +103,61 @@ class NepseAnalyzer:
         
         return round(rsi, 2)
     
+    def get_market(self):
+        """Get the breadth engine and NEPSE/float indices, seeding them from sample data on first use"""
+        if self.market is None:
+            self.market = MarketBreadth(sma_period=20, indices=default_indices(self.symbol_master))
+            self.market.seed({symbol: self.generate_sample_data(symbol, 30)['prices'] for symbol in self.stocks})
+        return self.market
+    
+    def get_market_indices(self):
+        """NEPSE, sensitive and float index values in the NepseDataFetcher.get_market_indices format"""
+        return self.get_market().index_values()
+    
+    def get_rankings(self):
+        """Get the maintained top-N rankings, seeding them from sample data on first use"""
+        if self.rankings is None:
+            self.rankings = MarketRankings(momentum_period=5)
+            for symbol in self.stocks:
+                data = self.generate_sample_data(symbol, 30)
+                self.rankings.load_history(symbol, data['prices'][:-1])
+                self.rankings.update({'symbol': symbol, 'price': data['prices'][-1],
+                                      'volume': data['volumes'][-1]})
+        return self.rankings
+    
+    def get_sector(self, symbol):
+        """Get the sector of a symbol from the symbol master"""
+        return self.symbol_master.sector_of(symbol)
+    
+    def update_price(self, symbol, price):
+        """Feed a new last-traded price into the market breadth engine and rankings"""
+        self.get_market().update(symbol, price)
+        self.get_rankings().update_price(symbol, price)
+    
+    def get_symbol_list(self):
+        """Symbol master entries for every tracked symbol"""
+        return [self.symbol_master.get(symbol).to_dict() for symbol in self.stocks]
+    
     def get_market_summary(self):
         """Get market summary data"""
+        breadth = self.get_market().breadth()
         summary = {
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'market_status': 'OPEN' if 10 <= datetime.now().hour <= 15 else 'CLOSED',
-            'total_stocks': len(self.stocks),
-            'advancing': 0,
-            'declining': 0,
-            'unchanged': 0
+            'total_stocks': len(self.stocks)
         }
-        
-        for symbol in self.stocks:
-            data = self.generate_sample_data(symbol, 2)
-            if data['change'] > 0:
-                summary['advancing'] += 1
-            elif data['change'] < 0:
-                summary['declining'] += 1
-            else:
-                summary['unchanged'] += 1
-        
+        summary.update(breadth)
         return summary
 
 class WebInterface:
     """Simple web interface for the NEPSE analyzer"""
     
-    def __init__(self, analyzer):
+    def __init__(self, analyzer, live=None):
         self.analyzer = analyzer
+        # Optional events.LatestValues fed by a market feed
+        self.live = live
     
+    @metrics.timed('nepse_render_seconds')
     def generate_html(self):
         """Generate HTML for the web interface"""
         summary = self.analyzer.get_market_summary()
@@ -265,7 +303,7 @@ class WebInterface:
         
         window.onload = function() {{
             // Draw charts for all stocks
-            const stockData = {json.dumps({symbol: analyzer.generate_sample_data(symbol, 10) for symbol in analyzer.stocks[:6]})};
+            const stockData = {json.dumps({symbol: self.analyzer.generate_sample_data(symbol, 10) for symbol in self.analyzer.stocks[:6]})};
             
             for (const symbol in stockData) {{
                 const data = stockData[symbol];
@@ -309,6 +347,10 @@ class WebInterface:
         # Generate stock cards
         for symbol in self.analyzer.stocks[:6]:  # Show top 6 stocks
             data = self.analyzer.generate_sample_data(symbol, 10)
+            quote = self.live.get('quote', symbol) if self.live is not None else None
+            if quote is not None:
+                # Last traded price from the live feed instead of the sample's
+                data = dict(data, current_price=quote['price'], change=quote.get('change') or 0)
             change_class = 'positive' if data['change'] > 0 else 'negative' if data['change'] < 0 else 'neutral'
             change_symbol = '↗' if data['change'] > 0 else '↘' if data['change'] < 0 else '→'
             
@@ -371,42 +413,122 @@ class WebInterface:
 class RequestHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the web server"""
     
-    def __init__(self, analyzer, *args, **kwargs):
+    def __init__(self, analyzer, *args, live=None, **kwargs):
         self.analyzer = analyzer
+        self.live = live
         super().__init__(*args, **kwargs)
     
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/' or self.path == '/index.html':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            
-            interface = WebInterface(self.analyzer)
-            html_content = interface.generate_html()
-            self.wfile.write(html_content.encode())
+        url = urlsplit(self.path)
+        path = url.path
+        profile_request = parse_qs(url.query).get('profile', ['0'])[0] in ('1', 'true', 'yes')
+        start = time.perf_counter()
+        
+        if path == '/' or path == '/index.html':
+            endpoint = '/'
+            with profiling.maybe_profile('http-index', force=profile_request) as profile:
+                interface = WebInterface(self.analyzer, self.live)
+                html_content = interface.generate_html()
+            extra_headers = {}
+            if 'result' in profile:
+                extra_headers['X-Profile-Output'] = profile['result'].files.get('collapsed', '')
+            status = self._send(200, 'text/html', html_content.encode(), extra_headers)
+        elif path == '/rankings':
+            endpoint = '/rankings'
+            try:
+                k = int(parse_qs(url.query).get('k', ['10'])[0])
+            except ValueError:
+                k = 10
+            body = json.dumps(self.analyzer.get_rankings().snapshot(k)).encode()
+            status = self._send(200, 'application/json', body)
+        elif path == '/metrics':
+            endpoint = '/metrics'
+            if metrics.is_enabled():
+                body = metrics.METRICS.render_prometheus().encode()
+                status = self._send(200, 'text/plain; version=0.0.4', body)
+            else:
+                status = self._send(404, 'text/plain', b'Metrics disabled (set NEPSE_METRICS=1)')
         else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b'404 Not Found')
+            endpoint = 'other'
+            status = self._send(404, 'text/plain', b'404 Not Found')
+        
+        metrics.observe('nepse_http_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+        metrics.inc('nepse_http_requests_total', endpoint=endpoint, status=status)
+    
+    def _send(self, status, content_type, body, extra_headers=None):
+        """Write a complete response and return its status code"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
     
     def log_message(self, format, *args):
-        """Suppress log messages"""
-        pass
+        """Route access logs to the logging module (silent unless configured)"""
+        logger.debug("%s - %s", self.address_string(), format % args)
 
-def create_request_handler(analyzer):
+def create_request_handler(analyzer, live=None):
     """Create a request handler with the analyzer instance"""
     def handler(*args, **kwargs):
-        return RequestHandler(analyzer, *args, **kwargs)
+        return RequestHandler(analyzer, *args, live=live, **kwargs)
     return handler
 
-def main():
+def start_live_feed(interval=5.0, rankings=None, depth=None, scrape=False):
+    """
+    Poll live market data on a background thread; returns the latest quotes view
+    Quotes also update `rankings` (a MarketRankings) when given, and with
+    `depth` (a market_depth.DepthStore) every listed symbol's order book is polled into it.
+    With scrape the quotes come from the live-market page (scraper.LiveMarketScraper),
+    and only the rows that changed since the last poll are published.
+    """
+    from data_fetcher import NepseDataFetcher
+    from events import EventBus, LatestValues, MarketFeed
+    
+    bus = EventBus()
+    live = LatestValues(bus, topics=('quote',))
+    if rankings is not None:
+        rankings.attach(bus)
+    scraper = None
+    if scrape:
+        from scraper import LiveMarketScraper
+        scraper = LiveMarketScraper()
+    fetcher = NepseDataFetcher(bus=bus, scraper=scraper)
+    depth_symbols = ()
+    if depth is not None:
+        depth.attach(bus)
+        depth_symbols = fetcher.symbol_master.symbols()
+    MarketFeed(fetcher, interval=interval, depth_symbols=depth_symbols).start()
+    return live
+
+def main(profile=False, live=False, scrape=False):
     """Main function to run the NEPSE analyzer"""
+    if profile:
+        profiling.enable()
+    
     print("🏛️ Nepal Stock Exchange (NEPSE) Real-time Analysis")
     print("=" * 50)
     
-    # Initialize the analyzer
-    analyzer = NepseAnalyzer()
+    # Initialize the analyzer, attaching to a running analysis service if configured
+    analyzer = None
+    service_url = os.environ.get('NEPSE_SERVICE_URL')
+    if service_url:
+        from service import connect
+        analyzer = connect(service_url)
+        if analyzer is None:
+            print(f"⚠️  No analysis service at {service_url}; using local data")
+        else:
+            print(f"🛰️  Attached to analysis service at {service_url}")
+    analyzer = analyzer or NepseAnalyzer()
+    
+    live_quotes = None
+    if live or scrape:
+        depth = analyzer.get_depth() if hasattr(analyzer, 'get_depth') else None
+        live_quotes = start_live_feed(rankings=analyzer.get_rankings(), depth=depth, scrape=scrape)
+        print("📡 Live market feed started" + (" (scraping the live-market page)" if scrape else ""))
     
     # Print some sample data
     print("\\nMarket Summary:")
@@ -422,15 +544,22 @@ def main():
     # Start web server
     print("\\n🌐 Starting web server...")
     print("Open http://localhost:8080 in your browser to view the interface")
+    if metrics.is_enabled():
+        print("Metrics available at http://localhost:8080/metrics")
+    print("Top-N rankings at http://localhost:8080/rankings")
+    if profiling.is_enabled():
+        print(f"Profiling every request into {profiling.output_dir()}/")
+    else:
+        print("Add ?profile=1 to a URL to profile a single request")
     print("Press Ctrl+C to stop the server")
     
     try:
         server_address = ('', 8080)
-        handler_class = create_request_handler(analyzer)
+        handler_class = create_request_handler(analyzer, live_quotes)
         httpd = HTTPServer(server_address, handler_class)
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("\\n\\n✅ Server stopped. Thank you for using NEPSE Real-time Analysis!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(profile='--profile' in sys.argv[1:], live='--live' in sys.argv[1:], scrape='--scrape' in sys.argv[1:])
\ No newline at end of file
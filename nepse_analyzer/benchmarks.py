@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+NEPSE Analyzer Benchmark Suite
+Times the hot paths of the analyzer on seeded synthetic markets and
+compares the results against a stored baseline
+
+Usage:
+    python benchmarks.py                       # run everything
+    python benchmarks.py --filter technical    # only matching benchmarks
+    python benchmarks.py --sizes 30d,1y --universes 12
+    python benchmarks.py --save-baseline       # record current timings
+    python benchmarks.py --compare             # fail on regressions
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+SEED = 42
+SIZES = {'30d': 30, '1y': 252, '10y': 2520}
+UNIVERSES = {'12': 12, '250': 250}
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+BENCHMARKS = []
+
+
+def benchmark(name, requires=()):
+    """Register a benchmark; `requires` lists optional modules it needs"""
+    def decorator(func):
+        BENCHMARKS.append({'name': name, 'func': func, 'requires': requires})
+        return func
+    return decorator
+
+
+class SyntheticMarket:
+    """Seeded random-walk OHLCV data for a universe of symbols"""
+
+    def __init__(self, days, symbol_count, seed=SEED):
+        rng = random.Random(seed)
+        self.days = days
+        self.symbols = [f"SYM{i:03d}" for i in range(symbol_count)]
+        start = datetime(2015, 1, 1)
+        self.dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        self.bars = {}
+        for symbol in self.symbols:
+            price = rng.uniform(200, 1200)
+            opens, highs, lows, closes, volumes = [], [], [], [], []
+            for _ in range(days):
+                open_price = price
+                price = max(price * (1 + rng.gauss(0.0005, 0.02)), 1)
+                opens.append(round(open_price, 2))
+                highs.append(round(max(open_price, price) * rng.uniform(1.0, 1.02), 2))
+                lows.append(round(min(open_price, price) * rng.uniform(0.98, 1.0), 2))
+                closes.append(round(price, 2))
+                volumes.append(rng.randint(1000, 50000))
+            self.bars[symbol] = {
+                'open': opens, 'high': highs, 'low': lows, 'close': closes, 'volume': volumes
+            }
+        self._frames = None
+
+    def frames(self):
+        """Per-symbol DataFrames in the TechnicalAnalysis column layout"""
+        if self._frames is None:
+            import pandas as pd
+            index = pd.to_datetime(self.dates)
+            self._frames = {
+                symbol: pd.DataFrame({
+                    'Open': bars['open'],
+                    'High': bars['high'],
+                    'Low': bars['low'],
+                    'Close': bars['close'],
+                    'Volume': bars['volume']
+                }, index=index)
+                for symbol, bars in self.bars.items()
+            }
+        return self._frames
+
+    def sample_data(self, symbol, days):
+        """Replacement for NepseAnalyzer.generate_sample_data backed by the market"""
+        closes = self.bars[symbol]['close'][-days:]
+        return {
+            'symbol': symbol,
+            'dates': self.dates[-days:],
+            'prices': closes,
+            'volumes': self.bars[symbol]['volume'][-days:],
+            'current_price': closes[-1],
+            'change': round(closes[-1] - closes[-2], 2) if len(closes) > 1 else 0
+        }
+
+
+def make_analyzer(market, cls=None):
+    """Analyzer whose universe and sample data come from the synthetic market"""
+    if cls is None:
+        from cli import AdvancedNepseAnalyzer as cls
+    analyzer = cls()
+    analyzer.stocks = list(market.symbols)
+    analyzer.generate_sample_data = lambda symbol, days=30: market.sample_data(symbol, min(days, market.days))
+    return analyzer
+
+
+# --- NepseAnalyzer (built-in) -------------------------------------------
+
+@benchmark('basic.calculate_sma')
+def bench_basic_sma(market):
+    from basic_app import NepseAnalyzer
+    analyzer = NepseAnalyzer()
+    prices = [market.bars[symbol]['close'] for symbol in market.symbols]
+    return lambda: [analyzer.calculate_sma(p, 20) for p in prices]
+
+
+@benchmark('basic.calculate_rsi')
+def bench_basic_rsi(market):
+    from basic_app import NepseAnalyzer
+    analyzer = NepseAnalyzer()
+    prices = [market.bars[symbol]['close'] for symbol in market.symbols]
+    return lambda: [analyzer.calculate_rsi(p, 14) for p in prices]
+
+
+@benchmark('cli.screen_stocks')
+def bench_screen_stocks(market):
+    analyzer = make_analyzer(market)
+    return lambda: analyzer.screen_stocks({'max_rsi': 50})
+
+
+@benchmark('cli.get_portfolio_performance')
+def bench_portfolio(market):
+    analyzer = make_analyzer(market)
+    for symbol in market.symbols:
+        analyzer.add_to_portfolio(symbol, 100, market.bars[symbol]['close'][0])
+    return analyzer.get_portfolio_performance
+
+
+@benchmark('web.generate_html')
+def bench_generate_html(market):
+    from basic_app import NepseAnalyzer, WebInterface
+    analyzer = make_analyzer(market, NepseAnalyzer)
+    interface = WebInterface(analyzer)
+    return interface.generate_html
+
+
+# --- TechnicalAnalysis / PatternRecognition (pandas + ta) ----------------
+
+TECHNICAL_METHODS = [
+    ('calculate_sma', ()),
+    ('calculate_ema', ()),
+    ('calculate_rsi', ()),
+    ('calculate_macd', ()),
+    ('calculate_bollinger_bands', ()),
+    ('calculate_stochastic', ()),
+    ('calculate_atr', ()),
+    ('calculate_volume_indicators', ()),
+    ('identify_support_resistance', ()),
+    ('calculate_trend_direction', ()),
+    ('generate_trading_signals', ()),
+    ('calculate_volatility', ()),
+]
+
+PATTERN_METHODS = ['identify_doji', 'identify_hammer', 'identify_engulfing_patterns']
+
+# Methods with a native NumPy and a ta implementation, benchmarked on both
+TA_METHODS = ['calculate_rsi', 'calculate_macd', 'calculate_bollinger_bands', 'calculate_stochastic',
+              'calculate_atr']
+
+
+def _register_technical(method, args, backend='numpy'):
+    """Register one TechnicalAnalysis method benchmark"""
+    prefix, requires = ('technical', ('pandas',)) if backend == 'numpy' else ('technical_ta', ('pandas', 'ta'))
+
+    @benchmark(f'{prefix}.{method}', requires=requires)
+    def bench(market):
+        from technical_analysis import TechnicalAnalysis
+        analyses = [TechnicalAnalysis(frame, backend=backend) for frame in market.frames().values()]
+        return lambda: [getattr(analysis, method)(*args) for analysis in analyses]
+
+
+def _register_pattern(method):
+    """Register one PatternRecognition method benchmark"""
+    @benchmark(f'patterns.{method}', requires=('pandas', 'ta'))
+    def bench(market):
+        from technical_analysis import PatternRecognition
+        recognizers = [PatternRecognition(frame) for frame in market.frames().values()]
+        return lambda: [getattr(recognizer, method)() for recognizer in recognizers]
+
+
+for _method, _args in TECHNICAL_METHODS:
+    _register_technical(_method, _args)
+for _method in TA_METHODS:
+    _register_technical(_method, (), backend='ta')
+_register_technical('calculate_all', ())
+for _method in PATTERN_METHODS:
+    _register_pattern(_method)
+
+
+# --- Recursive indicator kernels on a (symbol x time) matrix --------------
+
+def _register_kernels(backend):
+    """Register the whole-market EMA/RSI/ATR benchmark of one kernel backend"""
+    @benchmark(f'kernels.{backend}', requires=('numba',) if backend == 'numba' else ('numpy',))
+    def bench(market):
+        import numpy as np
+        import indicators
+        import kernels
+        high, low, close = (np.array([market.bars[symbol][field] for symbol in market.symbols], dtype=np.float64)
+                            for field in ('high', 'low', 'close'))
+        previous = kernels.BACKEND
+
+        def run():
+            kernels.set_backend(backend)
+            try:
+                return indicators.ema(close, 20), indicators.rsi(close), indicators.atr(high, low, close)
+            finally:
+                kernels.set_backend(previous)
+        return run
+
+
+for _backend in ('numpy', 'numba'):
+    _register_kernels(_backend)
+
+
+# --- Screener expressions ------------------------------------------------------
+
+SCREEN_EXPRESSION = 'rsi(14) < 40 and close > sma(50) or macd > macd_signal and volume > avg_volume(20)'
+
+
+@benchmark('screener.select', requires=('pandas',))
+def bench_screener_select(market):
+    from screener import ScreenData, Screener
+    frames = market.frames()
+    # Fresh data every round, so nothing is served from the node or result caches
+    return lambda: Screener(ScreenData.from_frames(frames)).select(SCREEN_EXPRESSION)
+
+
+@benchmark('screener.cached', requires=('pandas',))
+def bench_screener_cached(market):
+    from screener import ScreenData, Screener
+    screener = Screener(ScreenData.from_frames(market.frames()))
+    return lambda: screener.select(SCREEN_EXPRESSION)
+
+
+# --- End-of-day refresh ---------------------------------------------------
+
+@benchmark('eod.refresh', requires=('pandas', 'ta'))
+def bench_eod_refresh(market):
+    from eod_refresh import EODRefresh
+    frames = market.frames()
+    engine = EODRefresh()
+    return lambda: engine.run(frames)
+
+
+# --- Market rankings ------------------------------------------------------
+
+@benchmark('rankings.update')
+def bench_rankings_update(market):
+    from rankings import MarketRankings
+    rankings = MarketRankings()
+    for symbol in market.symbols:
+        rankings.load_history(symbol, market.bars[symbol]['close'][:-1])
+    # Two sessions of quotes, alternated so every update moves the symbol
+    quotes = [{'symbol': symbol, 'price': market.bars[symbol]['close'][day],
+               'volume': market.bars[symbol]['volume'][day]}
+              for day in (-1, -2) for symbol in market.symbols]
+    def run():
+        for quote in quotes:
+            rankings.update(quote)
+    return run
+
+
+@benchmark('rankings.snapshot')
+def bench_rankings_snapshot(market):
+    from rankings import MarketRankings
+    rankings = MarketRankings()
+    for symbol in market.symbols:
+        rankings.load_history(symbol, market.bars[symbol]['close'][:-1])
+        rankings.update({'symbol': symbol, 'price': market.bars[symbol]['close'][-1],
+                         'volume': market.bars[symbol]['volume'][-1]})
+    return lambda: rankings.snapshot(10)
+
+
+# --- Market depth ---------------------------------------------------------
+
+@benchmark('depth.update_many', requires=('numpy',))
+def bench_depth_update(market):
+    from market_depth import DepthStore
+    rng = random.Random(SEED)
+    store = DepthStore()
+    # One five-level snapshot per symbol around its last close
+    snapshots = []
+    for symbol in market.symbols:
+        close = market.bars[symbol]['close'][-1]
+        snapshots.append({
+            'symbol': symbol,
+            'bids': [(close - i * 0.1, rng.randint(10, 2000)) for i in range(1, 6)],
+            'asks': [(close + i * 0.1, rng.randint(10, 2000)) for i in range(1, 6)],
+        })
+    return lambda: store.update_many(snapshots)
+
+
+# --- Runner ----------------------------------------------------------------
+
+def module_available(name):
+    """True if an optional dependency can be imported"""
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def time_call(func, repeat, min_time=0.2):
+    """Median and best wall time of func over `repeat` rounds"""
+    func()  # warm-up
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < repeat or (time.perf_counter() < deadline and len(timings) < repeat * 10):
+        random.seed(SEED)
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'median': statistics.median(timings), 'min': min(timings), 'rounds': len(timings)}
+
+
+def run(name_filter=None, sizes=None, universes=None, repeat=5):
+    """Run the selected benchmarks and return {case_name: timing}"""
+    results = {}
+    missing = {}
+    for size_name in sizes or SIZES:
+        for universe_name in universes or UNIVERSES:
+            market = SyntheticMarket(SIZES[size_name], UNIVERSES[universe_name])
+            for bench in BENCHMARKS:
+                if name_filter and name_filter not in bench['name']:
+                    continue
+                unavailable = [dep for dep in bench['requires'] if not module_available(dep)]
+                if unavailable:
+                    missing[bench['name']] = unavailable
+                    continue
+
+                case = f"{bench['name']}[{size_name}x{universe_name}]"
+                random.seed(SEED)
+                timing = time_call(bench['func'](market), repeat)
+                results[case] = timing
+                print(f"  {case:<60} {timing['median'] * 1000:10.3f} ms  (min {timing['min'] * 1000:.3f} ms)")
+
+    for name, deps in missing.items():
+        print(f"  ⚠️  skipped {name}: missing {', '.join(deps)}")
+    return results
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Load stored baseline timings"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as handle:
+        return json.load(handle).get('results', {})
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """Store timings as the new baseline, merged with existing cases"""
+    baseline = load_baseline(path)
+    baseline.update(results)
+    with open(path, 'w') as handle:
+        json.dump({
+            'recorded': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': baseline
+        }, handle, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison and return the list of regressed cases"""
+    regressions = []
+    for case, timing in sorted(results.items()):
+        reference = baseline.get(case)
+        if not reference:
+            continue
+        # Best-of-N is far less sensitive to scheduler noise than the median
+        ratio = timing['min'] / reference['min']
+        marker = "❌" if ratio > 1 + tolerance else "✅" if ratio < 1 - tolerance else "  "
+        print(f"  {marker} {case:<60} {ratio:6.2f}x")
+        if ratio > 1 + tolerance:
+            regressions.append(case)
+    return regressions
+
+
+def main(argv=None):
+    """Benchmark command line entry point"""
+    parser = argparse.ArgumentParser(description="NEPSE analyzer benchmarks")
+    parser.add_argument('--filter', help="only run benchmarks whose name contains this text")
+    parser.add_argument('--sizes', default=','.join(SIZES), help="comma separated: " + ','.join(SIZES))
+    parser.add_argument('--universes', default=','.join(UNIVERSES), help="comma separated: " + ','.join(UNIVERSES))
+    parser.add_argument('--repeat', type=int, default=5, help="timed rounds per case")
+    parser.add_argument('--save-baseline', action='store_true', help="store results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="compare with the baseline and fail on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline file path")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    universes = [universe.strip() for universe in args.universes.split(',') if universe.strip()]
+    for value, valid in [(sizes, SIZES), (universes, UNIVERSES)]:
+        unknown = set(value) - set(valid)
+        if unknown:
+            parser.error(f"unknown choice(s): {', '.join(sorted(unknown))}")
+
+    baseline = load_baseline(args.baseline) if args.compare and not args.save_baseline else None
+    if baseline == {}:
+        # Fail before the (slow) run instead of after it
+        print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+        return 1
+
+    print("🏁 NEPSE Analyzer Benchmarks")
+    print("=" * 60)
+    results = run(args.filter, sizes, universes, args.repeat)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if baseline is None:
+            baseline = load_baseline(args.baseline)
+        print(f"\n📊 Comparison with baseline (tolerance {args.tolerance:.0%})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) detected")
+            return 1
+        print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""
+Bulk import/export of historical NEPSE data
+Streams large CSV archives in chunks and stores them as partitioned
+Parquet/Arrow datasets (one partition per symbol and year)
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from metrics import cache_hit, cache_miss
+
+PRICE_COLUMNS = ['symbol', 'date', 'open', 'high', 'low', 'close', 'volume']
+FLOORSHEET_COLUMNS = ['contract_no', 'symbol', 'buyer', 'seller', 'quantity', 'rate', 'amount', 'date']
+
+PRICE_DTYPES = {
+    'symbol': 'string',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'int64'
+}
+
+FLOORSHEET_DTYPES = {
+    'contract_no': 'int64',
+    'symbol': 'string',
+    'buyer': 'int32',
+    'seller': 'int32',
+    'quantity': 'int64',
+    'rate': 'float64',
+    'amount': 'float64'
+}
+
+
+def validate_price_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Drop rows that cannot be valid OHLCV bars"""
+    chunk = chunk.dropna(subset=PRICE_COLUMNS)
+    valid = (
+        (chunk['low'] > 0) &
+        (chunk['high'] >= chunk['low']) &
+        (chunk['close'] >= chunk['low']) & (chunk['close'] <= chunk['high']) &
+        (chunk['open'] >= chunk['low']) & (chunk['open'] <= chunk['high']) &
+        (chunk['volume'] >= 0)
+    )
+    return chunk[valid]
+
+
+def validate_floorsheet_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Drop trades with missing fields or non-positive quantity/rate"""
+    chunk = chunk.dropna(subset=FLOORSHEET_COLUMNS)
+    valid = (chunk['quantity'] > 0) & (chunk['rate'] > 0)
+    return chunk[valid]
+
+
+class BulkImporter:
+    """Stream CSV archives into a partitioned columnar dataset"""
+
+    def __init__(self, root_dir: str, chunksize: int = 250_000, file_format: str = 'parquet'):
+        """
+        root_dir: directory that will hold the 'prices' and 'floorsheet' datasets
+        file_format: 'parquet' for compact storage or 'ipc' (Arrow/Feather)
+                     for memory-mappable, zero-copy reads
+        """
+        if file_format not in ('parquet', 'ipc'):
+            raise ValueError(f"Unsupported format: {file_format}")
+        self.root_dir = root_dir
+        self.chunksize = chunksize
+        self.file_format = file_format
+
+    def import_price_csv(self, csv_path: str) -> Dict[str, int]:
+        """Import a price-history CSV dump (symbol, date, OHLCV)"""
+        return self._import_csv(
+            csv_path, 'prices', PRICE_COLUMNS, PRICE_DTYPES, validate_price_chunk
+        )
+
+    def import_floorsheet_csv(self, csv_path: str) -> Dict[str, int]:
+        """Import a floorsheet CSV dump (one row per trade)"""
+        return self._import_csv(
+            csv_path, 'floorsheet', FLOORSHEET_COLUMNS, FLOORSHEET_DTYPES, validate_floorsheet_chunk
+        )
+
+    def _import_csv(self, csv_path, dataset_name, columns, dtypes, validator) -> Dict[str, int]:
+        """Read, validate and write one chunk at a time"""
+        stats = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0, 'chunks': 0}
+        target = os.path.join(self.root_dir, dataset_name)
+        base = os.path.splitext(os.path.basename(csv_path))[0]
+
+        reader = pd.read_csv(
+            csv_path,
+            usecols=columns,
+            dtype=dtypes,
+            parse_dates=['date'],
+            chunksize=self.chunksize
+        )
+        for chunk_no, chunk in enumerate(reader):
+            rows = len(chunk)
+            chunk['symbol'] = chunk['symbol'].str.strip().str.upper()
+            chunk = validator(chunk)
+            stats['rows_read'] += rows
+            stats['rows_rejected'] += rows - len(chunk)
+            if chunk.empty:
+                continue
+
+            chunk = chunk.assign(year=chunk['date'].dt.year.astype('int16'))
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            ds.write_dataset(
+                table,
+                target,
+                format=self.file_format,
+                partitioning=['symbol', 'year'],
+                partitioning_flavor='hive',
+                basename_template=f"{base}-{chunk_no:05d}-{{i}}.{self.file_format}",
+                existing_data_behavior='overwrite_or_ignore'
+            )
+            stats['rows_written'] += len(chunk)
+            stats['chunks'] += 1
+
+        return stats
+
+
+class ArchiveReader:
+    """Read symbol histories back from a dataset written by BulkImporter"""
+
+    def __init__(self, root_dir: str, file_format: str = 'parquet'):
+        self.root_dir = root_dir
+        self.file_format = file_format
+        self._datasets = {}
+
+    def _dataset(self, name: str) -> ds.Dataset:
+        """Open (and cache) a partitioned dataset"""
+        if name in self._datasets:
+            cache_hit('archive_dataset')
+        else:
+            cache_miss('archive_dataset')
+            self._datasets[name] = ds.dataset(
+                os.path.join(self.root_dir, name),
+                format=self.file_format,
+                partitioning='hive'
+            )
+        return self._datasets[name]
+
+    def symbols(self) -> List[str]:
+        """List symbols present in the price archive"""
+        path = os.path.join(self.root_dir, 'prices')
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            entry.split('=', 1)[1] for entry in os.listdir(path) if entry.startswith('symbol=')
+        )
+
+    def read_table(self, symbol: str, start=None, end=None, columns: Optional[List[str]] = None,
+                   dataset: str = 'prices') -> pa.Table:
+        """Read one symbol's rows, pruning partitions by symbol and year"""
+        expr = ds.field('symbol') == symbol
+        if start is not None:
+            start = pd.Timestamp(start)
+            expr &= (ds.field('year') >= start.year) & (ds.field('date') >= start)
+        if end is not None:
+            end = pd.Timestamp(end)
+            expr &= (ds.field('year') <= end.year) & (ds.field('date') <= end)
+
+        table = self._dataset(dataset).to_table(filter=expr, columns=columns)
+        return table.sort_by('date') if table.num_rows else table
+
+    def read_columns(self, symbol: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """
+        Read OHLCV columns as NumPy arrays
+        Arrays are zero-copy views over Arrow buffers whenever the column
+        is a single null-free chunk
+        """
+        table = self.read_table(
+            symbol, start, end, columns=['date', 'open', 'high', 'low', 'close', 'volume']
+        )
+        return {name: _column_to_numpy(table.column(name)) for name in table.column_names}
+
+    def read_ohlcv(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        """Read a DataFrame shaped for TechnicalAnalysis (Open/High/Low/Close/Volume)"""
+        return columns_to_ohlcv_frame(self.read_columns(symbol, start, end))
+
+    def read_records(self, symbol: str, start=None, end=None) -> List[Dict]:
+        """Read rows in the NepseDataFetcher.get_historical_data record format"""
+        cols = self.read_columns(symbol, start, end)
+        dates = pd.DatetimeIndex(cols['date']).strftime('%Y-%m-%d')
+        return [
+            {
+                'date': date,
+                'open': float(o),
+                'high': float(h),
+                'low': float(l),
+                'close': float(c),
+                'volume': int(v)
+            }
+            for date, o, h, l, c, v in zip(
+                dates, cols['open'], cols['high'], cols['low'], cols['close'], cols['volume']
+            )
+        ]
+
+    def iter_batches(self, dataset: str = 'prices', symbols: Optional[List[str]] = None,
+                     batch_size: int = 250_000) -> Iterator[pa.RecordBatch]:
+        """Stream record batches without materializing the whole dataset"""
+        expr = ds.field('symbol').isin(symbols) if symbols else None
+        return self._dataset(dataset).to_batches(filter=expr, batch_size=batch_size)
+
+    def export_csv(self, csv_path: str, dataset: str = 'prices',
+                   symbols: Optional[List[str]] = None) -> int:
+        """Export (part of) a dataset back to CSV, batch by batch"""
+        rows = 0
+        header = True
+        with open(csv_path, 'w', newline='') as handle:
+            for batch in self.iter_batches(dataset, symbols):
+                frame = batch.to_pandas()
+                frame.drop(columns=['year'], errors='ignore').to_csv(handle, header=header, index=False)
+                header = False
+                rows += len(frame)
+        return rows
+
+
+def _column_to_numpy(column: pa.ChunkedArray) -> np.ndarray:
+    """Convert an Arrow column to NumPy, avoiding a copy when possible"""
+    array = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    try:
+        return array.to_numpy(zero_copy_only=True)
+    except pa.ArrowInvalid:
+        return array.to_numpy(zero_copy_only=False)
+
+
+def columns_to_ohlcv_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Wrap column arrays in a DataFrame without copying them"""
+    return pd.DataFrame(
+        {
+            'Open': columns['open'],
+            'High': columns['high'],
+            'Low': columns['low'],
+            'Close': columns['close'],
+            'Volume': columns['volume']
+        },
+        index=pd.DatetimeIndex(columns['date'], name='Date'),
+        copy=False
+    )
@@ -4,26 +4,70 @@ NEPSE Command Line Interface
 Advanced analysis tools for Nepal Stock Exchange
 """
 
+import csv
 import json
+import os
 import random
+import re
 import sys
 from datetime import datetime, timedelta
 from basic_app import NepseAnalyzer
+import profiling
+from metrics import timed
+
+# Order book imbalance beyond which depth adds a BUY/SELL signal, and the
+# widest spread (basis points of mid) at which a book is trusted for it
+DEPTH_IMBALANCE_SIGNAL = 0.3
+DEPTH_MAX_SPREAD_BPS = 100
+
+# screen_stocks criteria answered by the analyses; anything else is a
+# valuation filter that needs a fundamentals.FundamentalStore
+ANALYSIS_CRITERIA = ('min_price', 'max_price', 'min_rsi', 'max_rsi', 'sector', 'recommendation')
+
+def recent_bars(data, days):
+    """The last `days` bars of a generate_sample_data() result"""
+    prices = data['prices'][-days:]
+    return dict(data, dates=data['dates'][-days:], prices=prices, volumes=data['volumes'][-days:],
+                current_price=prices[-1], change=round(prices[-1] - prices[-2], 2) if len(prices) > 1 else 0)
 
 class AdvancedNepseAnalyzer(NepseAnalyzer):
     """Extended analyzer with advanced features"""
     
-    def __init__(self):
+    def __init__(self, floorsheet=None, corporate_actions=None, fundamentals=None, depth=None):
         super().__init__()
         self.portfolio = {}
+        # Optional floorsheet.FloorsheetStore with trade-level data
+        self.floorsheet = floorsheet
+        # Optional corporate_actions.CorporateActionStore; indicators then
+        # run on back-adjusted prices instead of raw ones with bonus/rights gaps
+        self.corporate_actions = corporate_actions
+        # Optional fundamentals.FundamentalStore enabling valuation filters in screen_stocks
+        self.fundamentals = fundamentals
+        # Optional market_depth.DepthStore; order book pressure then feeds recommendations
+        self.depth = depth
+        # Sample depth source behind get_depth(); its books follow each analysed price
+        self.depth_source = None
         
-    def analyze_stock(self, symbol, detailed=False):
-        """Detailed stock analysis"""
+    def get_depth(self):
+        """Get the order book store, backed by the market depth source when none was given"""
+        if self.depth is None:
+            from data_fetcher import NepseDataFetcher
+            from market_depth import DepthStore
+            
+            self.depth_source = NepseDataFetcher(symbol_master=self.symbol_master)
+            self.depth = DepthStore()
+        return self.depth
+    
+    def analyze_stock(self, symbol, detailed=False, data=None):
+        """Detailed stock analysis (of `data`, a generate_sample_data() result, when given)"""
         if symbol not in self.stocks:
             return {"error": f"Stock {symbol} not found"}
         
-        data = self.generate_sample_data(symbol, 30)
+        if data is None:
+            data = self.generate_sample_data(symbol, 30)
         prices = data['prices']
+        if self.corporate_actions is not None and symbol in self.corporate_actions:
+            prices = self.corporate_actions.adjust_prices(symbol, data['dates'], prices)
         
         # Calculate technical indicators
         sma_10 = self.calculate_sma(prices, 10)
@@ -34,13 +78,21 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
         volatility = self.calculate_volatility(prices)
         momentum = self.calculate_momentum(prices, 5)
         support_resistance = self.find_support_resistance(prices)
+        if self.depth_source is not None:
+            # Sample books are centred on the price being analysed
+            book = self.depth_source.get_market_depth(symbol, data['current_price'])
+            if book:
+                self.depth.update_many([book])
+        depth = self.depth.summary(symbol) if self.depth is not None else None
         
         analysis = {
             'symbol': symbol,
+            'sector': self.get_sector(symbol),
             'current_price': data['current_price'],
             'change': data['change'],
             'change_percent': round((data['change'] / data['current_price']) * 100, 2),
             'volume': data['volumes'][-1],
+            'avg_volume': round(sum(data['volumes'][-20:]) / len(data['volumes'][-20:])),
             'sma_10': sma_10[-1] if sma_10 else None,
             'sma_20': sma_20[-1] if sma_20 else None,
             'rsi': rsi,
@@ -48,9 +100,15 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
             'momentum': momentum,
             'support': support_resistance['support'],
             'resistance': support_resistance['resistance'],
-            'recommendation': self.get_recommendation(data, sma_10, sma_20, rsi)
+            'recommendation': self.get_recommendation(data, sma_10, sma_20, rsi, depth)
         }
         
+        if depth is not None:
+            analysis['depth'] = depth
+        
+        if self.floorsheet is not None and symbol in self.floorsheet:
+            analysis['floorsheet'] = self.floorsheet.summary(symbol)
+        
         if detailed:
             analysis['price_history'] = prices[-10:]  # Last 10 days
             analysis['volume_history'] = data['volumes'][-10:]
@@ -133,8 +191,8 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
         else:
             return "Sideways"
     
-    def get_recommendation(self, data, sma_10, sma_20, rsi):
-        """Generate trading recommendation"""
+    def get_recommendation(self, data, sma_10, sma_20, rsi, depth=None):
+        """Generate trading recommendation (depth: market_depth.DepthStore summary, optional)"""
         current_price = data['current_price']
         signals = []
         
@@ -161,6 +219,14 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
             else:
                 signals.append("STRONG_SELL")
         
+        # Order book pressure, ignored for books too thin to quote a tight spread
+        if depth and depth['imbalance_ema'] is not None and depth['spread_bps'] is not None:
+            if depth['spread_bps'] <= DEPTH_MAX_SPREAD_BPS:
+                if depth['imbalance_ema'] > DEPTH_IMBALANCE_SIGNAL:
+                    signals.append("BUY")
+                elif depth['imbalance_ema'] < -DEPTH_IMBALANCE_SIGNAL:
+                    signals.append("SELL")
+        
         # Final recommendation
         buy_signals = signals.count("BUY") + signals.count("STRONG_BUY") * 2
         sell_signals = signals.count("SELL") + signals.count("STRONG_SELL") * 2
@@ -172,15 +238,59 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
         else:
             return "HOLD"
     
-    def screen_stocks(self, criteria=None):
-        """Screen stocks based on criteria"""
+    def _screen_data(self, symbols):
+        """
+        (ScreenData, analyses) for an expression screen: the screen runs on the
+        same histories the analyses come from, with the indicators they report
+        """
+        from screener import ANALYSIS_INDICATORS, DEFAULT_DAYS, ScreenData
+        
+        closes, volumes, analyses = {}, {}, {}
+        for symbol in symbols:
+            data = self.generate_sample_data(symbol, DEFAULT_DAYS)
+            prices = data['prices']
+            if self.corporate_actions is not None and symbol in self.corporate_actions:
+                prices = self.corporate_actions.adjust_prices(symbol, data['dates'], prices)
+            closes[symbol] = prices
+            volumes[symbol] = data['volumes']
+            # analyze_stock looks at the last 30 bars of the same history
+            analyses[symbol] = self.analyze_stock(symbol, data=recent_bars(data, 30))
+        
+        screen_data = ScreenData.from_series(closes, volumes, self.symbol_master.sector_map(), DEFAULT_DAYS,
+                                             master=self.symbol_master)
+        for expression, key in ANALYSIS_INDICATORS.items():
+            screen_data.set_values(expression, [analyses[symbol].get(key) for symbol in screen_data.symbols])
+        return screen_data, analyses
+    
+    @timed('nepse_screen_seconds')
+    def screen_stocks(self, criteria=None, expression=None):
+        """
+        Screen stocks based on criteria and/or a screener expression such as
+        'rsi(14) < 30 and close > sma(50)' (invalid expressions raise ValueError)
+        """
         if criteria is None:
             criteria = {}
+        valuation = sorted(set(criteria) - set(ANALYSIS_CRITERIA))
+        if valuation and self.fundamentals is None:
+            raise ValueError(f"Valuation filters need fundamentals (e.g. --fundamentals CSV): {', '.join(valuation)}")
         
         results = []
         
-        for symbol in self.stocks:
-            analysis = self.analyze_stock(symbol)
+        symbols = self.stocks
+        if 'sector' in criteria:
+            symbols = self.symbol_master.symbols(criteria['sector'])
+        analyses = {}
+        if expression:
+            from screener import Screener, compile_expression
+            
+            # Reject a bad expression before any data is fetched
+            compile_expression(expression)
+            screen_data, analyses = self._screen_data(symbols)
+            matched = set(Screener(screen_data).select(expression))
+            symbols = [symbol for symbol in symbols if symbol in matched]
+        
+        for symbol in symbols:
+            analysis = analyses.get(symbol) or self.analyze_stock(symbol)
             
             # Apply screening criteria
             include = True
@@ -199,12 +309,33 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
             if include:
                 results.append(analysis)
         
+        if self.fundamentals is not None and results:
+            results = self._apply_fundamentals(results, criteria)
+        
         # Sort by recommendation strength
         recommendation_order = {"STRONG_BUY": 5, "BUY": 4, "HOLD": 3, "SELL": 2, "STRONG_SELL": 1}
         results.sort(key=lambda x: recommendation_order.get(x['recommendation'], 0), reverse=True)
         
         return results
     
+    def _apply_fundamentals(self, results, criteria):
+        """Add valuation ratios to screen results and apply fundamental criteria in one pass"""
+        from fundamentals import fundamental_mask
+        
+        # One vectorized ratio table for every candidate instead of per-stock lookups
+        ratios = self.fundamentals.ratios({result['symbol']: result['current_price'] for result in results})
+        mask = fundamental_mask(ratios, criteria)
+        passed = set(ratios.index[mask]) if mask is not None else None
+        columns = ['pe_ratio', 'pb_ratio', 'dividend_yield', 'roe', 'eps_growth']
+        values = ratios[columns].astype(object).where(ratios[columns].notna(), None).to_dict('index')
+        
+        combined = []
+        for result in results:
+            if passed is not None and result['symbol'] not in passed:
+                continue
+            combined.append(dict(result, **values.get(result['symbol'], dict.fromkeys(columns))))
+        return combined
+    
     def add_to_portfolio(self, symbol, quantity, purchase_price):
         """Add stock to portfolio"""
         if symbol not in self.stocks:
@@ -274,6 +405,103 @@ class AdvancedNepseAnalyzer(NepseAnalyzer):
             'holdings': holdings
         }
 
+    def get_sector_analytics(self, days=250):
+        """sector_analysis.SectorAnalytics over every tracked symbol's close history"""
+        import pandas as pd
+        from sector_analysis import SectorAnalytics
+        
+        closes = {}
+        for symbol in self.stocks:
+            data = self.generate_sample_data(symbol, days)
+            closes[symbol] = pd.Series(data['prices'], index=pd.to_datetime(data['dates']))
+        return SectorAnalytics(pd.DataFrame(closes), self.symbol_master)
+    
+    def get_sector_rotation(self, periods=(5, 20, 60)):
+        """Per-sector returns over several lookbacks plus relative strength, strongest first"""
+        analytics = self.get_sector_analytics()
+        table = analytics.rotation_table(periods)
+        table['relative_strength'] = analytics.relative_strength(min(periods))
+        table = table.astype(object).where(table.notna(), None)
+        return table.rename_axis('sector').reset_index().to_dict('records')
+    
+    def get_timeframe_trends(self, symbols=None, days=1000, calendar='AD'):
+        """Daily, weekly and monthly trend plus their confluence per symbol, strongest alignment first"""
+        import pandas as pd
+        from technical_analysis import multi_timeframe_screen
+        
+        frames = {}
+        for symbol in symbols or self.stocks:
+            data = self.generate_sample_data(symbol, days)
+            prices = data['prices']
+            if self.corporate_actions is not None and symbol in self.corporate_actions:
+                prices = self.corporate_actions.adjust_prices(symbol, data['dates'], prices)
+            # Closing prices carry every indicator of the multi-timeframe set
+            frames[symbol] = pd.DataFrame(
+                {'Open': prices, 'High': prices, 'Low': prices, 'Close': prices, 'Volume': data['volumes']},
+                index=pd.to_datetime(data['dates'])
+            )
+        table = multi_timeframe_screen(frames, calendar).rename_axis('symbol').reset_index()
+        order = {"Aligned Uptrend": 0, "Mixed": 1, "Aligned Downtrend": 2}
+        table = table.sort_values('confluence', key=lambda column: column.map(order), kind='stable')
+        return table.to_dict('records')
+    
+    def check_alerts(self, alert_engine, symbols=None):
+        """Feed fresh analyses and their price history into an alerts.AlertEngine and return newly fired alerts"""
+        from screener import DEFAULT_DAYS
+        
+        for symbol in symbols or self.stocks:
+            if symbol not in self.stocks:
+                continue
+            data = self.generate_sample_data(symbol, DEFAULT_DAYS)
+            prices = data['prices']
+            if self.corporate_actions is not None and symbol in self.corporate_actions:
+                prices = self.corporate_actions.adjust_prices(symbol, data['dates'], prices)
+            # Indicators a rule reads beyond the analysis come from the same history
+            alert_engine.update_history(symbol, prices, data['volumes'])
+            alert_engine.update_analysis(self.analyze_stock(symbol, data=recent_bars(data, 30)))
+        return alert_engine.evaluate()
+    
+    def get_risk_engine(self, days=250):
+        """
+        (risk.RiskEngine over every tracked symbol's history with betas against
+        the cap-weighted market, latest close per symbol)
+        """
+        from risk import RiskEngine
+        
+        analytics = self.get_sector_analytics(days)
+        engine = RiskEngine.from_prices(analytics.closes, analytics.market_index(), window=days)
+        return engine, analytics.closes.iloc[-1]
+    
+    def get_portfolio_risk(self, risk_engine=None, confidence=0.95, prices=None):
+        """
+        Portfolio VaR/CVaR and holding betas from a risk.RiskEngine (built from
+        the tracked symbols' history when not given); holdings are weighted by
+        market value at the latest price (`prices`, else the current analysis price)
+        """
+        if not self.portfolio:
+            return {"error": "Portfolio is empty"}
+        
+        if risk_engine is None:
+            risk_engine, prices = self.get_risk_engine()
+        weights = {}
+        for symbol, position in self.portfolio.items():
+            price = prices.get(symbol) if prices is not None else None
+            if price is None:
+                price = self.analyze_stock(symbol)['current_price']
+            weights[symbol] = position['quantity'] * price
+        betas = risk_engine.betas()
+        portfolio_beta = sum(
+            betas.get(symbol, 0) * weight for symbol, weight in weights.items()
+        ) / sum(weights.values())
+        
+        return {
+            'confidence': confidence,
+            'historical': risk_engine.value_at_risk(weights, confidence, 'historical'),
+            'parametric': risk_engine.value_at_risk(weights, confidence, 'parametric'),
+            'beta': round(float(portfolio_beta), 4),
+            'holding_betas': {symbol: float(betas.get(symbol, float('nan'))) for symbol in weights}
+        }
+
 def print_separator(char="=", length=60):
     """Print a separator line"""
     print(char * length)
@@ -282,6 +510,8 @@ def print_stock_analysis(analysis):
     """Print formatted stock analysis"""
     print(f"\n📊 {analysis['symbol']} Analysis")
     print_separator("-", 40)
+    if analysis.get('sector'):
+        print(f"Sector: {analysis['sector']}")
     print(f"Current Price: Rs. {analysis['current_price']}")
     print(f"Change: Rs. {analysis['change']} ({analysis['change_percent']}%)")
     print(f"Volume: {analysis['volume']:,}")
@@ -298,6 +528,18 @@ def print_stock_analysis(analysis):
     print(f"Support: Rs. {analysis['support']}")
     print(f"Resistance: Rs. {analysis['resistance']}")
     print(f"📈 Recommendation: {analysis['recommendation']}")
+    
+    floorsheet = analysis.get('floorsheet')
+    if floorsheet:
+        print(f"Floorsheet: {floorsheet['trades']:,} trades | VWAP: Rs. {floorsheet['vwap']}")
+        print(f"Top Buyer: Broker {floorsheet['top_buyer']} | Top Seller: Broker {floorsheet['top_seller']}")
+        print(f"Large Trades: {floorsheet['large_trades']}")
+    
+    depth = analysis.get('depth')
+    if depth and depth['best_bid'] is not None and depth['best_ask'] is not None:
+        print(f"Depth: Bid Rs. {depth['best_bid']} x {depth['bid_depth']:,.0f} | "
+              f"Ask Rs. {depth['best_ask']} x {depth['ask_depth']:,.0f} | Spread: {depth['spread_bps']} bps")
+        print(f"Imbalance: {depth['imbalance_ema']:+.2f} | Depth-weighted Price: Rs. {depth['weighted_price']}")
 
 def print_portfolio(performance):
     """Print formatted portfolio"""
@@ -319,9 +561,149 @@ def print_portfolio(performance):
         print(f"     Gain/Loss: Rs. {holding['gain_loss']:,} ({holding['gain_loss_percent']:.2f}%)")
         print(f"     Recommendation: {holding['recommendation']}")
 
-def main():
-    """Main CLI function"""
+def print_portfolio_risk(risk):
+    """Print formatted portfolio risk"""
+    if 'error' in risk:
+        print(f"❌ {risk['error']}")
+        return
+    
+    confidence = risk['confidence'] * 100
+    print(f"\n⚠️  Portfolio Risk ({confidence:.0f}% one-day)")
+    print_separator("-", 50)
+    for method in ('historical', 'parametric'):
+        figures = risk[method]
+        if figures['var'] is None:
+            print(f"{method.title()}: not enough history")
+            continue
+        print(f"{method.title()} VaR: {figures['var'] * 100:.2f}% | CVaR: {figures['cvar'] * 100:.2f}%")
+    print(f"Portfolio Beta: {risk['beta']:.2f}")
+    for symbol, beta in risk['holding_betas'].items():
+        print(f"  {symbol}: beta {beta:.2f}")
+
+def handle_command(analyzer, command):
+    """Run one interactive command; returns False when the user exits"""
+    if command.startswith('analyze '):
+        symbol = command.split()[1].upper()
+        analysis = analyzer.analyze_stock(symbol, detailed=True)
+        if 'error' in analysis:
+            print(f"❌ {analysis['error']}")
+        else:
+            print_stock_analysis(analysis)
+            if 'trend_analysis' in analysis:
+                print(f"Trend: {analysis['trend_analysis']}")
+    
+    elif command == 'screen':
+        print("\n🔍 Stock Screening")
+        print("Available criteria: min_price, max_price, min_rsi, max_rsi, sector")
+        print("or an expression, e.g. rsi(14) < 30 and close > sma(50) and sector == \"Commercial Banks\"")
+        criteria_input = input("Enter criteria (e.g., min_rsi=30,max_rsi=70) or press Enter for all: ")
+        
+        criteria = {}
+        expression = None
+        items = [item for item in criteria_input.split(',') if item.strip()]
+        if items and all(re.match(r'^\s*\w+\s*=[^=]', item) for item in items):
+            for item in items:
+                key, value = item.split('=')
+                key = key.strip()
+                criteria[key] = value.strip() if key == 'sector' else float(value.strip())
+        elif criteria_input.strip():
+            expression = criteria_input
+        
+        try:
+            results = analyzer.screen_stocks(criteria, expression)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return True
+        print(f"\n📊 Found {len(results)} stocks matching criteria:")
+        for result in results[:10]:  # Show top 10
+            print(f"  {result['symbol']}: Rs. {result['current_price']} - {result['recommendation']}")
+    
+    elif command.startswith('portfolio add '):
+        parts = command.split()
+        if len(parts) == 5:
+            symbol = parts[2].upper()
+            quantity = int(parts[3])
+            price = float(parts[4])
+            
+            if analyzer.add_to_portfolio(symbol, quantity, price):
+                print(f"✅ Added {quantity} shares of {symbol} at Rs. {price}")
+            else:
+                print(f"❌ Stock {symbol} not found")
+        else:
+            print("❌ Usage: portfolio add <SYMBOL> <QUANTITY> <PRICE>")
+    
+    elif command == 'portfolio':
+        performance = analyzer.get_portfolio_performance()
+        print_portfolio(performance)
+    
+    elif command == 'portfolio risk':
+        print_portfolio_risk(analyzer.get_portfolio_risk())
+    
+    elif command == 'summary':
+        summary = analyzer.get_market_summary()
+        print(f"\n📈 Market Summary")
+        print_separator("-", 30)
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    
+    elif command == 'list':
+        print(f"\n📋 Available Stocks ({len(analyzer.stocks)}):")
+        for i, symbol in enumerate(analyzer.stocks, 1):
+            print(f"  {i:2d}. {symbol:<8} {analyzer.get_sector(symbol)}")
+    
+    elif command == 'help':
+        print("\n📚 Help:")
+        print("  analyze NABIL     - Analyze NABIL stock")
+        print("  screen            - Screen stocks with criteria")
+        print("  portfolio add NABIL 100 500 - Add 100 NABIL shares at Rs. 500")
+        print("  portfolio         - View portfolio performance")
+        print("  portfolio risk    - View portfolio VaR, CVaR and beta")
+        print("  summary           - Show market summary")
+        print("  list              - List all available stocks")
+    
+    elif command == 'exit':
+        print("👋 Thank you for using NEPSE Advanced Analysis CLI!")
+        return False
+    
+    else:
+        print("❌ Unknown command. Type 'help' for available commands.")
+    
+    return True
+
+def create_analyzer(service_url=None, depth=False, corporate_actions=None):
+    """
+    Attach to a running analysis service when one is configured, else analyze locally
+    depth: load order books so book pressure feeds local recommendations
+    corporate_actions: CSV of bonus/rights/split/dividend actions; indicators then use adjusted prices
+    """
+    analyzer = _connect_or_create(service_url, depth)
+    if corporate_actions:
+        from corporate_actions import CorporateActionStore
+        
+        analyzer.corporate_actions = CorporateActionStore.from_csv(corporate_actions)
+    return analyzer
+
+def _connect_or_create(service_url, depth):
+    """Service-backed analyzer when one answers, else a local one"""
+    service_url = service_url or os.environ.get('NEPSE_SERVICE_URL')
+    if service_url:
+        import service
+        
+        analyzer = service.connect(service_url)
+        if analyzer is not None:
+            return analyzer
+        print(f"⚠️  No analysis service at {service_url}; analyzing locally", file=sys.stderr)
     analyzer = AdvancedNepseAnalyzer()
+    if depth:
+        analyzer.get_depth()
+    return analyzer
+
+def interactive(profile=False, service_url=None, depth=False, corporate_actions=None):
+    """Interactive (REPL) CLI session"""
+    if profile:
+        profiling.enable()
+    
+    analyzer = create_analyzer(service_url, depth, corporate_actions)
     
     print("🏛️  NEPSE Advanced Analysis CLI")
     print_separator()
@@ -331,7 +713,7 @@ def main():
         print("1. Analyze Stock (analyze <SYMBOL>)")
         print("2. Screen Stocks (screen)")
         print("3. Add to Portfolio (portfolio add <SYMBOL> <QUANTITY> <PRICE>)")
-        print("4. View Portfolio (portfolio)")
+        print("4. View Portfolio (portfolio, portfolio risk)")
         print("5. Market Summary (summary)")
         print("6. List Stocks (list)")
         print("7. Help (help)")
@@ -339,82 +721,316 @@ def main():
         
         command = input("\n💻 Enter command: ").strip().lower()
         
-        if command.startswith('analyze '):
-            symbol = command.split()[1].upper()
-            analysis = analyzer.analyze_stock(symbol, detailed=True)
-            if 'error' in analysis:
-                print(f"❌ {analysis['error']}")
-            else:
-                print_stock_analysis(analysis)
-                if 'trend_analysis' in analysis:
-                    print(f"Trend: {analysis['trend_analysis']}")
-        
-        elif command == 'screen':
-            print("\n🔍 Stock Screening")
-            print("Available criteria: min_price, max_price, min_rsi, max_rsi")
-            criteria_input = input("Enter criteria (e.g., min_rsi=30,max_rsi=70) or press Enter for all: ")
-            
-            criteria = {}
-            if criteria_input.strip():
-                for item in criteria_input.split(','):
-                    if '=' in item:
-                        key, value = item.split('=')
-                        criteria[key.strip()] = float(value.strip())
-            
-            results = analyzer.screen_stocks(criteria)
-            print(f"\n📊 Found {len(results)} stocks matching criteria:")
-            for result in results[:10]:  # Show top 10
-                print(f"  {result['symbol']}: Rs. {result['current_price']} - {result['recommendation']}")
-        
-        elif command.startswith('portfolio add '):
-            parts = command.split()
-            if len(parts) == 5:
-                symbol = parts[2].upper()
-                quantity = int(parts[3])
-                price = float(parts[4])
-                
-                if analyzer.add_to_portfolio(symbol, quantity, price):
-                    print(f"✅ Added {quantity} shares of {symbol} at Rs. {price}")
-                else:
-                    print(f"❌ Stock {symbol} not found")
-            else:
-                print("❌ Usage: portfolio add <SYMBOL> <QUANTITY> <PRICE>")
-        
-        elif command == 'portfolio':
-            performance = analyzer.get_portfolio_performance()
-            print_portfolio(performance)
-        
-        elif command == 'summary':
-            summary = analyzer.get_market_summary()
-            print(f"\n📈 Market Summary")
-            print_separator("-", 30)
-            for key, value in summary.items():
-                print(f"{key}: {value}")
-        
-        elif command == 'list':
-            print(f"\n📋 Available Stocks ({len(analyzer.stocks)}):")
-            for i, symbol in enumerate(analyzer.stocks, 1):
-                print(f"  {i:2d}. {symbol}")
-        
-        elif command == 'help':
-            print("\n📚 Help:")
-            print("  analyze NABIL     - Analyze NABIL stock")
-            print("  screen            - Screen stocks with criteria")
-            print("  portfolio add NABIL 100 500 - Add 100 NABIL shares at Rs. 500")
-            print("  portfolio         - View portfolio performance")
-            print("  summary           - Show market summary")
-            print("  list              - List all available stocks")
-        
-        elif command == 'exit':
-            print("👋 Thank you for using NEPSE Advanced Analysis CLI!")
+        with profiling.maybe_profile(f"cli-{command.split()[0] if command else 'empty'}"):
+            keep_running = handle_command(analyzer, command)
+        if not keep_running:
             break
-        
+
+# Symbol lists at least this long are spread over worker processes
+PARALLEL_THRESHOLD = 16
+
+_worker_analyzer = None
+
+def _init_worker(depth=False, corporate_actions=None):
+    """Create one analyzer per worker process (with the parent's order books and corporate actions)"""
+    global _worker_analyzer
+    _worker_analyzer = AdvancedNepseAnalyzer(corporate_actions=corporate_actions)
+    if depth:
+        _worker_analyzer.get_depth()
+
+def _analyze_in_worker(task):
+    """Analyze one symbol inside a worker process"""
+    symbol, detailed = task
+    return _worker_analyzer.analyze_stock(symbol, detailed=detailed)
+
+def analyze_many(analyzer, symbols, detailed=False, workers=None):
+    """Analyze many symbols, in parallel for long symbol lists"""
+    if hasattr(analyzer, 'analyze_many'):
+        # Service-backed analyzers batch the whole list in one call
+        return analyzer.analyze_many(symbols, detailed)
+    
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(symbols) < PARALLEL_THRESHOLD:
+        return [analyzer.analyze_stock(symbol, detailed=detailed) for symbol in symbols]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    chunksize = max(1, len(symbols) // (workers * 4))
+    initargs = (getattr(analyzer, 'depth', None) is not None, getattr(analyzer, 'corporate_actions', None))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        tasks = [(symbol, detailed) for symbol in symbols]
+        return list(pool.map(_analyze_in_worker, tasks, chunksize=chunksize))
+
+def read_symbols(values, stream=None):
+    """Symbols from arguments, or from stdin when none are given or '-' is used"""
+    stream = stream or sys.stdin
+    symbols = []
+    for value in values:
+        if value == '-':
+            symbols.extend(stream.read().replace(',', ' ').split())
         else:
-            print("❌ Unknown command. Type 'help' for available commands.")
+            symbols.extend(value.replace(',', ' ').split())
+    if not values and not stream.isatty():
+        symbols.extend(stream.read().replace(',', ' ').split())
+    
+    seen = set()
+    unique = []
+    for symbol in (symbol.strip().upper() for symbol in symbols):
+        if symbol and symbol not in seen:
+            seen.add(symbol)
+            unique.append(symbol)
+    return unique
+
+def read_positions(values, path=None):
+    """Portfolio positions from SYMBOL:QUANTITY:PRICE arguments and/or a CSV file"""
+    positions = []
+    for value in values:
+        symbol, quantity, price = value.split(':')
+        positions.append((symbol.upper(), int(quantity), float(price)))
+    if path:
+        handle = sys.stdin if path == '-' else open(path, newline='')
+        try:
+            for row in csv.DictReader(handle):
+                positions.append((row['symbol'].strip().upper(), int(row['quantity']), float(row['price'])))
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+    return positions
+
+def write_output(records, output_format, stream=None):
+    """Write a list of dicts as JSON, CSV or a plain table"""
+    stream = stream or sys.stdout
+    if output_format == 'json':
+        json.dump(records, stream, indent=2, default=str)
+        stream.write("\n")
+        return
+    
+    columns = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    
+    def cell(value):
+        return json.dumps(value, default=str) if isinstance(value, (dict, list)) else value
+    
+    if output_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=columns, extrasaction='ignore', lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow({key: cell(value) for key, value in record.items()})
+    else:
+        widths = {
+            column: max([len(column)] + [len(str(cell(record.get(column, '')))) for record in records])
+            for column in columns
+        }
+        stream.write("  ".join(column.ljust(widths[column]) for column in columns) + "\n")
+        for record in records:
+            stream.write("  ".join(str(cell(record.get(column, ''))).ljust(widths[column]) for column in columns) + "\n")
+
+# Defaults of the shared options; applied after parsing because the option
+# actions are shared between the main parser and every subcommand parser
+BATCH_DEFAULTS = {'format': 'json', 'workers': None, 'profile': False, 'service': None, 'depth': False,
+                  'corporate_actions': None}
+
+def build_parser():
+    """Argument parser for batch mode"""
+    import argparse
+    
+    # Shared options are accepted before or after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--format', choices=['json', 'csv', 'table'], default=argparse.SUPPRESS,
+                        help="output format (default: json)")
+    common.add_argument('--workers', type=int, default=argparse.SUPPRESS,
+                        help="worker processes for long symbol lists (default: CPU count)")
+    common.add_argument('--profile', action='store_true', default=argparse.SUPPRESS,
+                        help="profile the command")
+    common.add_argument('--service', metavar='URL', default=argparse.SUPPRESS,
+                        help="attach to a running analysis service (default: $NEPSE_SERVICE_URL)")
+    common.add_argument('--depth', action='store_true', default=argparse.SUPPRESS,
+                        help="load order books so book pressure feeds recommendations")
+    common.add_argument('--corporate-actions', metavar='CSV', default=argparse.SUPPRESS,
+                        help="bonus/rights/split/dividend actions; indicators use adjusted prices")
+    
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="NEPSE Advanced Analysis CLI (runs interactively when no command is given)",
+        parents=[common]
+    )
+    commands = parser.add_subparsers(dest='command')
+    
+    analyze = commands.add_parser('analyze', parents=[common], help="analyze one or more symbols")
+    analyze.add_argument('symbols', nargs='*', help="symbols, or '-' / nothing to read from stdin")
+    analyze.add_argument('--detailed', action='store_true', help="include price history and trend")
+    
+    screen = commands.add_parser('screen', parents=[common], help="screen stocks by criteria")
+    screen.add_argument('--min-price', type=float)
+    screen.add_argument('--max-price', type=float)
+    screen.add_argument('--min-rsi', type=float)
+    screen.add_argument('--max-rsi', type=float)
+    screen.add_argument('--sector')
+    screen.add_argument('--where', metavar='EXPR',
+                        help='screener expression, e.g. "rsi(14) < 30 and close > sma(50)"')
+    screen.add_argument('--recommendation', action='append',
+                        choices=['STRONG_BUY', 'BUY', 'HOLD', 'SELL', 'STRONG_SELL'],
+                        help="allowed recommendation (repeatable)")
+    screen.add_argument('--fundamentals', metavar='CSV', help="quarterly reports enabling the valuation filters")
+    screen.add_argument('--max-pe', type=float)
+    screen.add_argument('--max-pb', type=float)
+    screen.add_argument('--min-dividend-yield', type=float)
+    screen.add_argument('--min-eps-growth', type=float)
+    screen.add_argument('--limit', type=int, help="only output the first N results")
+    
+    portfolio = commands.add_parser('portfolio', parents=[common], help="evaluate a portfolio")
+    portfolio.add_argument('positions', nargs='*', metavar='SYMBOL:QTY:PRICE')
+    portfolio.add_argument('--file', help="CSV with symbol,quantity,price columns ('-' for stdin)")
+    portfolio.add_argument('--risk', action='store_true', help="add beta per holding and VaR/CVaR to the total")
+    portfolio.add_argument('--confidence', type=float, default=0.95, help="VaR confidence level (default 0.95)")
+    
+    alerts = commands.add_parser('alerts', parents=[common], help="evaluate alert rules against current data")
+    alerts.add_argument('rules', nargs='+', metavar='[NAME:]RULE',
+                        help='screener expression, e.g. "oversold: rsi(14) < 30 and volume > 1.5 * avg_volume"')
+    alerts.add_argument('--symbols', help="comma separated symbols (default: all)")
+    
+    refresh = commands.add_parser('refresh', parents=[common],
+                                  help="end-of-day indicator refresh of an archive on all cores")
+    refresh.add_argument('symbols', nargs='*', help="symbols to refresh (default: every archived symbol)")
+    refresh.add_argument('--archive', required=True, metavar='DIR', help="bulk_io archive directory")
+    refresh.add_argument('--transport', choices=['shm', 'memmap'], default='shm',
+                         help="how price data reaches the workers (default: shm)")
+    
+    commands.add_parser('sectors', parents=[common], help="sector rotation and relative strength")
+    timeframes = commands.add_parser('timeframes', parents=[common],
+                                     help="daily/weekly/monthly trend confluence")
+    timeframes.add_argument('symbols', nargs='*', help="symbols to check (default: all)")
+    timeframes.add_argument('--days', type=int, default=1000, help="days of daily history to resample (default: 1000)")
+    timeframes.add_argument('--calendar', choices=['AD', 'BS'], default='AD',
+                            help="calendar for weekly/monthly bar boundaries (default: AD)")
+    commands.add_parser('summary', parents=[common], help="market summary")
+    commands.add_parser('list', parents=[common], help="list available symbols")
+    return parser
+
+def run_batch(args, analyzer=None):
+    """Execute one batch command; returns (records, exit_code)"""
+    analyzer = analyzer or create_analyzer(args.service, args.depth, args.corporate_actions)
+    
+    if args.command == 'analyze':
+        symbols = read_symbols(args.symbols)
+        if not symbols:
+            return [{'error': 'No symbols given'}], 2
+        records = analyze_many(analyzer, symbols, args.detailed, args.workers)
+        return records, 1 if any('error' in record for record in records) else 0
+    
+    if args.command == 'screen':
+        criteria = {}
+        for key in ('min_price', 'max_price', 'min_rsi', 'max_rsi', 'sector', 'recommendation',
+                    'max_pe', 'max_pb', 'min_dividend_yield', 'min_eps_growth'):
+            value = getattr(args, key)
+            if value is not None:
+                criteria[key] = value
+        if args.fundamentals:
+            from fundamentals import FundamentalStore
+            
+            analyzer.fundamentals = FundamentalStore.from_csv(args.fundamentals)
+        try:
+            results = analyzer.screen_stocks(criteria, args.where)
+        except ValueError as e:
+            return [{'error': str(e)}], 2
+        return results[:args.limit] if args.limit else results, 0
+    
+    if args.command == 'portfolio':
+        positions = read_positions(args.positions, args.file)
+        unknown = []
+        for symbol, quantity, price in positions:
+            if not analyzer.add_to_portfolio(symbol, quantity, price):
+                unknown.append(symbol)
+        if unknown:
+            return [{'error': f"Stock {symbol} not found"} for symbol in unknown], 1
+        performance = analyzer.get_portfolio_performance()
+        if 'error' in performance:
+            return [performance], 1
+        totals = {key: value for key, value in performance.items() if key != 'holdings'}
+        if args.risk:
+            risk = analyzer.get_portfolio_risk(confidence=args.confidence)
+            for holding in performance['holdings']:
+                holding['beta'] = round(risk['holding_betas'][holding['symbol']], 4)
+            totals['beta'] = risk['beta']
+            for method in ('historical', 'parametric'):
+                totals[f'var_{method}'] = risk[method]['var']
+                totals[f'cvar_{method}'] = risk[method]['cvar']
+        return performance['holdings'] + [dict(symbol='TOTAL', **totals)], 0
+    
+    if args.command == 'alerts':
+        from alerts import AlertEngine
+        
+        engine = AlertEngine()
+        try:
+            for number, rule in enumerate(args.rules, 1):
+                name, separator, expression = rule.partition(':')
+                if not separator:
+                    name, expression = f"rule{number}", rule
+                engine.add_rule(name.strip(), expression)
+        except ValueError as e:
+            return [{'error': str(e)}], 2
+        symbols = read_symbols([args.symbols]) if args.symbols else None
+        return analyzer.check_alerts(engine, symbols), 0
+    
+    if args.command == 'refresh':
+        from bulk_io import ArchiveReader
+        from eod_refresh import EODRefresh
+        
+        symbols = [symbol.upper() for symbol in args.symbols] or None
+        store = EODRefresh(args.workers, args.transport).run_archive(ArchiveReader(args.archive), symbols)
+        latest = store.latest().round(4)
+        latest = latest.astype(object).where(latest.notna(), None)
+        return latest.reset_index().to_dict('records'), 0
+    
+    if args.command == 'sectors':
+        return analyzer.get_sector_rotation(), 0
+    
+    if args.command == 'timeframes':
+        symbols = [symbol.upper() for symbol in args.symbols]
+        unknown = [symbol for symbol in symbols if symbol not in analyzer.stocks]
+        if unknown:
+            return [{'error': f"Stock {symbol} not found"} for symbol in unknown], 1
+        return analyzer.get_timeframe_trends(symbols or None, args.days, args.calendar), 0
+    
+    if args.command == 'summary':
+        return [analyzer.get_market_summary()], 0
+    
+    if args.command == 'list':
+        return analyzer.get_symbol_list(), 0
+    
+    return [], 2
+
+def main(argv=None):
+    """CLI entry point: batch mode with a command, interactive otherwise"""
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    for key, value in BATCH_DEFAULTS.items():
+        if not hasattr(args, key):
+            setattr(args, key, value)
+    
+    if args.command is None:
+        interactive(profile=args.profile, service_url=args.service, depth=args.depth,
+                    corporate_actions=args.corporate_actions)
+        return 0
+    
+    with profiling.maybe_profile(f"batch-{args.command}", force=args.profile, report=False) as profile:
+        records, exit_code = run_batch(args)
+    write_output(records, args.format)
+    if 'result' in profile:
+        print(profile['result'].summary(), file=sys.stderr)
+    return exit_code
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
+    except BrokenPipeError:
+        # Output was closed early, e.g. piped into `head`
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
     except KeyboardInterrupt:
         print("\n\n👋 Goodbye!")
     except Exception as e:
@@ -0,0 +1,234 @@
+"""
+Corporate actions and back-adjusted prices for NEPSE
+Bonus shares, rights issues, splits and cash dividends create artificial
+gaps in raw price history. This module stores the actions, precomputes the
+cumulative adjustment factor of every action date and turns a raw series
+into a back-adjusted one with a single vectorized multiply.
+
+Action values:
+    bonus          bonus shares in percent (10 = 10% bonus)
+    rights         rights shares in percent (50 = 1 right per 2 held),
+                   with the subscription price (default Rs. 100 par)
+    split          new shares per old share (2 = 2-for-1)
+    cash_dividend  rupees per share (a "10% cash dividend" on the
+                   Rs. 100 par value is 10)
+"""
+
+import csv
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+ACTION_TYPES = ('bonus', 'rights', 'split', 'cash_dividend')
+PAR_VALUE = 100.0
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+# Factor tables kept per symbol (one per distinct set of inferred cum prices)
+FACTOR_TABLES_PER_SYMBOL = 8
+
+
+class CorporateActionStore:
+    """Corporate actions per symbol with cached cumulative adjustment factors"""
+
+    def __init__(self):
+        self._actions: Dict[str, List[Dict]] = {}
+        self._versions: Dict[str, int] = {}
+        # symbol -> {inferred reference prices: factor table}
+        self._factor_tables: Dict[str, Dict[Tuple, Tuple]] = {}
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'CorporateActionStore':
+        """Load actions from a CSV with symbol,ex_date,action,value[,subscription_price] columns"""
+        store = cls()
+        with open(path, newline='') as handle:
+            for row in csv.DictReader(handle):
+                price = (row.get('subscription_price') or '').strip()
+                store.add(row['symbol'], row['ex_date'], row['action'], float(row['value']),
+                          float(price) if price else None)
+        return store
+
+    def add(self, symbol: str, ex_date, action: str, value: float,
+            subscription_price: Optional[float] = None, reference_price: Optional[float] = None):
+        """
+        Record an action effective from ex_date
+        reference_price is the cum price (last close before ex_date); when
+        omitted it is taken from each series being adjusted, and a rights issue
+        or dividend before that series' first bar is left unadjusted
+        """
+        if action not in ACTION_TYPES:
+            raise ValueError(f"Unknown corporate action: {action}")
+        symbol = symbol.upper()
+        self._actions.setdefault(symbol, []).append({
+            'ex_date': pd.Timestamp(ex_date).normalize(),
+            'action': action,
+            'value': float(value),
+            'subscription_price': PAR_VALUE if subscription_price is None else float(subscription_price),
+            'reference_price': reference_price
+        })
+        self._actions[symbol].sort(key=lambda item: item['ex_date'])
+        self._versions[symbol] = self._versions.get(symbol, 0) + 1
+        self._factor_tables.pop(symbol, None)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._actions
+
+    def version(self, symbol: str) -> int:
+        """Changes whenever the symbol's actions change"""
+        return self._versions.get(symbol, 0)
+
+    def actions(self, symbol: str) -> pd.DataFrame:
+        """Actions of a symbol as a frame, oldest first"""
+        return pd.DataFrame(self._actions.get(symbol, []),
+                            columns=['ex_date', 'action', 'value', 'subscription_price', 'reference_price'])
+
+    @staticmethod
+    def _action_factors(action: Dict, reference_price: Optional[float]) -> Tuple[float, float]:
+        """(price factor, volume factor) applied to bars before the ex-date"""
+        kind, value = action['action'], action['value']
+        if kind == 'bonus':
+            factor = 1.0 / (1.0 + value / 100.0)
+        elif kind == 'split':
+            factor = 1.0 / value
+        elif reference_price is None:
+            # No cum price to value a rights issue or dividend against
+            return 1.0, 1.0
+        elif kind == 'rights':
+            ratio = value / 100.0
+            # Theoretical ex-rights price relative to the cum price
+            factor = (reference_price + ratio * action['subscription_price']) / ((1.0 + ratio) * reference_price)
+        else:
+            factor = (reference_price - value) / reference_price
+            return factor, 1.0
+        return factor, 1.0 / factor
+
+    @staticmethod
+    def _reference_prices(actions: List[Dict], dates: np.ndarray, closes: np.ndarray) -> Tuple:
+        """
+        Cum price of every action: the stored one, else the series' last close
+        before the ex-date (None when the series starts on or after it)
+        """
+        references = []
+        for action in actions:
+            reference = action['reference_price']
+            if reference is None and action['action'] in ('rights', 'cash_dividend'):
+                position = np.searchsorted(dates, np.datetime64(action['ex_date']), side='left') - 1
+                if position >= 0:
+                    reference = float(closes[position])
+            references.append(reference)
+        return tuple(references)
+
+    def _factor_table(self, symbol: str, dates: np.ndarray, closes: np.ndarray) -> Tuple:
+        """Sorted ex-dates plus suffix products of the price and volume factors"""
+        actions = self._actions[symbol]
+        # Inferred cum prices depend on the series, so they are part of the cache key
+        references = self._reference_prices(actions, dates, closes)
+        tables = self._factor_tables.setdefault(symbol, {})
+        table = tables.get(references)
+        if table is not None:
+            metrics.cache_hit('adjustment_factors')
+            return table
+        metrics.cache_miss('adjustment_factors')
+
+        factors = np.array([self._action_factors(action, reference)
+                            for action, reference in zip(actions, references)]).reshape(-1, 2)
+        ex_dates = np.array([action['ex_date'].to_datetime64() for action in actions], dtype='datetime64[ns]')
+        # suffix[i] = product of factors of actions i..n-1; suffix[n] = 1
+        suffix = np.ones((len(actions) + 1, 2))
+        suffix[:-1] = np.cumprod(factors[::-1], axis=0)[::-1]
+        if len(tables) >= FACTOR_TABLES_PER_SYMBOL:
+            tables.pop(next(iter(tables)))
+        table = tables[references] = (ex_dates, suffix)
+        return table
+
+    def factors(self, symbol: str, dates, closes) -> Tuple[np.ndarray, np.ndarray]:
+        """Cumulative price and volume factors for every bar of a raw series"""
+        dates = pd.DatetimeIndex(dates).normalize().to_numpy(dtype='datetime64[ns]')
+        if symbol not in self._actions:
+            return np.ones(len(dates)), np.ones(len(dates))
+        ex_dates, suffix = self._factor_table(symbol, dates, np.asarray(closes, dtype=np.float64))
+        # Bars before an ex-date get that action's factor; bars on/after it do not
+        applied = suffix[np.searchsorted(ex_dates, dates, side='right')]
+        return applied[:, 0], applied[:, 1]
+
+    def adjust_frame(self, symbol: str, frame: pd.DataFrame) -> pd.DataFrame:
+        """Back-adjusted copy of an OHLCV frame (TechnicalAnalysis column layout)"""
+        price_factor, volume_factor = self.factors(symbol, frame.index, frame['Close'].to_numpy())
+        adjusted = frame.copy()
+        columns = [column for column in PRICE_COLUMNS if column in frame]
+        adjusted[columns] = frame[columns].to_numpy(dtype=np.float64) * price_factor[:, None]
+        if 'Volume' in frame:
+            adjusted['Volume'] = frame['Volume'].to_numpy() * volume_factor
+        return adjusted
+
+    def adjust_prices(self, symbol: str, dates: List[str], prices: List[float]) -> List[float]:
+        """Back-adjusted copy of a plain close-price list"""
+        if symbol not in self._actions:
+            return list(prices)
+        price_factor, _ = self.factors(symbol, dates, prices)
+        return np.round(np.asarray(prices, dtype=np.float64) * price_factor, 2).tolist()
+
+    def adjust_records(self, symbol: str, records: List[Dict]) -> List[Dict]:
+        """Back-adjusted copy of NepseDataFetcher.get_historical_data() records"""
+        if symbol not in self._actions or not records:
+            return records
+        dates = [record['date'] for record in records]
+        price_factor, volume_factor = self.factors(symbol, dates, [record['close'] for record in records])
+        adjusted = []
+        for record, price_scale, volume_scale in zip(records, price_factor.tolist(), volume_factor.tolist()):
+            record = dict(record)
+            for key in ('open', 'high', 'low', 'close'):
+                record[key] = round(float(record[key]) * price_scale, 2)
+            record['volume'] = int(round(record['volume'] * volume_scale))
+            adjusted.append(record)
+        return adjusted
+
+
+class AdjustedPriceCache:
+    """
+    Raw and back-adjusted price series cached side by side
+    A series is an OHLCV frame or a list of get_historical_data() records;
+    entries are keyed by symbol, or by (symbol, ...) for several windows per symbol.
+    """
+
+    def __init__(self, store: CorporateActionStore):
+        self.store = store
+        self._entries: Dict = {}
+
+    def put(self, symbol: str, raw, key=None):
+        """Store a new raw series; its adjusted twin is built on first request"""
+        self._entries[symbol if key is None else key] = {
+            'symbol': symbol, 'raw': raw, 'adjusted': None, 'version': None, 'stored': datetime.now()
+        }
+
+    def get(self, key, adjusted: bool = True):
+        """Cached series, rebuilding the adjusted one if the actions changed"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not adjusted:
+            return entry['raw']
+        symbol = entry['symbol']
+        version = self.store.version(symbol)
+        if entry['adjusted'] is None or entry['version'] != version:
+            metrics.cache_miss('adjusted_prices')
+            raw = entry['raw']
+            if isinstance(raw, pd.DataFrame):
+                entry['adjusted'] = self.store.adjust_frame(symbol, raw)
+            else:
+                entry['adjusted'] = self.store.adjust_records(symbol, raw)
+            entry['version'] = version
+        else:
+            metrics.cache_hit('adjusted_prices')
+        return entry['adjusted']
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """Drop one symbol's series (or everything)"""
+        if symbol is None:
+            self._entries.clear()
+            return
+        for key in [key for key, entry in self._entries.items() if entry['symbol'] == symbol]:
+            del self._entries[key]
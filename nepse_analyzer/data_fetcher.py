@@ -3,19 +3,68 @@ Data fetcher for Nepal Stock Exchange (NEPSE)
 This module handles fetching real-time and historical stock data
 """
 
-import requests
-import pandas as pd
 from datetime import datetime, timedelta
 import json
 import time
-from bs4 import BeautifulSoup
+
+from market_breadth import MarketBreadth, default_indices
+from metrics import timed
+from resilience import EndpointPolicy, ResilientFetcher
+from symbol_master import SymbolMaster
+
+# Cache/hedging/breaker settings per upstream endpoint
+ENDPOINT_POLICIES = {
+    'live_market': EndpointPolicy(fresh_ttl=5, stale_ttl=60, hedge_after=1.0),
+    # Scraping diffs against the previous page, so it is never hedged
+    'live_scrape': EndpointPolicy(fresh_ttl=2, stale_ttl=60),
+    'stock_details': EndpointPolicy(fresh_ttl=30, stale_ttl=300, hedge_after=1.0),
+    'historical': EndpointPolicy(fresh_ttl=3600, stale_ttl=86400),
+    'indices': EndpointPolicy(fresh_ttl=5, stale_ttl=60, hedge_after=1.0),
+    'market_depth': EndpointPolicy(fresh_ttl=2, stale_ttl=30, hedge_after=1.0),
+}
 
 class NepseDataFetcher:
     """Class to fetch NEPSE stock data from various sources"""
     
-    def __init__(self):
+    def __init__(self, archive_dir=None, market=None, symbol_master=None, corporate_actions=None,
+                 fundamentals=None, resilience=None, scraper=None, bus=None):
+        # requests is imported lazily to keep module import cheap
+        import requests
+        
         self.base_url = "https://www.nepalstock.com"
         self.session = requests.Session()
+        self.symbol_master = symbol_master or SymbolMaster.default()
+        
+        # Optional local archive imported with bulk_io.BulkImporter
+        self.archive = None
+        if archive_dir:
+            from bulk_io import ArchiveReader
+            self.archive = ArchiveReader(archive_dir)
+        
+        # market_breadth.MarketBreadth behind get_market_indices; built on
+        # first use with the default NEPSE and float indices when not given
+        self.market = market
+        
+        # Optional corporate_actions.CorporateActionStore for adjusted history;
+        # raw and adjusted series are then cached side by side
+        self.corporate_actions = corporate_actions
+        self.adjusted_prices = None
+        if corporate_actions is not None:
+            from corporate_actions import AdjustedPriceCache
+            self.adjusted_prices = AdjustedPriceCache(corporate_actions)
+        
+        # Optional fundamentals.FundamentalStore used for valuation figures
+        self.fundamentals = fundamentals
+        
+        # Breaker, hedging and stale-while-revalidate cache around upstream calls
+        self.resilience = resilience or ResilientFetcher(ENDPOINT_POLICIES)
+        
+        # Optional scraper.LiveMarketScraper; without one live data is sample data
+        self.scraper = scraper
+        
+        # Optional events.EventBus; every upstream result is published once
+        self.bus = bus
+        self._published = {}
         
         # Headers to mimic browser request
         self.headers = {
@@ -23,42 +72,140 @@ class NepseDataFetcher:
         }
         self.session.headers.update(self.headers)
     
+    @timed('nepse_fetch_seconds')
     def get_live_market_data(self):
         """Fetch live market data from NEPSE"""
         try:
+            if self.scraper is not None:
+                data = self.resilience.call('live_scrape', None, self._scrape_live_market)
+                self._apply_quotes(data)
+                return data
             # This would be the actual NEPSE API endpoint
             # For now, we'll return sample data structure
-            return self._get_sample_market_data()
+            data = self.resilience.call('live_market', None, self._get_sample_market_data)
+            if self._is_new('live_market', data):
+                self.bus.publish_many('quote', data['stocks'])
+            self._apply_quotes(data)
+            return data
         except Exception as e:
             print(f"Error fetching live data: {e}")
             return None
     
+    @timed('nepse_fetch_seconds')
     def get_stock_details(self, symbol):
         """Get detailed information for a specific stock"""
         try:
             # This would fetch from actual NEPSE API
-            return self._get_sample_stock_details(symbol)
+            return self.resilience.call('stock_details', symbol,
+                                        lambda: self._get_sample_stock_details(symbol))
         except Exception as e:
             print(f"Error fetching stock details for {symbol}: {e}")
             return None
     
-    def get_historical_data(self, symbol, days=30):
-        """Get historical data for a stock"""
+    @timed('nepse_fetch_seconds')
+    def get_market_depth(self, symbol, last_price=None):
+        """
+        Get the best buy and sell levels (L2 order book) of a stock
+        last_price centres the sample book (default: the symbol's last close)
+        """
         try:
-            # This would fetch from actual NEPSE historical data API
-            return self._generate_sample_historical_data(symbol, days)
+            # This would fetch from the NEPSE market depth API
+            key = symbol if last_price is None else (symbol, last_price)
+            depth = self.resilience.call('market_depth', key,
+                                         lambda: self._get_sample_market_depth(symbol, last_price))
+            if self._is_new(('market_depth', symbol), depth):
+                self.bus.publish('depth', depth)
+            return depth
+        except Exception as e:
+            print(f"Error fetching market depth for {symbol}: {e}")
+            return None
+    
+    @timed('nepse_fetch_seconds')
+    def get_historical_data(self, symbol, days=30, adjusted=True):
+        """
+        Get historical data for a stock
+        Prices are back-adjusted for corporate actions when a store is set
+        (pass adjusted=False for the raw traded prices)
+        """
+        try:
+            records = self.resilience.call('historical', (symbol, days),
+                                           lambda: self._load_historical_data(symbol, days))
+            bars = records
+            if self.adjusted_prices is not None:
+                # Adjusted once per upstream result and per change of the symbol's actions
+                key = (symbol, days)
+                if self.adjusted_prices.get(key, adjusted=False) is not records:
+                    self.adjusted_prices.put(symbol, records, key)
+                bars = self.adjusted_prices.get(key)
+            if self._is_new(('historical', symbol, days), records):
+                # Subscribers always get adjusted bars when a store is set
+                self.bus.publish_many('bar', ({'symbol': symbol, **bar} for bar in bars))
+            return bars if adjusted else records
         except Exception as e:
             print(f"Error fetching historical data for {symbol}: {e}")
             return None
     
+    def _load_historical_data(self, symbol, days):
+        """Raw (unadjusted) history from the local archive or the upstream source"""
+        records = None
+        if self.archive is not None:
+            start = datetime.now() - timedelta(days=days)
+            records = self.archive.read_records(symbol, start=start)
+        
+        if not records:
+            # This would fetch from actual NEPSE historical data API
+            records = self._generate_sample_historical_data(symbol, days)
+        return records
+    
+    @timed('nepse_fetch_seconds')
     def get_market_indices(self):
         """Get market indices like NEPSE index"""
         try:
-            return self._get_sample_indices()
+            indices = self.get_market().index_values()
+            if indices:
+                return indices
+            return self.resilience.call('indices', None, self._get_sample_indices)
         except Exception as e:
             print(f"Error fetching market indices: {e}")
             return None
     
+    def get_market(self):
+        """Breadth engine behind the indices, seeded from every listed symbol's history on first use"""
+        if self.market is None:
+            market = MarketBreadth(indices=default_indices(self.symbol_master))
+            histories = {}
+            for symbol in self.symbol_master.symbols():
+                records = self.get_historical_data(symbol, 30)
+                histories[symbol] = [record['close'] for record in records or ()]
+            market.seed(histories)
+            self.market = market
+        return self.market
+    
+    def _apply_quotes(self, data):
+        """Move the indices with live prices once the market has been built"""
+        if self.market is None or not data:
+            return
+        for quote in data['stocks']:
+            if quote.get('price'):
+                self.market.update(quote['symbol'], quote['price'])
+    
+    def _is_new(self, key, value):
+        """True once per upstream result, so cache hits and hedged duplicates are not republished"""
+        if self.bus is None or self._published.get(key) is value:
+            return False
+        self._published[key] = value
+        return True
+    
+    def _scrape_live_market(self):
+        """Scrape the live market page; 'changed'/'removed' list the symbols that moved since the last poll"""
+        changes = self.scraper.fetch(self.session)
+        if self.bus is not None:
+            self.bus.publish_many('quote', changes['changed'])
+        data = self.scraper.snapshot()
+        data['changed'] = [quote['symbol'] for quote in changes['changed']]
+        data['removed'] = changes['removed']
+        return data
+    
     def _get_sample_market_data(self):
         """Generate sample market data for demonstration"""
         stocks = [
@@ -79,23 +226,54 @@ class NepseDataFetcher:
         """Generate sample stock details"""
         import random
         base_price = random.uniform(200, 1200)
+        info = self.symbol_master.get(symbol)
+        shares = info.shares_outstanding if info else random.randint(10000000, 50000000)
+        
+        # P/E comes from reported earnings only; without them it is unknown
+        pe_ratio = None
+        if self.fundamentals is not None and symbol in self.fundamentals:
+            ratios = self.fundamentals.ratios({symbol: base_price})
+            pe_ratio = ratios.at[symbol, 'pe_ratio']
         
         return {
             "symbol": symbol,
-            "name": f"{symbol} Bank Limited",
+            "name": info.name if info else f"{symbol} Limited",
             "current_price": base_price,
             "open": base_price * random.uniform(0.98, 1.02),
             "high": base_price * random.uniform(1.01, 1.05),
             "low": base_price * random.uniform(0.95, 0.99),
             "volume": random.randint(10000, 100000),
-            "market_cap": base_price * random.randint(10000000, 50000000),
-            "pe_ratio": random.uniform(8, 25),
-            "sector": "Banking"
+            "market_cap": base_price * shares,
+            "pe_ratio": pe_ratio,
+            "sector": info.sector if info else "Others",
+            "shares_outstanding": shares,
+            "listed_date": info.listed_date if info else None
+        }
+    
+    def _get_sample_market_depth(self, symbol, last_price=None, levels=5):
+        """Generate a sample order book around the symbol's last price"""
+        import random
+        price = last_price
+        if price is None:
+            records = self.resilience.call('historical', (symbol, 30),
+                                           lambda: self._load_historical_data(symbol, 30))
+            price = records[-1]['close']
+        tick = 0.1 if price < 500 else 1.0
+        bid = round(price - tick, 1)
+        ask = round(price + tick, 1)
+        return {
+            "symbol": symbol,
+            "timestamp": time.time(),
+            "bids": [(round(bid - i * tick, 1), random.randint(10, 2000), random.randint(1, 20))
+                     for i in range(levels)],
+            "asks": [(round(ask + i * tick, 1), random.randint(10, 2000), random.randint(1, 20))
+                     for i in range(levels)]
         }
     
     def _generate_sample_historical_data(self, symbol, days):
         """Generate sample historical data"""
         import numpy as np
+        import pandas as pd
         
         dates = pd.date_range(
             start=datetime.now() - timedelta(days=days),
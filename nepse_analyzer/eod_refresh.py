@@ -0,0 +1,268 @@
+"""
+End-of-day indicator refresh across all CPU cores
+Indicator code holds the GIL (pandas and the `ta` backend entirely, the
+native NumPy backend between array operations), so a full-market refresh is partitioned across a process pool instead
+of threads. Price data is packed once into a single (field x bar) array in
+shared memory (or a memory-mapped file); workers attach to it by name, build
+their frames as views over it and write indicator values straight into a
+shared output array. Nothing but symbol ranges crosses the process boundary,
+so the refresh scales with cores instead of with pickling costs.
+
+The result is an IndicatorStore: one contiguous column per indicator for
+every bar of every symbol, plus per-symbol offsets.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import metrics
+import technical_analysis
+from technical_analysis import TechnicalAnalysis
+
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+INDICATORS = (
+    'sma_10', 'sma_20', 'sma_30', 'ema_20', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_upper', 'bb_middle', 'bb_lower', 'stoch_k', 'stoch_d', 'atr', 'volume_ratio'
+)
+
+# Below this many symbols the pool start-up costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+# Tasks per worker; several small tasks even out symbols of different length
+TASKS_PER_WORKER = 4
+
+
+def compute_indicators(frame: pd.DataFrame, backend: Optional[str] = None) -> Dict[str, pd.Series]:
+    """Every INDICATORS column for one OHLCV frame"""
+    analysis = TechnicalAnalysis(frame, copy=False, backend=backend)
+    if analysis.backend == 'numpy':
+        # One fused pass instead of a call per indicator
+        return dict(analysis.calculate_all(INDICATORS).items())
+    macd = analysis.calculate_macd()
+    bands = analysis.calculate_bollinger_bands()
+    stochastic = analysis.calculate_stochastic()
+    return {
+        'sma_10': analysis.calculate_sma(10),
+        'sma_20': analysis.calculate_sma(20),
+        'sma_30': analysis.calculate_sma(30),
+        'ema_20': analysis.calculate_ema(20),
+        'rsi': analysis.calculate_rsi(),
+        'macd': macd['macd'],
+        'macd_signal': macd['signal'],
+        'macd_histogram': macd['histogram'],
+        'bb_upper': bands['upper'],
+        'bb_middle': bands['middle'],
+        'bb_lower': bands['lower'],
+        'stoch_k': stochastic['k'],
+        'stoch_d': stochastic['d'],
+        'atr': analysis.calculate_atr(),
+        'volume_ratio': analysis.calculate_volume_indicators()['volume_ratio'],
+    }
+
+
+# --- Shared arrays ----------------------------------------------------------
+
+def _create_array(shape: Tuple[int, ...], dtype, transport: str, workdir: Optional[str], name: str):
+    """(spec, array, handle) for a new shared array; spec is what workers attach with"""
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    if transport == 'shm':
+        handle = shared_memory.SharedMemory(create=True, size=size)
+        array = np.ndarray(shape, dtype=dtype, buffer=handle.buf)
+        return ('shm', handle.name, shape, dtype.str), array, handle
+    path = os.path.join(workdir, f"{name}.dat")
+    array = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+    return ('memmap', path, shape, dtype.str), array, None
+
+
+def _attach_array(spec):
+    """(array, handle) for a spec from _create_array, in a worker process"""
+    transport, location, shape, dtype = spec
+    if transport == 'shm':
+        handle = shared_memory.SharedMemory(name=location)
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=handle.buf), handle
+    return np.memmap(location, dtype=np.dtype(dtype), mode='r+', shape=shape), None
+
+
+# Per-worker state set by _init_worker
+_worker = {}
+
+
+def _init_worker(prices_spec, dates_spec, offsets, output_spec):
+    """Attach the shared price, date and output arrays once per worker process"""
+    prices, prices_handle = _attach_array(prices_spec)
+    dates, dates_handle = _attach_array(dates_spec)
+    output, output_handle = _attach_array(output_spec)
+    _worker.update(prices=prices, dates=dates, offsets=offsets, output=output,
+                   handles=(prices_handle, dates_handle, output_handle))
+
+
+def _refresh_range(positions: List[int]) -> int:
+    """Compute indicators for the symbols at `positions` into the shared output"""
+    return _compute_into(_worker['prices'], _worker['dates'], _worker['offsets'], _worker['output'], positions)
+
+
+def _compute_into(prices: np.ndarray, dates: np.ndarray, offsets: np.ndarray,
+                  output: np.ndarray, positions: List[int]) -> int:
+    """Indicator rows for the given symbols; returns the number of bars done"""
+    bars = 0
+    for position in positions:
+        start, end = offsets[position], offsets[position + 1]
+        if end == start:
+            continue
+        if technical_analysis.DEFAULT_BACKEND == 'numpy':
+            # The native indicators take the shared rows as they are; no frame is needed
+            high, low, close, volume = (prices[PRICE_FIELDS.index(field), start:end]
+                                        for field in ('High', 'Low', 'Close', 'Volume'))
+            for row, values in enumerate(indicators.compute_all(high, low, close, volume, INDICATORS).values()):
+                output[row, start:end] = values
+            bars += end - start
+            continue
+        # Columns are views over the shared buffer; nothing is copied in
+        frame = pd.DataFrame(
+            {field: prices[row, start:end] for row, field in enumerate(PRICE_FIELDS)},
+            index=pd.DatetimeIndex(dates[start:end]), copy=False
+        )
+        for row, values in enumerate(compute_indicators(frame).values()):
+            output[row, start:end] = values.to_numpy(dtype=np.float64)
+        bars += end - start
+    return bars
+
+
+def partition(lengths: List[int], parts: int) -> List[List[int]]:
+    """Split symbol positions into `parts` groups of similar total length (longest first)"""
+    groups = [[] for _ in range(max(1, parts))]
+    totals = [0] * len(groups)
+    for position in sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True):
+        smallest = totals.index(min(totals))
+        groups[smallest].append(position)
+        totals[smallest] += lengths[position]
+    return [group for group in groups if group]
+
+
+# --- Store ------------------------------------------------------------------
+
+class IndicatorStore:
+    """Columnar indicator values for every bar of every symbol"""
+
+    def __init__(self, symbols: List[str], offsets: np.ndarray, dates: np.ndarray,
+                 values: np.ndarray, handles: Tuple = ()):
+        self.symbols = list(symbols)
+        self.offsets = offsets
+        self.dates = dates
+        self.values = values               # shape (len(INDICATORS), total bars)
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # Keeps shared buffers mapped for as long as the store lives
+        self._handles = handles
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._positions
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def column(self, indicator: str) -> np.ndarray:
+        """One indicator for all bars of all symbols (see offsets)"""
+        return self.values[INDICATORS.index(indicator)]
+
+    def series(self, symbol: str) -> pd.DataFrame:
+        """All indicators of one symbol, indexed by date"""
+        position = self._positions[symbol]
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return pd.DataFrame(self.values[:, start:end].T, columns=list(INDICATORS),
+                            index=pd.DatetimeIndex(self.dates[start:end]))
+
+    def latest(self) -> pd.DataFrame:
+        """Last bar's indicators per symbol (symbols without bars are left out)"""
+        lengths = np.diff(self.offsets)
+        has_bars = lengths > 0
+        last = self.offsets[1:][has_bars] - 1
+        return pd.DataFrame(self.values[:, last].T, columns=list(INDICATORS),
+                            index=pd.Index(np.asarray(self.symbols)[has_bars], name='symbol'))
+
+
+# --- Engine -----------------------------------------------------------------
+
+class EODRefresh:
+    """Full-market indicator refresh over a process pool"""
+
+    def __init__(self, workers: Optional[int] = None, transport: str = 'shm', workdir: Optional[str] = None):
+        """
+        transport: 'shm' (multiprocessing shared memory) or 'memmap'
+        (memory-mapped files in workdir, a temporary directory by default)
+        """
+        if transport not in ('shm', 'memmap'):
+            raise ValueError(f"Unknown transport: {transport}")
+        self.workers = workers or os.cpu_count() or 1
+        self.transport = transport
+        self.workdir = workdir
+
+    @metrics.timed('nepse_eod_refresh_seconds')
+    def run(self, frames: Dict[str, pd.DataFrame]) -> IndicatorStore:
+        """Indicators for every symbol's OHLCV frame (TechnicalAnalysis column layout)"""
+        symbols = list(frames)
+        lengths = [len(frames[symbol]) for symbol in symbols]
+        offsets = np.zeros(len(symbols) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        total = int(offsets[-1])
+
+        workdir = self.workdir
+        temporary = self.transport == 'memmap' and workdir is None
+        if temporary:
+            workdir = tempfile.mkdtemp(prefix='nepse-eod-')
+
+        handles = []
+        try:
+            prices_spec, prices, handle = _create_array((len(PRICE_FIELDS), total), np.float64,
+                                                        self.transport, workdir, 'prices')
+            handles.append(handle)
+            dates_spec, dates, handle = _create_array((total,), 'datetime64[ns]', self.transport, workdir, 'dates')
+            handles.append(handle)
+            output_spec, output, output_handle = _create_array((len(INDICATORS), total), np.float64,
+                                                               self.transport, workdir, 'indicators')
+            handles.append(output_handle)
+
+            # Pack every symbol into the shared input once
+            for symbol, start, end in zip(symbols, offsets[:-1], offsets[1:]):
+                frame = frames[symbol]
+                for row, field in enumerate(PRICE_FIELDS):
+                    prices[row, start:end] = frame[field].to_numpy(dtype=np.float64)
+                dates[start:end] = frame.index.to_numpy(dtype='datetime64[ns]')
+            output[:] = np.nan
+
+            if self.workers <= 1 or len(symbols) < PARALLEL_THRESHOLD:
+                _compute_into(prices, dates, offsets, output, list(range(len(symbols))))
+            else:
+                tasks = partition(lengths, self.workers * TASKS_PER_WORKER)
+                with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(prices_spec, dates_spec, offsets, output_spec)) as pool:
+                    list(pool.map(_refresh_range, tasks))
+
+            metrics.inc('nepse_eod_symbols_total', len(symbols))
+            # The store keeps its own copy of the dates; the output buffer is kept mapped
+            store_dates = np.array(dates)
+            if self.transport == 'memmap':
+                output.flush()
+            return IndicatorStore(symbols, offsets, store_dates, output,
+                                  (output_handle,) if output_handle is not None else ())
+        finally:
+            # Existing mappings (including the store's) stay valid after unlink
+            for handle in handles:
+                if handle is not None:
+                    handle.unlink()
+            if temporary:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_archive(self, reader, symbols: Optional[List[str]] = None, start=None, end=None) -> IndicatorStore:
+        """Refresh straight from a bulk_io.ArchiveReader"""
+        symbols = symbols or reader.symbols()
+        return self.run({symbol: reader.read_ohlcv(symbol, start, end) for symbol in symbols})
@@ -0,0 +1,441 @@
+"""
+In-process event bus for NEPSE data
+NepseDataFetcher publishes each upstream result once; analytics stages and
+UIs subscribe instead of pulling and recomputing on their own. Topics are
+typed (every event of a topic carries the topic's required fields):
+
+    quote      live quote of a symbol (symbol, price, ...)
+    bar        one OHLCV bar (symbol, date, open, high, low, close, volume)
+    indicator  an AdvancedNepseAnalyzer.analyze_stock() result
+    signal     a trading recommendation (symbol, recommendation, ...)
+    depth      an L2 order book snapshot (symbol, bids, asks)
+
+Each subscriber has its own bounded queue, so a slow consumer never holds
+up the publisher or the other subscribers. Consumers run on their own
+thread, as asyncio tasks, or inline in the publishing thread (for cheap
+ones such as LatestValues). Batching subscribers receive everything that
+queued up while they were busy, optionally coalesced to the latest event
+per symbol.
+"""
+
+import asyncio
+import inspect
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import metrics
+
+# Required payload fields per topic
+TOPIC_FIELDS = {
+    'quote': ('symbol', 'price'),
+    'bar': ('symbol', 'date', 'open', 'high', 'low', 'close', 'volume'),
+    'indicator': ('symbol',),
+    'signal': ('symbol', 'recommendation'),
+    'depth': ('symbol', 'bids', 'asks'),
+}
+TOPICS = tuple(TOPIC_FIELDS)
+
+OVERFLOW_POLICIES = ('drop_oldest', 'block')
+
+
+class Event:
+    """One published message"""
+
+    __slots__ = ('topic', 'symbol', 'data', 'timestamp', 'sequence')
+
+    def __init__(self, topic: str, data: Dict, sequence: int):
+        self.topic = topic
+        self.symbol = data.get('symbol')
+        self.data = data
+        self.timestamp = time.time()
+        self.sequence = sequence
+
+    def __repr__(self):
+        return f"Event({self.topic!r}, {self.symbol!r}, #{self.sequence})"
+
+
+class Subscription:
+    """A consumer's bounded queue; subclasses decide where the handler runs"""
+
+    def __init__(self, bus: 'EventBus', topics: Tuple[str, ...], handler: Callable,
+                 batch: bool = False, max_batch: int = 500, maxsize: int = 1000,
+                 coalesce: bool = False, overflow: str = 'drop_oldest', name: Optional[str] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.bus = bus
+        self.topics = topics
+        self.handler = handler
+        self.batch = batch
+        self.max_batch = max_batch
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        self.overflow = overflow
+        self.name = name or getattr(handler, '__name__', 'subscriber')
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.closed = False
+        self._queue = deque()
+        self._busy = False
+        self._cond = threading.Condition()
+
+    @property
+    def pending(self) -> int:
+        """Events waiting in the queue"""
+        return len(self._queue)
+
+    def offer(self, event: Event):
+        """Queue an event (called by the bus in the publishing thread)"""
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == 'block':
+                    while len(self._queue) >= self.maxsize and not self.closed:
+                        self._cond.wait()
+                    if self.closed:
+                        return
+                else:
+                    self._queue.popleft()
+                    self.dropped += 1
+                    metrics.inc('nepse_events_dropped_total', subscriber=self.name)
+            self._queue.append(event)
+            self._cond.notify_all()
+        self._wake()
+
+    def _wake(self):
+        """Hook for subscriptions that are not woken through the condition"""
+
+    def _take(self) -> List[Event]:
+        """Dequeue the next event, or up to max_batch events when batching"""
+        with self._cond:
+            count = min(len(self._queue), self.max_batch if self.batch else 1)
+            events = [self._queue.popleft() for _ in range(count)]
+            self._busy = bool(events)
+            self._cond.notify_all()
+            return events
+
+    def _deliver(self, events: List[Event]):
+        """Call the handler; returns whatever it returned (None on error)"""
+        if self.coalesce and len(events) > 1:
+            # Latest event per (topic, symbol), in order of last arrival
+            latest = {(event.topic, event.symbol): event for event in events}
+            events = sorted(latest.values(), key=lambda event: event.sequence)
+        try:
+            result = self.handler(events if self.batch else events[0])
+            self.delivered += len(events)
+            return result
+        except Exception as e:
+            self.errors += 1
+            metrics.inc('nepse_errors_total', metric='event_handler', subscriber=self.name)
+            print(f"Event handler {self.name} failed: {e}")
+            return None
+
+    def _done(self):
+        """Mark the current batch as handled"""
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event was handled; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self._queue or self._busy) and not self.closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        """Stop delivering; queued events are discarded"""
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        self._wake()
+        self.bus.unsubscribe(self)
+
+
+class InlineSubscription(Subscription):
+    """Handler runs in the publishing thread; only for cheap handlers"""
+
+    def offer(self, event: Event):
+        if not self.closed:
+            self._deliver([event])
+
+
+class ThreadSubscription(Subscription):
+    """Handler runs on a dedicated daemon thread"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._thread = threading.Thread(target=self._run, name=f"nepse-events-{self.name}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self.closed:
+                    self._cond.wait()
+                if self.closed:
+                    return
+            events = self._take()
+            if events:
+                self._deliver(events)
+                self._done()
+
+
+class AsyncSubscription(Subscription):
+    """Handler (plain function or coroutine function) runs as an asyncio task"""
+
+    def __init__(self, *args, loop: asyncio.AbstractEventLoop, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.overflow == 'block':
+            # A publisher on the loop thread would wait for itself
+            raise ValueError("Async subscribers cannot use the 'block' overflow policy")
+        self.loop = loop
+        self._wakeup = asyncio.Event()
+        self._wake_pending = False
+        self.task = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    def _wake(self):
+        with self._cond:
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self._set_wakeup)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    def _set_wakeup(self):
+        with self._cond:
+            self._wake_pending = False
+        self._wakeup.set()
+
+    async def _run(self):
+        while not self.closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while not self.closed:
+                events = self._take()
+                if not events:
+                    break
+                result = self._deliver(events)
+                if inspect.isawaitable(result):
+                    try:
+                        await result
+                    except Exception as e:
+                        self.errors += 1
+                        print(f"Event handler {self.name} failed: {e}")
+                self._done()
+
+
+class EventBus:
+    """Typed publish/subscribe hub with a bounded queue per subscriber"""
+
+    def __init__(self, topic_fields: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.topic_fields = dict(TOPIC_FIELDS if topic_fields is None else topic_fields)
+        self._subscribers: Dict[str, Tuple[Subscription, ...]] = {topic: () for topic in self.topic_fields}
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def register_topic(self, topic: str, fields: Iterable[str] = ('symbol',)):
+        """Add a topic with its required payload fields"""
+        with self._lock:
+            self.topic_fields[topic] = tuple(fields)
+            self._subscribers.setdefault(topic, ())
+
+    def publish(self, topic: str, data: Dict) -> Event:
+        """Validate a payload and queue it for every subscriber of the topic"""
+        fields = self.topic_fields.get(topic)
+        if fields is None:
+            raise ValueError(f"Unknown topic: {topic}")
+        missing = [field for field in fields if field not in data]
+        if missing:
+            raise ValueError(f"{topic} event is missing {', '.join(missing)}")
+        event = Event(topic, data, next(self._sequence))
+        # Subscriber tuples are replaced, never mutated, so no lock is needed here
+        for subscription in self._subscribers[topic]:
+            subscription.offer(event)
+        metrics.inc('nepse_events_published_total', topic=topic)
+        return event
+
+    def publish_many(self, topic: str, items: Iterable[Dict]) -> int:
+        """Publish several payloads; returns how many were published"""
+        count = 0
+        for data in items:
+            self.publish(topic, data)
+            count += 1
+        return count
+
+    def _add(self, subscription: Subscription) -> Subscription:
+        with self._lock:
+            for topic in subscription.topics:
+                if topic not in self.topic_fields:
+                    raise ValueError(f"Unknown topic: {topic}")
+            for topic in subscription.topics:
+                self._subscribers[topic] = self._subscribers[topic] + (subscription,)
+        return subscription
+
+    def subscribe(self, topics: Union[str, Iterable[str]], handler: Callable, **options) -> Subscription:
+        """
+        Consume on a dedicated thread
+        Options: batch (handler gets a list), max_batch, maxsize, coalesce
+        (latest event per symbol within a batch), overflow ('drop_oldest'
+        or 'block' for back-pressure on the publisher), name
+        """
+        return self._add(ThreadSubscription(self, _topics(topics), handler, **options))
+
+    def subscribe_async(self, topics: Union[str, Iterable[str]], handler: Callable,
+                        loop: Optional[asyncio.AbstractEventLoop] = None, **options) -> Subscription:
+        """Consume as a task on an asyncio loop (the running one by default)"""
+        loop = loop or asyncio.get_running_loop()
+        return self._add(AsyncSubscription(self, _topics(topics), handler, loop=loop, **options))
+
+    def subscribe_inline(self, topics: Union[str, Iterable[str]], handler: Callable, **options) -> Subscription:
+        """Consume synchronously in the publishing thread"""
+        return self._add(InlineSubscription(self, _topics(topics), handler, **options))
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscription from its topics"""
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic] = tuple(
+                    other for other in self._subscribers.get(topic, ()) if other is not subscription
+                )
+
+    def subscriptions(self) -> List[Subscription]:
+        """Every active subscription"""
+        with self._lock:
+            seen = {}
+            for subscriptions in self._subscribers.values():
+                for subscription in subscriptions:
+                    seen[id(subscription)] = subscription
+            return list(seen.values())
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every thread subscriber drained its queue"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for subscription in self.subscriptions():
+            if isinstance(subscription, ThreadSubscription):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not subscription.join(remaining):
+                    return False
+        return True
+
+    def close(self):
+        """Close every subscription"""
+        for subscription in self.subscriptions():
+            subscription.close()
+
+    def stats(self) -> List[Dict]:
+        """Queue depth and delivery counters per subscription"""
+        return [
+            {
+                'name': subscription.name,
+                'topics': list(subscription.topics),
+                'pending': subscription.pending,
+                'delivered': subscription.delivered,
+                'dropped': subscription.dropped,
+                'errors': subscription.errors,
+            }
+            for subscription in self.subscriptions()
+        ]
+
+
+def _topics(topics: Union[str, Iterable[str]]) -> Tuple[str, ...]:
+    return (topics,) if isinstance(topics, str) else tuple(topics)
+
+
+class LatestValues:
+    """Latest payload per (topic, symbol); lets UIs read state without fetching"""
+
+    def __init__(self, bus: EventBus, topics: Iterable[str] = TOPICS):
+        self._values: Dict[Tuple[str, str], Dict] = {}
+        self.version = 0
+        self.subscription = bus.subscribe_inline(tuple(topics), self._store, name='latest_values')
+
+    def _store(self, event: Event):
+        self._values[(event.topic, event.symbol)] = event.data
+        self.version += 1
+
+    def get(self, topic: str, symbol: str) -> Optional[Dict]:
+        """Latest payload of a topic for a symbol"""
+        return self._values.get((topic, symbol))
+
+    def all(self, topic: str) -> Dict[str, Dict]:
+        """{symbol: latest payload} of a topic"""
+        return {symbol: data for (kind, symbol), data in list(self._values.items()) if kind == topic}
+
+
+class AnalyticsStage:
+    """
+    Quote -> indicator/signal stage: re-analyzes the symbols whose quotes
+    arrived (each symbol once per batch) and publishes the results
+    """
+
+    def __init__(self, bus: EventBus, analyzer, max_batch: int = 500):
+        self.bus = bus
+        self.analyzer = analyzer
+        self.subscription = bus.subscribe('quote', self._on_quotes, batch=True, coalesce=True,
+                                          max_batch=max_batch, name='analytics')
+
+    def _on_quotes(self, events: List[Event]):
+        for event in events:
+            self.analyzer.update_price(event.symbol, event.data['price'])
+        symbols = [event.symbol for event in events]
+        if hasattr(self.analyzer, 'analyze_many'):
+            results = self.analyzer.analyze_many(symbols)
+        else:
+            results = [self.analyzer.analyze_stock(symbol) for symbol in symbols]
+        for result in results:
+            if 'error' in result:
+                continue
+            self.bus.publish('indicator', result)
+            self.bus.publish('signal', {
+                'symbol': result['symbol'],
+                'recommendation': result['recommendation'],
+                'price': result['current_price'],
+            })
+
+    def close(self):
+        self.subscription.close()
+
+
+class MarketFeed:
+    """Polls a NepseDataFetcher's live market (and order books) on a thread; the fetcher publishes"""
+
+    def __init__(self, fetcher, interval: float = 5.0, depth_symbols: Iterable[str] = ()):
+        self.fetcher = fetcher
+        self.interval = interval
+        # Symbols whose market depth is polled along with the live market
+        self.depth_symbols = list(depth_symbols)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'MarketFeed':
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='nepse-market-feed', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.fetcher.get_live_market_data()
+            for symbol in self.depth_symbols:
+                self.fetcher.get_market_depth(symbol)
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,205 @@
+"""
+Floorsheet (trade-level) analytics for NEPSE
+Stores every trade in per-symbol column arrays sorted by date so that
+broker flow, VWAP and large-trade queries are slices plus vectorized
+reductions instead of row loops
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+TRADE_FIELDS = ('date', 'buyer', 'seller', 'quantity', 'rate')
+
+
+class FloorsheetStore:
+    """Columnar, per-symbol store of floorsheet trades"""
+
+    def __init__(self):
+        # symbol -> {'date': int64 ns, 'buyer': int32, 'seller': int32,
+        #            'quantity': int64, 'rate': float64, 'amount': float64}
+        self._columns: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def from_frame(cls, trades: pd.DataFrame) -> 'FloorsheetStore':
+        """Build a store from a floorsheet DataFrame"""
+        store = cls()
+        store.add_trades(trades)
+        return store
+
+    @classmethod
+    def from_archive(cls, reader, symbols: Optional[List[str]] = None) -> 'FloorsheetStore':
+        """Build a store from a bulk_io.ArchiveReader floorsheet dataset"""
+        store = cls()
+        for batch in reader.iter_batches('floorsheet', symbols):
+            store.add_trades(batch.to_pandas())
+        return store
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one trade"""
+        return sorted(self._columns)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._columns
+
+    def __len__(self) -> int:
+        return sum(len(cols['date']) for cols in self._columns.values())
+
+    def add_trades(self, trades: pd.DataFrame):
+        """
+        Append trades (columns: symbol, date, buyer, seller, quantity, rate)
+        Each affected symbol is merged once per call, so loading a day's
+        floorsheet costs one concatenation per symbol
+        """
+        if trades.empty:
+            return
+
+        dates = pd.to_datetime(trades['date']).to_numpy(dtype='datetime64[ns]').view('int64')
+        codes, names = pd.factorize(trades['symbol'].astype(str).str.upper())
+        buyer = trades['buyer'].to_numpy(dtype=np.int32)
+        seller = trades['seller'].to_numpy(dtype=np.int32)
+        quantity = trades['quantity'].to_numpy(dtype=np.int64)
+        rate = trades['rate'].to_numpy(dtype=np.float64)
+
+        order = np.lexsort((dates, codes))
+        codes = codes[order]
+        boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(codes)]))
+
+        for start, end in zip(starts, ends):
+            idx = order[start:end]
+            new = {
+                'date': dates[idx],
+                'buyer': buyer[idx],
+                'seller': seller[idx],
+                'quantity': quantity[idx],
+                'rate': rate[idx],
+            }
+            new['amount'] = new['quantity'] * new['rate']
+            self._merge(names[codes[start]], new)
+
+    def _merge(self, symbol: str, new: Dict[str, np.ndarray]):
+        """Merge sorted trades for one symbol into its column arrays"""
+        existing = self._columns.get(symbol)
+        if existing is None:
+            self._columns[symbol] = new
+            return
+
+        merged = {name: np.concatenate((existing[name], new[name])) for name in existing}
+        if new['date'][0] < existing['date'][-1]:
+            # Out-of-order load (e.g. backfill); restore date order
+            order = np.argsort(merged['date'], kind='stable')
+            merged = {name: values[order] for name, values in merged.items()}
+        self._columns[symbol] = merged
+
+    def _slice(self, symbol: str, start=None, end=None) -> Optional[Dict[str, np.ndarray]]:
+        """Return views over one symbol's trades between start and end (inclusive)"""
+        cols = self._columns.get(symbol)
+        if cols is None:
+            return None
+
+        lo, hi = 0, len(cols['date'])
+        if start is not None:
+            lo = np.searchsorted(cols['date'], pd.Timestamp(start).value, side='left')
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                end += pd.Timedelta(days=1) - pd.Timedelta(1)
+            hi = np.searchsorted(cols['date'], end.value, side='right')
+        return {name: values[lo:hi] for name, values in cols.items()}
+
+    def vwap(self, symbol: str, start=None, end=None) -> Optional[float]:
+        """Volume weighted average price over a period"""
+        cols = self._slice(symbol, start, end)
+        if cols is None or not len(cols['quantity']):
+            return None
+        return round(float(cols['amount'].sum() / cols['quantity'].sum()), 2)
+
+    def daily_vwap(self, symbol: str, start=None, end=None) -> pd.Series:
+        """VWAP per trading day"""
+        cols = self._slice(symbol, start, end)
+        if cols is None or not len(cols['quantity']):
+            return pd.Series(dtype='float64')
+
+        days = cols['date'] // 86_400_000_000_000
+        unique_days, day_idx = np.unique(days, return_inverse=True)
+        amount = np.bincount(day_idx, weights=cols['amount'])
+        quantity = np.bincount(day_idx, weights=cols['quantity'])
+        index = pd.to_datetime(unique_days * 86_400_000_000_000)
+        return pd.Series(amount / quantity, index=index, name='vwap').round(2)
+
+    def broker_net(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        """Net buy/sell quantity and amount per broker, largest net buyers first"""
+        cols = self._slice(symbol, start, end)
+        if cols is None or not len(cols['quantity']):
+            return pd.DataFrame(columns=['buy_qty', 'sell_qty', 'net_qty', 'net_amount'])
+
+        size = int(max(cols['buyer'].max(), cols['seller'].max())) + 1
+        buy_qty = np.bincount(cols['buyer'], weights=cols['quantity'], minlength=size)
+        sell_qty = np.bincount(cols['seller'], weights=cols['quantity'], minlength=size)
+        buy_amt = np.bincount(cols['buyer'], weights=cols['amount'], minlength=size)
+        sell_amt = np.bincount(cols['seller'], weights=cols['amount'], minlength=size)
+
+        active = np.flatnonzero((buy_qty > 0) | (sell_qty > 0))
+        frame = pd.DataFrame({
+            'buy_qty': buy_qty[active].astype(np.int64),
+            'sell_qty': sell_qty[active].astype(np.int64),
+            'net_qty': (buy_qty[active] - sell_qty[active]).astype(np.int64),
+            'net_amount': (buy_amt[active] - sell_amt[active]).round(2)
+        }, index=pd.Index(active, name='broker'))
+        return frame.sort_values('net_qty', ascending=False)
+
+    def large_trades(self, symbol: str, start=None, end=None,
+                     min_amount: Optional[float] = None, quantile: float = 0.99) -> pd.DataFrame:
+        """
+        Trades at or above min_amount, or above the given amount quantile
+        of the period when no absolute threshold is set
+        """
+        cols = self._slice(symbol, start, end)
+        if cols is None or not len(cols['quantity']):
+            return pd.DataFrame(columns=list(TRADE_FIELDS) + ['amount'])
+
+        threshold = min_amount if min_amount is not None else np.quantile(cols['amount'], quantile)
+        mask = cols['amount'] >= threshold
+        frame = pd.DataFrame({name: values[mask] for name, values in cols.items()})
+        frame['date'] = pd.to_datetime(frame['date'])
+        return frame.sort_values('amount', ascending=False).reset_index(drop=True)
+
+    def broker_concentration(self, symbol: str, start=None, end=None, top_n: int = 5) -> Dict[str, float]:
+        """
+        Herfindahl index and top-N share of buy and sell quantity
+        HHI ranges from 1/brokers (evenly spread) to 1 (single broker)
+        """
+        cols = self._slice(symbol, start, end)
+        if cols is None or not len(cols['quantity']):
+            return {}
+
+        result = {}
+        for side in ('buyer', 'seller'):
+            volume = np.bincount(cols[side], weights=cols['quantity'])
+            shares = volume[volume > 0] / volume.sum()
+            top = np.sort(shares)[::-1][:top_n]
+            result[f'{side}_hhi'] = round(float(np.dot(shares, shares)), 4)
+            result[f'{side}_top{top_n}_share'] = round(float(top.sum()), 4)
+        return result
+
+    def summary(self, symbol: str, start=None, end=None) -> Optional[Dict]:
+        """Compact floorsheet summary used by AdvancedNepseAnalyzer.analyze_stock"""
+        cols = self._slice(symbol, start, end)
+        if cols is None or not len(cols['quantity']):
+            return None
+
+        net = self.broker_net(symbol, start, end)
+        large = self.large_trades(symbol, start, end)
+        return {
+            'trades': int(len(cols['quantity'])),
+            'traded_quantity': int(cols['quantity'].sum()),
+            'turnover': round(float(cols['amount'].sum()), 2),
+            'vwap': self.vwap(symbol, start, end),
+            'top_buyer': int(net.index[0]) if len(net) else None,
+            'top_seller': int(net.index[-1]) if len(net) else None,
+            'large_trades': int(len(large)),
+            'concentration': self.broker_concentration(symbol, start, end)
+        }
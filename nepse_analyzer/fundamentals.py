@@ -0,0 +1,177 @@
+"""
+Fundamental data for NEPSE listed companies
+Quarterly report figures (EPS, book value, dividend, NPL, CAR, ...) are
+kept in a columnar frame indexed by (symbol, period). Valuation ratios
+(P/E, P/B, dividend yield, ROE, EPS growth) are computed for the whole
+market at once so the screener can combine them with technical filters.
+"""
+
+import csv
+import random
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Figures of one quarterly report; EPS is annualized as published by NEPSE companies
+REPORT_FIELDS = (
+    'eps', 'book_value', 'dividend_per_share', 'net_profit', 'npl', 'car'
+)
+
+# Screener criteria on the ratio table: criterion -> (column, comparison)
+CRITERIA = {
+    'min_pe': ('pe_ratio', '>='),
+    'max_pe': ('pe_ratio', '<='),
+    'min_pb': ('pb_ratio', '>='),
+    'max_pb': ('pb_ratio', '<='),
+    'min_dividend_yield': ('dividend_yield', '>='),
+    'min_roe': ('roe', '>='),
+    'min_eps_growth': ('eps_growth', '>='),
+    'max_npl': ('npl', '<='),
+    'min_car': ('car', '>='),
+}
+
+
+def period_key(fiscal_year: str, quarter: int) -> int:
+    """Sortable period number from a fiscal year like '2080/81' and quarter 1-4"""
+    return int(str(fiscal_year).split('/')[0]) * 4 + int(quarter) - 1
+
+
+class FundamentalStore:
+    """Quarterly fundamentals in a (symbol, period) indexed frame"""
+
+    def __init__(self):
+        self._reports = pd.DataFrame(
+            columns=['fiscal_year', 'quarter'] + list(REPORT_FIELDS),
+            index=pd.MultiIndex.from_arrays([[], []], names=['symbol', 'period'])
+        )
+        self.version = 0
+        self._latest = None
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'FundamentalStore':
+        """Load reports from a CSV with symbol,fiscal_year,quarter and REPORT_FIELDS columns"""
+        with open(path, newline='') as handle:
+            records = list(csv.DictReader(handle))
+        store = cls()
+        store.ingest(records)
+        return store
+
+    @classmethod
+    def sample(cls, symbol_master, quarters: int = 8, seed: int = 42) -> 'FundamentalStore':
+        """Seeded sample reports for every symbol in a SymbolMaster"""
+        rng = random.Random(seed)
+        records = []
+        for info in (symbol_master.get(symbol) for symbol in symbol_master.symbols()):
+            eps = rng.uniform(10, 60)
+            book_value = rng.uniform(120, 300)
+            is_bank = info.sector == 'Commercial Banks'
+            for offset in range(quarters):
+                period = 2079 * 4 + offset
+                eps *= rng.uniform(0.95, 1.08)
+                records.append({
+                    'symbol': info.symbol,
+                    'fiscal_year': f"{period // 4}/{(period // 4 + 1) % 100:02d}",
+                    'quarter': period % 4 + 1,
+                    'eps': round(eps, 2),
+                    'book_value': round(book_value * (1 + 0.02 * offset), 2),
+                    'dividend_per_share': round(rng.uniform(0, 20), 2),
+                    'net_profit': round(eps * info.shares_outstanding / 4),
+                    'npl': round(rng.uniform(0.5, 4.0), 2) if is_bank else None,
+                    'car': round(rng.uniform(11, 15), 2) if is_bank else None,
+                })
+        store = cls()
+        store.ingest(records)
+        return store
+
+    def ingest(self, records: Union[pd.DataFrame, Iterable[Dict]]):
+        """Add or replace quarterly reports (one per symbol, fiscal year and quarter)"""
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        if frame.empty:
+            return
+        frame = frame.copy()
+        frame['symbol'] = frame['symbol'].astype(str).str.strip().str.upper()
+        frame['quarter'] = frame['quarter'].astype(int)
+        frame['period'] = [period_key(year, quarter) for year, quarter in zip(frame['fiscal_year'], frame['quarter'])]
+        for field in REPORT_FIELDS:
+            frame[field] = pd.to_numeric(frame[field], errors='coerce') if field in frame else np.nan
+        frame = frame.set_index(['symbol', 'period'])[self._reports.columns]
+
+        combined = pd.concat([self._reports, frame]) if len(self._reports) else frame
+        combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+        self._reports = combined
+        self.version += 1
+        self._latest = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._reports.index.get_level_values('symbol')
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one report"""
+        return list(self._reports.index.get_level_values('symbol').unique())
+
+    def history(self, symbol: str) -> pd.DataFrame:
+        """All reports of one symbol, oldest first"""
+        return self._reports.xs(symbol, level='symbol')
+
+    def latest(self) -> pd.DataFrame:
+        """Latest report per symbol plus year-over-year EPS growth (cached per version)"""
+        if self._latest is not None:
+            metrics.cache_hit('fundamentals_latest')
+            return self._latest
+        metrics.cache_miss('fundamentals_latest')
+
+        reports = self._reports
+        latest = reports.groupby(level='symbol').tail(1)
+        # Same quarter a year earlier is period - 4, looked up by key so a
+        # missing report gives NaN growth instead of comparing other quarters
+        symbols = latest.index.get_level_values('symbol')
+        periods = latest.index.get_level_values('period')
+        year_ago = pd.MultiIndex.from_arrays([symbols, periods - 4], names=['symbol', 'period'])
+        previous_eps = reports['eps'].reindex(year_ago).to_numpy()
+        latest = latest.assign(eps_growth=(latest['eps'].to_numpy() / previous_eps - 1) * 100)
+        latest = latest.droplevel('period')
+        self._latest = latest
+        return latest
+
+    def ratios(self, prices: Union[Dict[str, float], pd.Series]) -> pd.DataFrame:
+        """
+        Valuation ratios for every symbol with both a price and a report
+        Non-positive EPS or book value gives NaN instead of a misleading ratio
+        """
+        prices = pd.Series(prices, dtype=np.float64)
+        latest = self.latest()
+        table = latest.join(prices.rename('price'), how='inner')
+
+        price = table['price'].to_numpy()
+        eps = table['eps'].to_numpy(dtype=np.float64)
+        book = table['book_value'].to_numpy(dtype=np.float64)
+        dividend = table['dividend_per_share'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['pe_ratio'] = np.where(eps > 0, price / eps, np.nan)
+            table['pb_ratio'] = np.where(book > 0, price / book, np.nan)
+            table['dividend_yield'] = np.where(price > 0, dividend / price * 100, np.nan)
+            table['roe'] = np.where(book > 0, eps / book * 100, np.nan)
+        return table.round(2)
+
+    def screen(self, prices: Union[Dict[str, float], pd.Series], criteria: Dict) -> pd.DataFrame:
+        """Ratio table filtered by the fundamental keys of `criteria` (see CRITERIA)"""
+        table = self.ratios(prices)
+        mask = fundamental_mask(table, criteria)
+        return table[mask] if mask is not None else table
+
+
+def fundamental_mask(table: pd.DataFrame, criteria: Dict) -> Optional[np.ndarray]:
+    """Boolean mask over a ratio table, or None when no fundamental criterion is set"""
+    mask = None
+    for key, (column, comparison) in CRITERIA.items():
+        if key not in criteria:
+            continue
+        values = table[column].to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            passed = values >= criteria[key] if comparison == '>=' else values <= criteria[key]
+        # Missing data (NaN) never passes
+        mask = passed if mask is None else mask & passed
+    return mask
@@ -0,0 +1,328 @@
+"""
+Native NumPy indicators for NEPSE price series
+Drop-in replacements for the `ta` indicators used by TechnicalAnalysis
+(RSI, MACD, Bollinger Bands, Stochastic, ATR) that work on plain float
+arrays: no intermediate pandas Series and no `ta` import at startup.
+Outputs follow `ta`'s conventions (warm-up NaNs, Wilder smoothing, ATR
+seeded with a simple mean) and match it within floating-point tolerance;
+compare_with_ta() checks that when `ta` is installed.
+
+Recursive filters (EMA, Wilder smoothing, ATR) run as compiled loops when
+Numba is installed (see kernels.py) and otherwise in blocks as scaled
+cumulative sums, so neither path loops over bars in Python.
+compute_all() evaluates the whole indicator set in one fused pass that
+shares rolling windows and intermediate arrays.
+
+Every function also takes a 2-D (symbol x time) array: one row per symbol,
+shorter histories left-padded with NaN. Each row gets the same result as
+its own unpadded bars would, so a whole market is computed in one call.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import kernels
+
+# Largest growth of the scaled weights inside one block (keeps them finite)
+_MAX_LOG_SCALE = 600.0
+
+
+def _as_float(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def linear_filter(values, decay: float, gain: float, initial=None) -> np.ndarray:
+    """
+    y[t] = decay * y[t-1] + gain * x[t] along the last axis, without gaps
+    initial is y[-1] (the state before the first value, one per row for 2-D
+    input); without it the first output is x[0], as in pandas ewm(adjust=False)
+    """
+    x = _as_float(values)
+    out = np.empty_like(x)
+    length = x.shape[-1] if x.ndim else 0
+    if length == 0:
+        return out
+    start = 0
+    if initial is None:
+        out[..., 0] = x[..., 0]
+        state = x[..., 0]
+        start = 1
+    else:
+        state = np.broadcast_to(np.asarray(initial, dtype=np.float64), x.shape[:-1])
+    if decay <= 0.0:
+        out[..., start:] = gain * x[..., start:]
+        return out
+
+    # Within a block y[s+k] = decay^(k+1) * (y[s-1] + gain * sum_j decay^-(j+1) * x[s+j])
+    block = max(1, int(_MAX_LOG_SCALE / -np.log(decay))) if decay < 1.0 else length
+    steps = np.arange(1, min(block, length) + 1, dtype=np.float64)
+    grow = decay ** -steps
+    shrink = decay ** steps
+    for begin in range(start, length, block):
+        end = min(begin + block, length)
+        size = end - begin
+        sums = np.cumsum(grow[:size] * x[..., begin:end], axis=-1)
+        out[..., begin:end] = shrink[:size] * (np.expand_dims(state, -1) + gain * sums)
+        state = out[..., end - 1]
+    return out
+
+
+def _valid_start(x: np.ndarray) -> np.ndarray:
+    """Index of the first non-NaN value per row (the row length when there is none)"""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=-1), valid.argmax(axis=-1), x.shape[-1])
+
+
+def _leading(x: np.ndarray, offset=0) -> np.ndarray:
+    """Mask of the positions before each row's first value (plus offset)"""
+    return np.arange(x.shape[-1]) < np.expand_dims(_valid_start(x) + offset, -1)
+
+
+def _rows(values) -> np.ndarray:
+    """Input as a 2-D (row x time) float array"""
+    return np.atleast_2d(_as_float(values))
+
+
+def _shaped(result: np.ndarray, values) -> np.ndarray:
+    """Result back in the shape of the input (1-D in, 1-D out)"""
+    return result.reshape(np.shape(values))
+
+
+def ewm_mean(values, alpha: float, adjust: bool = False, min_periods: int = 0) -> np.ndarray:
+    """
+    pandas Series.ewm(alpha=..., adjust=..., min_periods=...).mean() for a
+    series whose only NaNs are leading ones (gaps inside are forward filled)
+    """
+    x = _rows(values)
+    if x.size and kernels.available():
+        return _shaped(kernels.ewm_mean(x, alpha, adjust, min_periods), values)
+
+    first = _valid_start(x)
+    positions = np.arange(x.shape[-1])
+    leading = positions < first[:, None]
+    # Forward fill inner gaps so the recursion stays defined; leading NaNs become 0
+    index = np.maximum.accumulate(np.where(np.isnan(x), 0, positions), axis=-1)
+    body = np.where(leading, 0.0, np.take_along_axis(x, index, axis=-1))
+
+    decay = 1.0 - alpha
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if adjust:
+            # Weighted mean with weights decay^i: numerator and weight sum are both linear filters
+            numerator = linear_filter(body, decay, 1.0, initial=0.0)
+            weights = linear_filter((~leading).astype(np.float64), decay, 1.0, initial=0.0)
+            result = numerator / weights
+        else:
+            # Starting from a zero state, x[first] / alpha makes the first output x[first]
+            rows = np.flatnonzero(first < x.shape[-1])
+            body[rows, first[rows]] /= alpha
+            result = linear_filter(body, decay, alpha, initial=0.0)
+    result[positions < (first + max(min_periods - 1, 0))[:, None]] = np.nan
+    return _shaped(result, values)
+
+
+def ema(values, span: int, adjust: bool = False, min_periods: int = 0) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (span + 1)"""
+    return ewm_mean(values, 2.0 / (span + 1.0), adjust, min_periods)
+
+
+def rolling_windows(values, window: int) -> np.ndarray:
+    """(..., len - window + 1, window) view of every full window along the last axis"""
+    x = _as_float(values)
+    if x.shape[-1] < window:
+        return np.empty(x.shape[:-1] + (0, window))
+    return sliding_window_view(x, window, axis=-1)
+
+
+def _pad(values: np.ndarray, length: int) -> np.ndarray:
+    """Left-pad per-window results with NaN to the series length"""
+    out = np.full(values.shape[:-1] + (length,), np.nan)
+    if values.shape[-1]:
+        out[..., length - values.shape[-1]:] = values
+    return out
+
+
+def sma(values, window: int) -> np.ndarray:
+    """Simple moving average (NaN until the window is full)"""
+    x = _as_float(values)
+    return _pad(rolling_windows(x, window).mean(axis=-1), x.shape[-1])
+
+
+def _previous(x: np.ndarray) -> np.ndarray:
+    """Each value's predecessor along the last axis (NaN for the first)"""
+    previous = np.empty_like(x)
+    previous[..., :1] = np.nan
+    previous[..., 1:] = x[..., :-1]
+    return previous
+
+
+def rsi(close, window: int = 14) -> np.ndarray:
+    """Wilder RSI as ta.momentum.RSIIndicator"""
+    x = _rows(close)
+    if x.size and kernels.available():
+        return _shaped(kernels.rsi(x, window), close)
+    with np.errstate(invalid='ignore'):
+        diff = x - _previous(x)
+        up = np.where(diff > 0, diff, 0.0)
+        down = np.where(diff < 0, -diff, 0.0)
+    # Padding before each row's first close stays out of the averages
+    leading = _leading(x)
+    up[leading] = np.nan
+    down[leading] = np.nan
+    return _shaped(_rsi_from_moves(up, down, window), close)
+
+
+def _rsi_from_moves(up: np.ndarray, down: np.ndarray, window: int) -> np.ndarray:
+    average_up = ewm_mean(up, 1.0 / window, min_periods=window)
+    average_down = ewm_mean(down, 1.0 / window, min_periods=window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(average_down == 0, 100.0, 100.0 - 100.0 / (1.0 + average_up / average_down))
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line, signal and histogram as ta.trend.MACD"""
+    close = _as_float(close)
+    line = ema(close, fast, min_periods=fast) - ema(close, slow, min_periods=slow)
+    signal_line = ema(line, signal, min_periods=signal)
+    return {'macd': line, 'signal': signal_line, 'histogram': line - signal_line}
+
+
+def bollinger_bands(close, window: int = 20, window_dev: float = 2) -> Dict[str, np.ndarray]:
+    """Upper, middle and lower band as ta.volatility.BollingerBands (population std)"""
+    close = _as_float(close)
+    windows = rolling_windows(close, window)
+    return _bands(windows.mean(axis=-1), windows.std(axis=-1), window_dev, close.shape[-1])
+
+
+def _bands(mean: np.ndarray, std: np.ndarray, window_dev: float, length: int) -> Dict[str, np.ndarray]:
+    middle = _pad(mean, length)
+    deviation = _pad(std, length) * window_dev
+    return {'upper': middle + deviation, 'middle': middle, 'lower': middle - deviation}
+
+
+def stochastic(high, low, close, window: int = 14, smooth_window: int = 3) -> Dict[str, np.ndarray]:
+    """%K and %D as ta.momentum.StochasticOscillator"""
+    close = _as_float(close)
+    lowest = _pad(rolling_windows(low, window).min(axis=-1), close.shape[-1])
+    highest = _pad(rolling_windows(high, window).max(axis=-1), close.shape[-1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100.0 * (close - lowest) / (highest - lowest)
+    return {'k': k, 'd': sma(k, smooth_window)}
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """max(high - low, |high - previous close|, |low - previous close|); high - low on the first bar"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    previous = _previous(close)
+    with np.errstate(invalid='ignore'):
+        return np.fmax(np.fmax(high - low, np.abs(high - previous)), np.abs(low - previous))
+
+
+def atr(high, low, close, window: int = 14) -> np.ndarray:
+    """Average True Range as ta.volatility.AverageTrueRange (0 before the first full window)"""
+    x = _rows(close)
+    if x.size and kernels.available():
+        return _shaped(kernels.atr(_rows(high), _rows(low), x, window), close)
+    return _shaped(_atr_from_range(true_range(_rows(high), _rows(low), x), _valid_start(x), window), close)
+
+
+def _atr_from_range(ranges: np.ndarray, first: np.ndarray, window: int) -> np.ndarray:
+    """Wilder-smoothed ranges of rows starting at `first`, seeded with their first window's mean"""
+    positions = np.arange(ranges.shape[-1])
+    leading = positions < first[:, None]
+    seed_at = first + window - 1
+    seeded = np.flatnonzero(seed_at < ranges.shape[-1])
+    ranges = np.where(leading, 0.0, ranges)
+    seeds = np.cumsum(ranges, axis=-1)[seeded, seed_at[seeded]] / window
+
+    # With a zero state, window * seed at the seed bar makes the filter output the seed there
+    inputs = np.where(positions > seed_at[:, None], ranges, 0.0)
+    inputs[seeded, seed_at[seeded]] = seeds * window
+    out = linear_filter(inputs, (window - 1) / window, 1.0 / window, initial=0.0)
+    out[positions < seed_at[:, None]] = 0.0
+    out[leading] = np.nan
+    return out
+
+
+# Everything compute_all() can produce, in output order
+ALL_INDICATORS = (
+    'sma_10', 'sma_20', 'sma_30', 'ema_20', 'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bb_upper', 'bb_middle', 'bb_lower', 'stoch_k', 'stoch_d', 'atr', 'volume_ratio'
+)
+
+
+def compute_all(high, low, close, volume, names: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Several indicators in one fused pass (ALL_INDICATORS by default)
+    The 20-bar close windows feed both SMA-20 and the Bollinger Bands, the
+    14-bar high/low windows and the true range are built once, and every
+    input is converted to float64 exactly once
+    """
+    wanted = tuple(ALL_INDICATORS if names is None else names)
+    unknown = set(wanted) - set(ALL_INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {', '.join(sorted(unknown))}")
+    high, low, close, volume = _as_float(high), _as_float(low), _as_float(close), _as_float(volume)
+    length = close.shape[-1]
+    out = {}
+
+    for window in (10, 30):
+        if f'sma_{window}' in wanted:
+            out[f'sma_{window}'] = sma(close, window)
+    if {'sma_20', 'bb_upper', 'bb_middle', 'bb_lower'} & set(wanted):
+        windows = rolling_windows(close, 20)
+        mean = windows.mean(axis=-1)
+        out['sma_20'] = _pad(mean, length)
+        if {'bb_upper', 'bb_middle', 'bb_lower'} & set(wanted):
+            bands = _bands(mean, windows.std(axis=-1), 2, length)
+            out.update(bb_upper=bands['upper'], bb_middle=bands['middle'], bb_lower=bands['lower'])
+    if 'ema_20' in wanted:
+        # TechnicalAnalysis.calculate_ema uses pandas' default adjust=True
+        out['ema_20'] = ema(close, 20, adjust=True)
+    if 'rsi' in wanted:
+        out['rsi'] = rsi(close)
+    if {'macd', 'macd_signal', 'macd_histogram'} & set(wanted):
+        lines = macd(close)
+        out.update(macd=lines['macd'], macd_signal=lines['signal'], macd_histogram=lines['histogram'])
+    if {'stoch_k', 'stoch_d'} & set(wanted):
+        lines = stochastic(high, low, close)
+        out.update(stoch_k=lines['k'], stoch_d=lines['d'])
+    if 'atr' in wanted:
+        out['atr'] = atr(high, low, close)
+    if 'volume_ratio' in wanted:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['volume_ratio'] = volume / sma(volume, 20)
+    return {name: out[name] for name in wanted}
+
+
+def compare_with_ta(frame) -> Dict[str, float]:
+    """
+    Largest absolute difference from `ta` per indicator for an OHLCV frame
+    (TechnicalAnalysis column layout); requires the optional `ta` package
+    """
+    import ta
+
+    close, high, low = frame['Close'], frame['High'], frame['Low']
+    reference = {
+        'rsi': ta.momentum.RSIIndicator(close).rsi(),
+        'macd': ta.trend.MACD(close).macd(),
+        'macd_signal': ta.trend.MACD(close).macd_signal(),
+        'macd_histogram': ta.trend.MACD(close).macd_diff(),
+        'bb_upper': ta.volatility.BollingerBands(close).bollinger_hband(),
+        'bb_middle': ta.volatility.BollingerBands(close).bollinger_mavg(),
+        'bb_lower': ta.volatility.BollingerBands(close).bollinger_lband(),
+        'stoch_k': ta.momentum.StochasticOscillator(high, low, close).stoch(),
+        'stoch_d': ta.momentum.StochasticOscillator(high, low, close).stoch_signal(),
+        'atr': ta.volatility.AverageTrueRange(high, low, close).average_true_range(),
+    }
+    ours = compute_all(high, low, close, frame['Volume'], reference)
+    differences = {}
+    for name, expected in reference.items():
+        expected = expected.to_numpy(dtype=np.float64)
+        if not np.array_equal(np.isnan(expected), np.isnan(ours[name])):
+            differences[name] = float('inf')
+            continue
+        valid = ~np.isnan(expected)
+        differences[name] = float(np.max(np.abs(expected[valid] - ours[name][valid]), initial=0.0))
+    return differences
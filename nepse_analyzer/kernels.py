@@ -0,0 +1,185 @@
+"""
+Compiled kernels for the recursive indicators
+EMA, Wilder-smoothed RSI and ATR depend on their own previous value. With
+Numba installed they run as compiled loops: one pass over the data, no
+temporaries. Without it indicators.py uses its blocked NumPy form, so Numba
+stays optional.
+
+Every kernel works on a 2-D (symbol x time) float64 array. Rows of different
+length are left-padded with NaN, and each row gets what the 1-D indicator
+gives for that row's own bars.
+"""
+
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+# 'auto' (Numba when installed), 'numba' or 'numpy'
+BACKENDS = ('auto', 'numba', 'numpy')
+BACKEND = os.environ.get('NEPSE_KERNEL_BACKEND', 'auto')
+
+# Compiled kernels by name, built on first use
+_compiled: Dict[str, object] = {}
+_numba_error: Optional[str] = None
+
+
+def set_backend(backend: str):
+    """Select the kernel backend for all later indicator calls"""
+    global BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {backend}")
+    BACKEND = backend
+
+
+def available() -> bool:
+    """True if compiled kernels are selected and Numba can be imported"""
+    if BACKEND == 'numpy':
+        return False
+    if not _compiled and _numba_error is None:
+        _compile()
+    if _numba_error is not None and BACKEND == 'numba':
+        raise ImportError(f"Numba kernels requested but unavailable: {_numba_error}")
+    return bool(_compiled)
+
+
+def _compile():
+    """JIT-compile the kernels (cached on disk by Numba between runs)"""
+    global _numba_error
+    try:
+        import numba
+    except ImportError as e:
+        _numba_error = str(e)
+        return
+    jit = numba.njit(cache=True, nogil=True)
+    _compiled.update(
+        ewm_mean=jit(_ewm_mean_rows),
+        rsi=jit(_rsi_rows),
+        atr=jit(_atr_rows),
+    )
+
+
+def _matrix(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def ewm_mean(values, alpha: float, adjust: bool, min_periods: int) -> np.ndarray:
+    """indicators.ewm_mean for every row"""
+    x = _matrix(values)
+    out = np.empty_like(x)
+    _compiled['ewm_mean'](x, float(alpha), bool(adjust), int(min_periods), out)
+    return out
+
+
+def rsi(close, window: int) -> np.ndarray:
+    """indicators.rsi for every row"""
+    x = _matrix(close)
+    out = np.empty_like(x)
+    _compiled['rsi'](x, int(window), out)
+    return out
+
+
+def atr(high, low, close, window: int) -> np.ndarray:
+    """indicators.atr for every row"""
+    close = _matrix(close)
+    out = np.empty_like(close)
+    _compiled['atr'](_matrix(high), _matrix(low), close, int(window), out)
+    return out
+
+
+# --- Kernel bodies (plain Python, compiled by _compile) ---------------------
+# NaN checks are written as `v != v` so the same code runs compiled and not
+
+def _ewm_mean_rows(x, alpha, adjust, min_periods, out):
+    decay = 1.0 - alpha
+    for i in range(x.shape[0]):
+        count = 0
+        last = np.nan
+        value = np.nan
+        numerator = 0.0
+        weights = 0.0
+        for t in range(x.shape[1]):
+            v = x[i, t]
+            if v != v:
+                if count == 0:
+                    out[i, t] = np.nan
+                    continue
+                # Inner gaps are forward filled
+                v = last
+            last = v
+            count += 1
+            if adjust:
+                numerator = decay * numerator + v
+                weights = decay * weights + 1.0
+                value = numerator / weights
+            elif count == 1:
+                value = v
+            else:
+                value = decay * value + alpha * v
+            out[i, t] = value if count >= min_periods else np.nan
+
+
+def _rsi_rows(close, window, out):
+    alpha = 1.0 / window
+    decay = 1.0 - alpha
+    for i in range(close.shape[0]):
+        count = 0
+        previous = np.nan
+        average_up = 0.0
+        average_down = 0.0
+        for t in range(close.shape[1]):
+            c = close[i, t]
+            if count == 0 and c != c:
+                out[i, t] = np.nan
+                continue
+            up = 0.0
+            down = 0.0
+            if count > 0:
+                change = c - previous
+                if change > 0:
+                    up = change
+                elif change < 0:
+                    down = -change
+            previous = c
+            count += 1
+            if count == 1:
+                average_up = up
+                average_down = down
+            else:
+                average_up = decay * average_up + alpha * up
+                average_down = decay * average_down + alpha * down
+            if count < window:
+                out[i, t] = np.nan
+            elif average_down == 0:
+                out[i, t] = 100.0
+            else:
+                out[i, t] = 100.0 - 100.0 / (1.0 + average_up / average_down)
+
+
+def _atr_rows(high, low, close, window, out):
+    decay = (window - 1.0) / window
+    for i in range(close.shape[0]):
+        count = 0
+        previous = np.nan
+        total = 0.0
+        value = 0.0
+        for t in range(close.shape[1]):
+            if count == 0 and close[i, t] != close[i, t]:
+                out[i, t] = np.nan
+                continue
+            # max of the three ranges ignoring NaN, as np.fmax
+            true_range = high[i, t] - low[i, t]
+            for candidate in (abs(high[i, t] - previous), abs(low[i, t] - previous)):
+                if true_range != true_range or candidate > true_range:
+                    true_range = candidate
+            previous = close[i, t]
+            count += 1
+            if count < window:
+                total += true_range
+                out[i, t] = 0.0
+            elif count == window:
+                value = (total + true_range) / window
+                out[i, t] = value
+            else:
+                value = decay * value + true_range / window
+                out[i, t] = value
@@ -0,0 +1,264 @@
+"""
+Market breadth and index computation for NEPSE
+Pure-Python (no third-party dependencies) so basic_app can use it.
+Every price update only touches the updated symbol and the indices it
+belongs to, so whole-market summaries are O(changed symbols) per tick.
+"""
+
+from collections import deque
+from datetime import datetime
+
+
+class MarketIndex:
+    """Capitalization-weighted index (NEPSE, sensitive, float, sector...)"""
+
+    def __init__(self, name, shares, base_value=100.0, base_cap=None):
+        """
+        shares: {symbol: share count used as weight}
+                (listed shares for NEPSE, free-float shares for a float index)
+        base_cap: market cap at the base date; if omitted the index is
+                  based on the first full set of prices it sees
+        """
+        self.name = name
+        self.shares = dict(shares)
+        self.base_value = base_value
+        self.base_cap = base_cap
+        self.market_cap = 0.0
+        self.previous_cap = None
+        self._priced = set()
+
+    def apply(self, symbol, old_price, new_price):
+        """Apply one constituent price change"""
+        weight = self.shares[symbol]
+        self.market_cap += (new_price - (old_price or 0.0)) * weight
+        self._priced.add(symbol)
+
+    def is_complete(self):
+        """True once every constituent has a price"""
+        return len(self._priced) == len(self.shares)
+
+    def value(self):
+        """Current index value"""
+        if not self.is_complete():
+            return None
+        if self.base_cap is None:
+            self.base_cap = self.market_cap
+        return self.market_cap / self.base_cap * self.base_value
+
+    def close_day(self):
+        """Remember today's cap as the reference for tomorrow's change"""
+        if self.is_complete():
+            self.previous_cap = self.market_cap
+
+    def snapshot(self):
+        """Value and change in the get_market_indices format"""
+        value = self.value()
+        if value is None:
+            return None
+
+        if self.previous_cap:
+            previous = self.previous_cap / self.base_cap * self.base_value
+        else:
+            previous = value
+        change = value - previous
+        return {
+            "value": round(value, 2),
+            "change": round(change, 2),
+            "change_percent": round(change / previous * 100, 2) if previous else 0.0
+        }
+
+
+def default_indices(master):
+    """
+    NEPSE (listed shares) and float (public shares) indices over every symbol
+    of a SymbolMaster, plus the sensitive index over its large caps
+    """
+    indices = [
+        MarketIndex('NEPSE_INDEX', master.shares_map()),
+        MarketIndex('FLOAT_INDEX', master.float_map()),
+    ]
+    sensitive = master.sensitive_map()
+    if sensitive:
+        indices.insert(1, MarketIndex('SENSITIVE_INDEX', sensitive))
+    return indices
+
+
+class _SymbolState:
+    """Per-symbol running state used by MarketBreadth"""
+
+    __slots__ = ('price', 'previous_close', 'closes', 'close_sum', 'period_high',
+                 'period_low', 'direction', 'new_high', 'new_low', 'above_sma')
+
+    def __init__(self, sma_period):
+        self.price = None
+        self.previous_close = None
+        # Last sma_period - 1 closes; today's price completes the window
+        self.closes = deque(maxlen=max(sma_period - 1, 0))
+        self.close_sum = 0.0
+        self.period_high = None
+        self.period_low = None
+        self.direction = 0
+        self.new_high = False
+        self.new_low = False
+        self.above_sma = None
+
+
+class MarketBreadth:
+    """Incrementally maintained market breadth and indices"""
+
+    def __init__(self, sma_period=20, high_low_window=252, indices=()):
+        self.sma_period = sma_period
+        self.high_low_window = high_low_window
+        self.indices = {}
+        self.ad_line = 0
+        self.last_update = None
+        self._states = {}
+        self._history = {}
+        self._index_members = {}
+        self._counts = {
+            'advancing': 0, 'declining': 0, 'unchanged': 0,
+            'new_highs': 0, 'new_lows': 0, 'above_sma': 0, 'sma_eligible': 0
+        }
+        for index in indices:
+            self.add_index(index)
+
+    def add_index(self, index):
+        """Register a MarketIndex; it is updated with every constituent tick"""
+        self.indices[index.name] = index
+        for symbol in index.shares:
+            self._index_members.setdefault(symbol, []).append(index)
+            state = self._states.get(symbol)
+            if state is not None and state.price is not None:
+                index.apply(symbol, None, state.price)
+
+    def load_history(self, symbol, closes):
+        """Seed a symbol from its daily closes (oldest first, last = previous close)"""
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _SymbolState(self.sma_period)
+
+        window = deque(closes, maxlen=self.high_low_window)
+        self._history[symbol] = window
+        state.closes.clear()
+        state.closes.extend(list(window)[-state.closes.maxlen:] if state.closes.maxlen else [])
+        state.close_sum = sum(state.closes)
+        state.period_high = max(window) if window else None
+        state.period_low = min(window) if window else None
+        state.previous_close = window[-1] if window else None
+        price = state.price if state.price is not None else state.previous_close
+        if price is not None:
+            self.update(symbol, price)
+
+    def seed(self, histories):
+        """
+        Seed from {symbol: daily closes} where the last close is today's price;
+        the indices take the previous closes as the reference for their change
+        """
+        histories = {symbol: closes for symbol, closes in histories.items() if closes}
+        for symbol, closes in histories.items():
+            self.load_history(symbol, closes[:-1])
+        for index in self.indices.values():
+            index.close_day()
+        for symbol, closes in histories.items():
+            self.update(symbol, closes[-1])
+
+    def update(self, symbol, price):
+        """Apply a new last-traded price for one symbol"""
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _SymbolState(self.sma_period)
+            self._history[symbol] = deque(maxlen=self.high_low_window)
+
+        self._count(state, -1)
+        old_price = state.price
+        state.price = price
+
+        reference = state.previous_close
+        if reference is None:
+            state.direction = 0
+        else:
+            state.direction = (price > reference) - (price < reference)
+        state.new_high = state.period_high is not None and price > state.period_high
+        state.new_low = state.period_low is not None and price < state.period_low
+        if len(state.closes) == state.closes.maxlen:
+            sma = (state.close_sum + price) / self.sma_period
+            state.above_sma = price > sma
+        else:
+            state.above_sma = None
+        self._count(state, 1)
+
+        for index in self._index_members.get(symbol, ()):
+            index.apply(symbol, old_price, price)
+        self.last_update = datetime.now()
+
+    def _count(self, state, sign):
+        """Add (sign=1) or remove (sign=-1) a symbol's contribution to the counters"""
+        if state.price is None:
+            return
+        counts = self._counts
+        if state.direction > 0:
+            counts['advancing'] += sign
+        elif state.direction < 0:
+            counts['declining'] += sign
+        else:
+            counts['unchanged'] += sign
+        if state.new_high:
+            counts['new_highs'] += sign
+        if state.new_low:
+            counts['new_lows'] += sign
+        if state.above_sma is not None:
+            counts['sma_eligible'] += sign
+            if state.above_sma:
+                counts['above_sma'] += sign
+
+    def close_day(self):
+        """
+        Roll the session: today's prices become previous closes, the
+        advance/decline line is extended and index references are reset.
+        O(symbols), called once per trading day.
+        """
+        self.ad_line += self._counts['advancing'] - self._counts['declining']
+        for symbol, state in self._states.items():
+            if state.price is None:
+                continue
+            history = self._history[symbol]
+            history.append(state.price)
+            if state.closes.maxlen:
+                if len(state.closes) == state.closes.maxlen:
+                    state.close_sum -= state.closes[0]
+                state.closes.append(state.price)
+                state.close_sum += state.price
+            state.period_high = max(history)
+            state.period_low = min(history)
+            state.previous_close = state.price
+            # Re-evaluate against the new reference so counters stay consistent
+            self.update(symbol, state.price)
+        for index in self.indices.values():
+            index.close_day()
+
+    def breadth(self):
+        """Current breadth figures"""
+        counts = self._counts
+        eligible = counts['sma_eligible']
+        return {
+            'advancing': counts['advancing'],
+            'declining': counts['declining'],
+            'unchanged': counts['unchanged'],
+            'ad_line': self.ad_line + counts['advancing'] - counts['declining'],
+            'new_highs': counts['new_highs'],
+            'new_lows': counts['new_lows'],
+            f'pct_above_sma_{self.sma_period}': round(counts['above_sma'] / eligible * 100, 2) if eligible else None
+        }
+
+    def index_values(self):
+        """All complete indices in the get_market_indices format"""
+        values = {}
+        for name, index in self.indices.items():
+            snapshot = index.snapshot()
+            if snapshot is not None:
+                values[name] = snapshot
+        return values
+
+    def symbols(self):
+        """Symbols the engine has seen"""
+        return list(self._states)
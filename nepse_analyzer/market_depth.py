@@ -0,0 +1,210 @@
+"""
+Market depth (L2 order book) analytics for NEPSE
+Every symbol's book is one row of fixed-size arrays (side x level), so a
+snapshot is a copy into its row and the derived figures (spread, order
+imbalance, depth-weighted price) are recomputed with vectorized operations
+for just the rows that changed. A batch of snapshots for the whole market
+costs one pass, so frequent depth updates for every listed symbol stay cheap.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+import metrics
+
+# NEPSE publishes the best five buy and sell levels
+LEVELS = 5
+
+BID, ASK = 0, 1
+
+DEPTH_FIELDS = (
+    'best_bid', 'best_ask', 'spread', 'spread_bps', 'mid', 'bid_depth', 'ask_depth',
+    'imbalance', 'imbalance_ema', 'weighted_price'
+)
+_FIELD = {name: i for i, name in enumerate(DEPTH_FIELDS)}
+
+
+def _side(levels, descending: bool, count: int):
+    """(prices, quantities) of one side, best level first"""
+    pairs = []
+    for level in levels or ():
+        if isinstance(level, dict):
+            price, quantity = level['price'], level['quantity']
+        else:
+            price, quantity = level[0], level[1]
+        if quantity and quantity > 0 and price and price > 0:
+            pairs.append((float(price), float(quantity)))
+    pairs.sort(key=lambda pair: pair[0], reverse=descending)
+    return pairs[:count]
+
+
+class DepthStore:
+    """Array-backed order books and depth figures for every symbol"""
+
+    def __init__(self, levels: int = LEVELS, smoothing: float = 0.2, capacity: int = 256):
+        """
+        smoothing: weight of the newest snapshot in imbalance_ema, which
+        steadies the imbalance of books that flicker between snapshots
+        """
+        self.levels = levels
+        self.smoothing = smoothing
+        self._positions: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        # row -> (side, level); empty levels are NaN priced with zero quantity
+        self.prices = np.full((capacity, 2, levels), np.nan)
+        self.quantities = np.zeros((capacity, 2, levels))
+        self.values = np.full((capacity, len(DEPTH_FIELDS)), np.nan)
+        self.updated = np.zeros(capacity)
+        self._lock = threading.Lock()
+        self.subscription = None
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._positions
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def symbols(self) -> List[str]:
+        """Symbols with a book"""
+        return list(self._symbols)
+
+    def _row(self, symbol: str) -> int:
+        row = self._positions.get(symbol)
+        if row is not None:
+            return row
+        row = len(self._symbols)
+        if row == len(self.updated):
+            self._grow()
+        self._positions[symbol] = row
+        self._symbols.append(symbol)
+        return row
+
+    def _grow(self):
+        """Double the row capacity"""
+        capacity = len(self.updated)
+        self.prices = np.concatenate([self.prices, np.full_like(self.prices[:capacity], np.nan)])
+        self.quantities = np.concatenate([self.quantities, np.zeros_like(self.quantities[:capacity])])
+        self.values = np.concatenate([self.values, np.full_like(self.values[:capacity], np.nan)])
+        self.updated = np.concatenate([self.updated, np.zeros(capacity)])
+
+    def _levels(self, bids, asks):
+        """(prices, quantities) rows of one book in the (side, level) layout"""
+        prices = [[np.nan] * self.levels, [np.nan] * self.levels]
+        quantities = [[0.0] * self.levels, [0.0] * self.levels]
+        for side, levels in ((BID, _side(bids, True, self.levels)), (ASK, _side(asks, False, self.levels))):
+            for level, (price, quantity) in enumerate(levels):
+                prices[side][level] = price
+                quantities[side][level] = quantity
+        return prices, quantities
+
+    def update(self, symbol: str, bids, asks, timestamp: Optional[float] = None):
+        """
+        Replace a symbol's book with an L2 snapshot
+        bids/asks: (price, quantity[, orders]) tuples or dicts with price and quantity
+        """
+        self.update_many([{'symbol': symbol, 'bids': bids, 'asks': asks, 'timestamp': timestamp}])
+
+    def update_many(self, snapshots: Iterable[Dict]) -> int:
+        """Apply several snapshots (the last one wins per symbol); returns the number of books changed"""
+        now = time.time()
+        books = {}
+        with self._lock:
+            for snapshot in snapshots:
+                row = self._row(snapshot['symbol'])
+                books[row] = self._levels(snapshot['bids'], snapshot['asks']) + (snapshot.get('timestamp') or now,)
+            if books:
+                # One fancy-indexed copy per array for the whole batch
+                rows = np.fromiter(books, dtype=np.int64, count=len(books))
+                prices, quantities, stamps = zip(*books.values())
+                self.prices[rows] = prices
+                self.quantities[rows] = quantities
+                self.updated[rows] = stamps
+                self._recompute(rows)
+        metrics.inc('nepse_depth_updates_total', len(books))
+        return len(books)
+
+    def _recompute(self, rows: np.ndarray):
+        """Derived figures for the given rows only"""
+        prices = self.prices[rows]
+        quantities = self.quantities[rows]
+        notional = np.where(quantities > 0, prices * quantities, 0.0)
+        best_bid = prices[:, BID, 0]
+        best_ask = prices[:, ASK, 0]
+        bid_depth = quantities[:, BID].sum(axis=1)
+        ask_depth = quantities[:, ASK].sum(axis=1)
+        total = bid_depth + ask_depth
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mid = (best_bid + best_ask) / 2
+            spread = best_ask - best_bid
+            imbalance = np.where(total > 0, (bid_depth - ask_depth) / total, np.nan)
+            bid_vwap = notional[:, BID].sum(axis=1) / bid_depth
+            ask_vwap = notional[:, ASK].sum(axis=1) / ask_depth
+            # Each side's average price weighted by the other side's depth:
+            # heavy bids pull the price towards the asks and the other way round
+            weighted = (bid_vwap * ask_depth + ask_vwap * bid_depth) / total
+            weighted = np.where(ask_depth == 0, bid_vwap, np.where(bid_depth == 0, ask_vwap, weighted))
+            spread_bps = spread / mid * 10000
+
+        previous = self.values[rows, _FIELD['imbalance_ema']]
+        ema = np.where(np.isnan(previous), imbalance, previous + self.smoothing * (imbalance - previous))
+        ema = np.where(np.isnan(imbalance), previous, ema)
+
+        values = self.values
+        values[rows, _FIELD['best_bid']] = best_bid
+        values[rows, _FIELD['best_ask']] = best_ask
+        values[rows, _FIELD['spread']] = spread
+        values[rows, _FIELD['spread_bps']] = spread_bps
+        values[rows, _FIELD['mid']] = mid
+        values[rows, _FIELD['bid_depth']] = bid_depth
+        values[rows, _FIELD['ask_depth']] = ask_depth
+        values[rows, _FIELD['imbalance']] = imbalance
+        values[rows, _FIELD['imbalance_ema']] = ema
+        values[rows, _FIELD['weighted_price']] = weighted
+
+    def summary(self, symbol: str) -> Optional[Dict]:
+        """Depth figures of one symbol (None where a side is empty), or None without a book"""
+        row = self._positions.get(symbol)
+        if row is None:
+            return None
+        with self._lock:
+            values = self.values[row].tolist()
+            updated = float(self.updated[row])
+        result = {
+            name: None if value != value else round(value, 4 if name.startswith('imbalance') else 2)
+            for name, value in zip(DEPTH_FIELDS, values)
+        }
+        result['updated'] = updated
+        return result
+
+    def book(self, symbol: str) -> Optional[Dict[str, List]]:
+        """A symbol's levels as {'bids': [(price, quantity), ...], 'asks': [...]}, best first"""
+        row = self._positions.get(symbol)
+        if row is None:
+            return None
+        with self._lock:
+            prices = self.prices[row].copy()
+            quantities = self.quantities[row].copy()
+        return {
+            name: [(float(p), float(q)) for p, q in zip(prices[side], quantities[side]) if q > 0]
+            for name, side in (('bids', BID), ('asks', ASK))
+        }
+
+    def frame(self):
+        """Depth figures of every symbol as a DataFrame indexed by symbol"""
+        import pandas as pd
+        with self._lock:
+            values = self.values[:len(self._symbols)].copy()
+        return pd.DataFrame(values, columns=list(DEPTH_FIELDS),
+                            index=pd.Index(self._symbols, name='symbol'))
+
+    def attach(self, bus, max_batch: int = 1000):
+        """Apply 'depth' events from an events.EventBus, coalesced to the latest book per symbol"""
+        self.subscription = bus.subscribe(
+            'depth', lambda events: self.update_many(event.data for event in events),
+            batch=True, coalesce=True, max_batch=max_batch, name='depth'
+        )
+        return self.subscription
@@ -0,0 +1,234 @@
+"""
+Lightweight instrumentation for the NEPSE analyzer
+Counters, latency histograms and timers with Prometheus text output.
+Uses only built-in libraries. When disabled (the default) every hook
+returns after a single flag check.
+
+Enable with the NEPSE_METRICS=1 environment variable or metrics.enable().
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds (1 ms .. 10 s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'nepse_fetch_seconds': 'Time spent in NepseDataFetcher calls',
+    'nepse_indicator_seconds': 'Time spent computing technical indicators',
+    'nepse_screen_seconds': 'Time spent screening stocks',
+    'nepse_render_seconds': 'Time spent rendering pages',
+    'nepse_http_request_seconds': 'HTTP request latency per endpoint',
+    'nepse_http_requests_total': 'HTTP requests per endpoint and status',
+    'nepse_rpc_seconds': 'Analysis service RPC latency per method',
+    'nepse_errors_total': 'Errors raised inside instrumented calls',
+    'nepse_cache_hits_total': 'Cache lookups served from cache',
+    'nepse_cache_misses_total': 'Cache lookups that had to compute',
+    'nepse_alert_eval_seconds': 'Time spent evaluating alert rules',
+    'nepse_alerts_total': 'Alerts fired by the alert engine',
+    'nepse_circuit_open_total': 'Times an endpoint circuit breaker opened',
+    'nepse_fetch_coalesced_total': 'Fetches that joined an in-flight upstream call',
+    'nepse_fetch_stale_total': 'Fetches served from a stale snapshot',
+    'nepse_fetch_hedged_total': 'Fetches that started a hedged second attempt',
+    'nepse_scrape_seconds': 'Time spent diffing scraped market pages',
+    'nepse_scrape_rows_total': 'Quote table rows seen by the scraper',
+    'nepse_scrape_rows_changed_total': 'Scraped quotes that changed since the previous page',
+    'nepse_events_published_total': 'Events published on the event bus per topic',
+    'nepse_events_dropped_total': 'Events dropped from full subscriber queues',
+    'nepse_eod_refresh_seconds': 'Time spent in full-market indicator refreshes',
+    'nepse_eod_symbols_total': 'Symbols processed by end-of-day refreshes',
+    'nepse_snapshot_seconds': 'Time spent saving and restoring analyzer snapshots',
+    'nepse_depth_updates_total': 'Order book snapshots applied to the depth store',
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide store of counters and histograms"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def reset(self):
+        """Drop all recorded values"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record a value into a histogram"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Context manager recording the block's duration into a histogram"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('nepse_errors_total', metric=name, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator version of timer(); labels default to the function name"""
+        def decorator(func):
+            call_labels = dict(labels)
+            call_labels.setdefault('operation', func.__name__)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.timer(name, **call_labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def cache_hit(self, cache):
+        """Count a cache hit"""
+        self.inc('nepse_cache_hits_total', cache=cache)
+
+    def cache_miss(self, cache):
+        """Count a cache miss"""
+        self.inc('nepse_cache_misses_total', cache=cache)
+
+    def cache_hit_rates(self):
+        """{cache: hit ratio} for every cache that saw a lookup"""
+        hits, misses = {}, {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                cache = dict(labels).get('cache')
+                if name == 'nepse_cache_hits_total':
+                    hits[cache] = value
+                elif name == 'nepse_cache_misses_total':
+                    misses[cache] = value
+        return {
+            cache: round(hits.get(cache, 0) / (hits.get(cache, 0) + misses.get(cache, 0)), 4)
+            for cache in set(hits) | set(misses)
+        }
+
+    def snapshot(self):
+        """Plain-dict view of all metrics (count/sum/mean for histograms)"""
+        with self._lock:
+            counters = {
+                _series_name(name, labels): value for (name, labels), value in self._counters.items()
+            }
+            histograms = {
+                _series_name(name, labels): {
+                    'count': h.count,
+                    'sum': round(h.total, 6),
+                    'mean': round(h.total / h.count, 6) if h.count else 0.0
+                }
+                for (name, labels), h in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{_series_name(name, labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{_series_name(name + '_bucket', labels + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{_series_name(name + '_bucket', labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{_series_name(name + '_sum', labels)} {histogram.total}")
+            lines.append(f"{_series_name(name + '_count', labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _series_name(name, labels):
+    """Format a metric name with its labels"""
+    if not labels:
+        return name
+    rendered = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return f"{name}{{{rendered}}}"
+
+
+METRICS = MetricsRegistry(enabled=os.environ.get('NEPSE_METRICS', '').lower() in ('1', 'true', 'yes'))
+
+inc = METRICS.inc
+observe = METRICS.observe
+timer = METRICS.timer
+timed = METRICS.timed
+cache_hit = METRICS.cache_hit
+cache_miss = METRICS.cache_miss
+
+
+def enable():
+    """Turn instrumentation on"""
+    METRICS.enabled = True
+
+
+def disable():
+    """Turn instrumentation off"""
+    METRICS.enabled = False
+
+
+def is_enabled():
+    """True when instrumentation is recording"""
+    return METRICS.enabled
@@ -0,0 +1,162 @@
+"""
+On-demand profiling for the NEPSE tools
+Runs cProfile (exact per-function totals) together with a lightweight
+stack sampler (flamegraph-ready collapsed stacks) around a command or
+request, writes both to disk and prints the top functions.
+Uses only built-in libraries.
+
+Enable with the NEPSE_PROFILE=1 environment variable, the --profile flag
+of cli.py / nepse_launcher.py, or ?profile=1 on a basic_app request.
+Output goes to NEPSE_PROFILE_DIR (default: ./profiles).
+"""
+
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_INTERVAL = 0.005  # seconds between stack samples
+DEFAULT_TOP = 15
+
+_enabled = os.environ.get('NEPSE_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+def enable():
+    """Profile every command/request from now on"""
+    global _enabled
+    _enabled = True
+
+
+def is_enabled():
+    """True when profiling is switched on globally"""
+    return _enabled
+
+
+def output_dir():
+    """Directory profiles are written to"""
+    return os.environ.get('NEPSE_PROFILE_DIR', 'profiles')
+
+
+class StackSampler:
+    """Periodically samples one thread's Python stack into collapsed-stack counts"""
+
+    def __init__(self, thread_id=None, interval=DEFAULT_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a background thread"""
+        self._thread = threading.Thread(target=self._run, name='nepse-stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        """Sampling loop"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Samples in Brendan Gregg's collapsed format (flamegraph.pl, speedscope)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileResult:
+    """Output of one profiled section"""
+
+    def __init__(self, name, elapsed, profiler, sampler, files):
+        self.name = name
+        self.elapsed = elapsed
+        self.profiler = profiler
+        self.sampler = sampler
+        self.files = files
+
+    def top_functions(self, limit=DEFAULT_TOP, sort='cumulative'):
+        """Text table of the most expensive functions"""
+        import pstats
+        
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def summary(self, limit=DEFAULT_TOP):
+        """Short human readable summary"""
+        lines = [f"⏱️  Profile '{self.name}': {self.elapsed * 1000:.1f} ms"]
+        for path in self.files.values():
+            lines.append(f"   → {path}")
+        lines.append(self.top_functions(limit))
+        return "\n".join(lines)
+
+
+def _slug(name):
+    """File-system friendly version of a section name"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'profile'
+
+
+@contextmanager
+def profile(name, interval=DEFAULT_INTERVAL, write=True, report=True, limit=DEFAULT_TOP):
+    """
+    Profile the enclosed block
+    Yields a dict that holds the ProfileResult under 'result' afterwards
+    """
+    # Imported here so that merely importing this module stays cheap
+    import cProfile
+    
+    holder = {}
+    profiler = cProfile.Profile()
+    sampler = StackSampler(interval=interval)
+    sampler.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield holder
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+
+        files = {}
+        if write:
+            directory = output_dir()
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{_slug(name)}")
+            files['pstats'] = base + '.pstats'
+            files['collapsed'] = base + '.collapsed'
+            profiler.dump_stats(files['pstats'])
+            with open(files['collapsed'], 'w') as handle:
+                handle.write(sampler.collapsed())
+
+        result = ProfileResult(name, elapsed, profiler, sampler, files)
+        holder['result'] = result
+        if report:
+            print(result.summary(limit))
+
+
+@contextmanager
+def maybe_profile(name, force=False, **kwargs):
+    """Profile the block only when profiling is enabled (or force=True)"""
+    if not (force or _enabled):
+        yield {}
+        return
+    with profile(name, **kwargs) as holder:
+        yield holder
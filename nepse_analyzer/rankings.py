@@ -0,0 +1,343 @@
+"""
+Maintained market rankings for NEPSE dashboards
+Top gainers, losers, most active and so on are kept ordered as quotes
+arrive instead of being sorted on every request: each ranking is an
+indexable skiplist, so a quote costs O(log n) per ranking, a rank lookup
+O(log n) and a top-N or bottom-N read O(k).
+Pure-Python (no third-party dependencies) so basic_app can use it.
+"""
+
+import random
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+RANKINGS = ('change_percent', 'volume', 'turnover', 'momentum')
+
+# Enough levels for ~16 million entries at p = 1/2
+MAX_LEVELS = 24
+
+
+class _Node:
+    """Skiplist node; width[level] is the number of positions to next[level]"""
+
+    __slots__ = ('key', 'next', 'width', 'prev')
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels
+        self.prev = None
+
+
+class RankedIndex:
+    """
+    Symbols ordered by a value, highest first (ties by symbol)
+    An indexable skiplist: update, remove and rank are O(log n) expected,
+    top(k) walks forward from the head and bottom(k) backward from the tail.
+    """
+
+    def __init__(self, name: str = '', seed: Optional[int] = None):
+        self.name = name
+        self._head = _Node(None, MAX_LEVELS)
+        self._tail = None
+        self._levels = 1
+        self._size = 0
+        self._values: Dict[str, float] = {}
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._values
+
+    def value(self, symbol: str) -> Optional[float]:
+        """Current value of a symbol, None if it is not ranked"""
+        return self._values.get(symbol)
+
+    def update(self, symbol: str, value: Optional[float]):
+        """Set a symbol's value; None or NaN takes it out of the ranking"""
+        old = self._values.get(symbol)
+        if value is None or value != value:
+            if old is not None:
+                self.remove(symbol)
+            return
+        if old is not None:
+            if old == value:
+                return
+            self._delete((-old, symbol))
+        self._insert((-value, symbol))
+        self._values[symbol] = value
+
+    def remove(self, symbol: str):
+        """Take a symbol out of the ranking (no-op if it is not ranked)"""
+        old = self._values.pop(symbol, None)
+        if old is not None:
+            self._delete((-old, symbol))
+
+    def rank(self, symbol: str) -> Optional[int]:
+        """1-based position from the top, None if the symbol is not ranked"""
+        value = self._values.get(symbol)
+        if value is None:
+            return None
+        position, _ = self._search((-value, symbol))
+        return position + 1
+
+    def top(self, k: int) -> List[Tuple[str, float]]:
+        """Highest k (symbol, value) pairs"""
+        result = []
+        node = self._head.next[0]
+        while node is not None and len(result) < k:
+            result.append((node.key[1], -node.key[0]))
+            node = node.next[0]
+        return result
+
+    def bottom(self, k: int) -> List[Tuple[str, float]]:
+        """Lowest k (symbol, value) pairs, lowest first"""
+        result = []
+        node = self._tail
+        while node is not None and len(result) < k:
+            result.append((node.key[1], -node.key[0]))
+            node = node.prev
+        return result
+
+    def _search(self, key) -> Tuple[int, List[_Node]]:
+        """(position of the last node before key, that node at every level)"""
+        chain = [self._head] * self._levels
+        node = self._head
+        position = 0
+        for level in reversed(range(self._levels)):
+            following = node.next[level]
+            while following is not None and following.key < key:
+                position += node.width[level]
+                node = following
+                following = node.next[level]
+            chain[level] = node
+        return position, chain
+
+    def _insert(self, key):
+        levels = 1
+        while levels < MAX_LEVELS and self._random.random() < 0.5:
+            levels += 1
+        if levels > self._levels:
+            # Head links of new levels span the whole list
+            for level in range(self._levels, levels):
+                self._head.width[level] = self._size + 1
+            self._levels = levels
+
+        chain = [self._head] * self._levels
+        steps = [0] * self._levels
+        node = self._head
+        position = 0
+        for level in reversed(range(self._levels)):
+            following = node.next[level]
+            while following is not None and following.key < key:
+                position += node.width[level]
+                node = following
+                following = node.next[level]
+            chain[level] = node
+            steps[level] = position
+
+        new = _Node(key, levels)
+        for level in range(self._levels):
+            before = chain[level]
+            if level < levels:
+                distance = position - steps[level]
+                new.next[level] = before.next[level]
+                new.width[level] = before.width[level] - distance
+                before.next[level] = new
+                before.width[level] = distance + 1
+            else:
+                before.width[level] += 1
+
+        new.prev = chain[0] if chain[0] is not self._head else None
+        if new.next[0] is not None:
+            new.next[0].prev = new
+        else:
+            self._tail = new
+        self._size += 1
+
+    def _delete(self, key):
+        _, chain = self._search(key)
+        target = chain[0].next[0]
+        for level in range(self._levels):
+            before = chain[level]
+            if before.next[level] is target:
+                before.width[level] += target.width[level] - 1
+                before.next[level] = target.next[level]
+            else:
+                before.width[level] -= 1
+
+        if target.next[0] is not None:
+            target.next[0].prev = target.prev
+        else:
+            self._tail = target.prev
+        self._size -= 1
+
+
+class _SymbolState:
+    """Per-symbol inputs of MarketRankings"""
+
+    __slots__ = ('price', 'previous_close', 'closes')
+
+    def __init__(self, momentum_period):
+        self.price = None
+        self.previous_close = None
+        # Last momentum_period closes; closes[0] is the momentum reference
+        self.closes = deque(maxlen=momentum_period)
+
+
+class MarketRankings:
+    """Change %, volume, turnover and momentum rankings updated per quote"""
+
+    def __init__(self, momentum_period: int = 5, rankings=RANKINGS):
+        unknown = set(rankings) - set(RANKINGS)
+        if unknown:
+            raise ValueError(f"Unknown rankings: {', '.join(sorted(unknown))}")
+        self.momentum_period = momentum_period
+        self.rankings = {name: RankedIndex(name) for name in rankings}
+        self._states: Dict[str, _SymbolState] = {}
+        # Quotes may arrive on a feed thread while pages read the rankings
+        self._lock = threading.Lock()
+        self.subscription = None
+
+    def _state(self, symbol) -> _SymbolState:
+        state = self._states.get(symbol)
+        if state is None:
+            state = self._states[symbol] = _SymbolState(self.momentum_period)
+        return state
+
+    def load_history(self, symbol: str, closes: List[float]):
+        """Seed a symbol from its daily closes (oldest first, last = previous close)"""
+        with self._lock:
+            state = self._state(symbol)
+            state.closes.clear()
+            state.closes.extend(closes[-self.momentum_period:])
+            state.previous_close = closes[-1] if closes else None
+            if state.price is not None:
+                self._rank_price(symbol, state)
+
+    def update(self, quote: Dict):
+        """
+        Apply one quote: symbol and price, optionally change_percent (or
+        change), volume and turnover (defaults to price x volume)
+        """
+        symbol = quote['symbol']
+        price = quote['price']
+        with self._lock:
+            state = self._state(symbol)
+            state.price = price
+            if quote.get('change') is not None and state.previous_close is None:
+                state.previous_close = price - quote['change']
+            self._rank_price(symbol, state, quote.get('change_percent'))
+
+            volume = quote.get('volume')
+            if volume is not None:
+                if 'volume' in self.rankings:
+                    self.rankings['volume'].update(symbol, volume)
+                if 'turnover' in self.rankings:
+                    turnover = quote.get('turnover')
+                    self.rankings['turnover'].update(symbol, turnover if turnover is not None else price * volume)
+
+    def update_price(self, symbol: str, price: float):
+        """Apply a last-traded price without volume"""
+        self.update({'symbol': symbol, 'price': price})
+
+    def _rank_price(self, symbol, state, change_percent=None):
+        """Re-rank the price-based rankings of one symbol"""
+        price = state.price
+        if 'change_percent' in self.rankings:
+            if change_percent is None and state.previous_close:
+                change_percent = (price - state.previous_close) / state.previous_close * 100
+            self.rankings['change_percent'].update(symbol, change_percent)
+        if 'momentum' in self.rankings:
+            momentum = None
+            if len(state.closes) == self.momentum_period and state.closes[0]:
+                past = state.closes[0]
+                momentum = (price - past) / past * 100
+            self.rankings['momentum'].update(symbol, momentum)
+
+    def close_day(self):
+        """
+        Roll the session: today's prices become previous closes and the
+        session volume and turnover rankings start empty. O(n log n), once a day.
+        """
+        with self._lock:
+            for name in ('volume', 'turnover'):
+                if name in self.rankings:
+                    self.rankings[name] = RankedIndex(name)
+            for symbol, state in self._states.items():
+                if state.price is None:
+                    continue
+                state.closes.append(state.price)
+                state.previous_close = state.price
+                self._rank_price(symbol, state)
+
+    def attach(self, bus):
+        """Keep the rankings current from an events.EventBus 'quote' topic"""
+        self.subscription = bus.subscribe_inline('quote', lambda event: self.update(event.data),
+                                                 name='rankings')
+        return self.subscription
+
+    def _ranking(self, name) -> RankedIndex:
+        ranking = self.rankings.get(name)
+        if ranking is None:
+            raise ValueError(f"Unknown ranking: {name}")
+        return ranking
+
+    def top(self, name: str, k: int = 10) -> List[Dict]:
+        """Highest k symbols of a ranking"""
+        with self._lock:
+            pairs = self._ranking(name).top(k)
+        return [{'symbol': symbol, name: round(value, 2)} for symbol, value in pairs]
+
+    def bottom(self, name: str, k: int = 10) -> List[Dict]:
+        """Lowest k symbols of a ranking, lowest first"""
+        with self._lock:
+            pairs = self._ranking(name).bottom(k)
+        return [{'symbol': symbol, name: round(value, 2)} for symbol, value in pairs]
+
+    def rank(self, name: str, symbol: str) -> Optional[int]:
+        """1-based rank of a symbol (1 = highest), None if it is not ranked"""
+        with self._lock:
+            return self._ranking(name).rank(symbol)
+
+    def ranks(self, symbol: str) -> Dict[str, Optional[int]]:
+        """A symbol's rank in every ranking"""
+        with self._lock:
+            return {name: ranking.rank(symbol) for name, ranking in self.rankings.items()}
+
+    def gainers(self, k: int = 10) -> List[Dict]:
+        """Top gainers by change %"""
+        return [entry for entry in self.top('change_percent', k) if entry['change_percent'] > 0]
+
+    def losers(self, k: int = 10) -> List[Dict]:
+        """Top losers by change %, biggest loss first"""
+        return [entry for entry in self.bottom('change_percent', k) if entry['change_percent'] < 0]
+
+    def most_active(self, k: int = 10) -> List[Dict]:
+        """Highest session volume"""
+        return self.top('volume', k)
+
+    def top_turnover(self, k: int = 10) -> List[Dict]:
+        """Highest session turnover"""
+        return self.top('turnover', k)
+
+    def snapshot(self, k: int = 10) -> Dict[str, List[Dict]]:
+        """Every dashboard list at once"""
+        lists = {}
+        if 'change_percent' in self.rankings:
+            lists['gainers'] = self.gainers(k)
+            lists['losers'] = self.losers(k)
+        if 'volume' in self.rankings:
+            lists['most_active'] = self.most_active(k)
+        if 'turnover' in self.rankings:
+            lists['top_turnover'] = self.top_turnover(k)
+        if 'momentum' in self.rankings:
+            lists['momentum'] = self.top('momentum', k)
+        return lists
+
+    def symbols(self) -> List[str]:
+        """Symbols the rankings have seen"""
+        return list(self._states)
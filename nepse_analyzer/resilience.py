@@ -0,0 +1,256 @@
+"""
+Resilient fetch layer for NEPSE market data
+Wraps upstream calls with:
+  - a circuit breaker per endpoint (fail fast while the upstream is down)
+  - request hedging (a second attempt when the first one is slow)
+  - stale-while-revalidate caching (serve the last good snapshot and
+    refresh it in the background)
+  - request coalescing (concurrent callers for the same key share one
+    upstream call)
+Uses only built-in libraries.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import metrics
+
+
+class CircuitOpenError(Exception):
+    """Raised when an endpoint's circuit breaker rejects a call"""
+
+
+class EndpointPolicy:
+    """Caching, hedging and breaker settings of one endpoint"""
+
+    def __init__(self, fresh_ttl=5.0, stale_ttl=60.0, hedge_after=None,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.fresh_ttl = fresh_ttl            # seconds a value is served without refreshing
+        self.stale_ttl = stale_ttl            # further seconds it is served while refreshing
+        self.hedge_after = hedge_after        # start a second attempt after this many seconds
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probe after a timeout"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                # Exactly one probe call while half-open
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Count a failure; opens the circuit at the threshold or on a failed probe"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    metrics.inc('nepse_circuit_open_total')
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self._probing = False
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """Run func once for all concurrent callers of key and share the outcome"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            metrics.inc('nepse_fetch_coalesced_total')
+            return future.result()
+
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ResilientFetcher:
+    """Runs upstream loaders through cache, coalescing, breaker and hedging"""
+
+    def __init__(self, policies=None, default_policy=None, max_workers=8, clock=time.monotonic):
+        self.policies = dict(policies or {})
+        self.default_policy = default_policy or EndpointPolicy()
+        self.clock = clock
+        self.max_workers = max_workers
+        self._breakers = {}
+        self._cache = {}
+        self._refreshing = set()
+        self._flight = SingleFlight()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def policy(self, endpoint):
+        """Policy of an endpoint (the default for unknown ones)"""
+        return self.policies.get(endpoint, self.default_policy)
+
+    def breaker(self, endpoint):
+        """Circuit breaker of an endpoint, created on first use"""
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                policy = self.policy(endpoint)
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    policy.failure_threshold, policy.reset_timeout, self.clock
+                )
+            return breaker
+
+    def breaker_states(self):
+        """{endpoint: breaker state}"""
+        with self._lock:
+            return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
+
+    def _pool(self):
+        """Thread pool for hedged attempts"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='nepse-fetch')
+            return self._executor
+
+    def call(self, endpoint, key, loader):
+        """
+        Value for (endpoint, key): fresh from cache, stale while a background
+        refresh runs, or loaded now. When loading fails the last good value
+        is returned if there is one; otherwise the error propagates.
+        """
+        policy = self.policy(endpoint)
+        cache_key = (endpoint, key)
+        entry = self._cache.get(cache_key)
+        if entry is not None:
+            age = self.clock() - entry[1]
+            if age < policy.fresh_ttl:
+                metrics.cache_hit(f"fetch_{endpoint}")
+                return entry[0]
+            if age < policy.fresh_ttl + policy.stale_ttl:
+                metrics.inc('nepse_fetch_stale_total', endpoint=endpoint)
+                self._refresh_in_background(endpoint, cache_key, loader)
+                return entry[0]
+        metrics.cache_miss(f"fetch_{endpoint}")
+
+        try:
+            return self._load(endpoint, cache_key, loader)
+        except Exception:
+            if entry is not None:
+                # Last good snapshot beats an empty dashboard
+                metrics.inc('nepse_fetch_stale_total', endpoint=endpoint)
+                return entry[0]
+            raise
+
+    def invalidate(self, endpoint=None, key=None):
+        """Drop cached values (all, one endpoint, or one key)"""
+        with self._lock:
+            if endpoint is None:
+                self._cache.clear()
+            elif key is None:
+                for cache_key in [cache_key for cache_key in self._cache if cache_key[0] == endpoint]:
+                    del self._cache[cache_key]
+            else:
+                self._cache.pop((endpoint, key), None)
+
+    def _load(self, endpoint, cache_key, loader):
+        """Coalesced, breaker-guarded load that refreshes the cache"""
+        def guarded():
+            breaker = self.breaker(endpoint)
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {endpoint}")
+            try:
+                value = self._hedged(loader, self.policy(endpoint).hedge_after)
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            self._cache[cache_key] = (value, self.clock())
+            return value
+
+        return self._flight.do(cache_key, guarded)
+
+    def _refresh_in_background(self, endpoint, cache_key, loader):
+        """Start one background refresh per key"""
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh():
+            try:
+                self._load(endpoint, cache_key, loader)
+            except Exception as e:
+                print(f"Background refresh of {endpoint} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        # A dedicated thread, so refreshes never wait behind hedged attempts in the pool
+        threading.Thread(target=refresh, name='nepse-refresh', daemon=True).start()
+
+    def _hedged(self, loader, hedge_after):
+        """Run loader; if it is still running after hedge_after seconds, race a second attempt"""
+        if hedge_after is None:
+            return loader()
+
+        primary = self._pool().submit(loader)
+        try:
+            return primary.result(timeout=hedge_after)
+        except FutureTimeout:
+            pass
+
+        metrics.inc('nepse_fetch_hedged_total')
+        pending = {primary, self._pool().submit(loader)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,236 @@
+"""
+Cross-asset risk analytics for NEPSE
+Rolling covariance/correlation across all scrips, portfolio VaR/CVaR,
+beta against the NEPSE index and drawdown statistics.
+
+The rolling window is kept as running sums (sum of returns and the
+cross-product matrix R'R), so a new bar costs two rank-1 updates
+instead of recomputing a 250 x 250 matrix from scratch.
+"""
+
+from statistics import NormalDist
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class RiskEngine:
+    """Rolling-window risk model over a fixed universe of symbols"""
+
+    # Rebuild the running sums from the raw window every this many bars
+    # to keep floating point drift from the incremental updates bounded
+    RESYNC_INTERVAL = 500
+
+    def __init__(self, symbols: List[str], window: int = 250, benchmark: str = 'NEPSE_INDEX'):
+        self.symbols = list(symbols)
+        self.window = window
+        self.benchmark = benchmark
+        self._position = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        n = len(self.symbols)
+        self._returns = np.zeros((window, n))
+        self._market = np.zeros(window)
+        self._count = 0
+        self._head = 0
+        self._updates = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._market_sum = 0.0
+        self._market_sq = 0.0
+        self._market_cross = np.zeros(n)
+
+    @classmethod
+    def from_prices(cls, closes: pd.DataFrame, benchmark: Optional[pd.Series] = None,
+                    window: int = 250) -> 'RiskEngine':
+        """
+        Build an engine from a date x symbol close matrix
+        Missing returns (suspended scrips, holidays) are treated as 0
+        """
+        engine = cls(list(closes.columns), window=window)
+        returns = closes.sort_index().pct_change().iloc[1:].fillna(0.0)
+        if benchmark is not None:
+            market = benchmark.reindex(closes.index).sort_index().pct_change().iloc[1:].fillna(0.0)
+        else:
+            market = pd.Series(0.0, index=returns.index)
+        engine.load(returns.to_numpy(), market.to_numpy())
+        return engine
+
+    @property
+    def observations(self) -> int:
+        """Number of bars currently in the window"""
+        return self._count
+
+    def load(self, returns: np.ndarray, market: Optional[np.ndarray] = None):
+        """Replace the window with the last `window` rows of a returns matrix"""
+        returns = np.asarray(returns, dtype=np.float64)[-self.window:]
+        if market is None:
+            market = np.zeros(len(returns))
+        market = np.asarray(market, dtype=np.float64)[-len(returns):]
+
+        count = len(returns)
+        self._returns[:count] = returns
+        self._market[:count] = market
+        self._count = count
+        self._head = count % self.window
+        self._resync()
+
+    def _resync(self):
+        """Recompute the running sums from the raw window (BLAS matmul)"""
+        rows = self._window_rows()
+        returns = self._returns[rows]
+        market = self._market[rows]
+        self._sum = returns.sum(axis=0)
+        self._cross = returns.T @ returns
+        self._market_sum = float(market.sum())
+        self._market_sq = float(market @ market)
+        self._market_cross = returns.T @ market
+        self._updates = 0
+
+    def _window_rows(self) -> np.ndarray:
+        """Ring-buffer row indices in chronological order"""
+        if self._count < self.window:
+            return np.arange(self._count)
+        return (np.arange(self.window) + self._head) % self.window
+
+    def update(self, returns: Dict[str, float], market_return: float = 0.0):
+        """
+        Add one bar of returns ({symbol: return}); symbols without a
+        value count as 0. Costs O(N^2) instead of O(window * N^2).
+        """
+        row = np.zeros(len(self.symbols))
+        for symbol, value in returns.items():
+            position = self._position.get(symbol)
+            if position is not None:
+                row[position] = value
+        self.update_row(row, market_return)
+
+    def update_row(self, row: np.ndarray, market_return: float = 0.0):
+        """Add one bar given as a return vector in self.symbols order"""
+        row = np.asarray(row, dtype=np.float64)
+        if self._count == self.window:
+            old = self._returns[self._head]
+            old_market = self._market[self._head]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+            self._market_sum -= old_market
+            self._market_sq -= old_market * old_market
+            self._market_cross -= old * old_market
+        else:
+            self._count += 1
+
+        self._returns[self._head] = row
+        self._market[self._head] = market_return
+        self._head = (self._head + 1) % self.window
+        self._sum += row
+        self._cross += np.outer(row, row)
+        self._market_sum += market_return
+        self._market_sq += market_return * market_return
+        self._market_cross += row * market_return
+
+        self._updates += 1
+        if self._updates >= self.RESYNC_INTERVAL:
+            self._resync()
+
+    def mean_returns(self) -> pd.Series:
+        """Mean daily return per symbol over the window"""
+        return pd.Series(self._sum / max(self._count, 1), index=self.symbols)
+
+    def covariance_matrix(self, annualize: bool = False) -> pd.DataFrame:
+        """Sample covariance of daily returns over the window"""
+        n = self._count
+        if n < 2:
+            return pd.DataFrame(np.nan, index=self.symbols, columns=self.symbols)
+
+        mean = self._sum / n
+        cov = (self._cross - n * np.outer(mean, mean)) / (n - 1)
+        if annualize:
+            cov = cov * 252
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+    def correlation_matrix(self) -> pd.DataFrame:
+        """Correlation matrix derived from the covariance matrix"""
+        cov = self.covariance_matrix().to_numpy()
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=self.symbols, columns=self.symbols)
+
+    def betas(self) -> pd.Series:
+        """Beta of every symbol against the benchmark"""
+        n = self._count
+        if n < 2:
+            return pd.Series(np.nan, index=self.symbols)
+
+        market_mean = self._market_sum / n
+        market_var = (self._market_sq - n * market_mean * market_mean) / (n - 1)
+        cov = (self._market_cross - n * (self._sum / n) * market_mean) / (n - 1)
+        if market_var <= 0:
+            return pd.Series(np.nan, index=self.symbols)
+        return pd.Series(cov / market_var, index=self.symbols).round(4)
+
+    def _weights(self, weights: Dict[str, float]) -> np.ndarray:
+        """Normalized weight vector in self.symbols order"""
+        vector = np.zeros(len(self.symbols))
+        for symbol, weight in weights.items():
+            position = self._position.get(symbol)
+            if position is not None:
+                vector[position] = weight
+        total = vector.sum()
+        return vector / total if total else vector
+
+    def portfolio_returns(self, weights: Dict[str, float]) -> np.ndarray:
+        """Daily returns of a weighted portfolio over the window"""
+        return self._returns[self._window_rows()] @ self._weights(weights)
+
+    def value_at_risk(self, weights: Dict[str, float], confidence: float = 0.95,
+                      method: str = 'historical', horizon: int = 1) -> Dict[str, float]:
+        """
+        Portfolio VaR and CVaR as positive loss fractions
+        method: 'historical' (empirical quantile) or 'parametric' (normal)
+        """
+        if self._count < 2:
+            return {'var': None, 'cvar': None}
+
+        if method == 'historical':
+            returns = self.portfolio_returns(weights)
+            cutoff = np.quantile(returns, 1 - confidence)
+            tail = returns[returns <= cutoff]
+            var = -cutoff
+            cvar = -tail.mean() if len(tail) else var
+        elif method == 'parametric':
+            w = self._weights(weights)
+            mean = float(w @ (self._sum / self._count))
+            sigma = float(np.sqrt(max(w @ self.covariance_matrix().to_numpy() @ w, 0.0)))
+            z = NormalDist().inv_cdf(1 - confidence)
+            var = -(mean + z * sigma)
+            # Expected shortfall of a normal distribution
+            cvar = -(mean - sigma * NormalDist().pdf(z) / (1 - confidence))
+        else:
+            raise ValueError(f"Unknown VaR method: {method}")
+
+        scale = np.sqrt(horizon)
+        return {'var': round(float(var * scale), 6), 'cvar': round(float(cvar * scale), 6)}
+
+
+def drawdown_stats(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Max drawdown, current drawdown and longest time under water per symbol
+    computed column-wise over a date x symbol close matrix
+    """
+    prices = closes.sort_index().ffill().to_numpy(dtype=np.float64)
+    peaks = np.fmax.accumulate(prices, axis=0)
+    drawdown = prices / peaks - 1.0
+
+    under_water = drawdown < 0
+    # Length of the current under-water run at each row, per column
+    runs = np.zeros_like(prices, dtype=np.int64)
+    for i in range(1, len(prices)):
+        runs[i] = np.where(under_water[i], runs[i - 1] + 1, 0)
+
+    return pd.DataFrame({
+        'max_drawdown': np.nanmin(drawdown, axis=0).round(4),
+        'current_drawdown': drawdown[-1].round(4),
+        'max_days_under_water': runs.max(axis=0)
+    }, index=closes.columns)
@@ -0,0 +1,276 @@
+"""
+HTML scraping pipeline for NEPSE market pages
+The live-market page is polled every few seconds, so the work per poll is
+kept small:
+  - only the quote table is cut out of the page (plain string search, no
+    parse of the surrounding markup)
+  - every <tr> is hashed as raw text; rows whose hash was seen on the last
+    poll are skipped without being parsed
+  - the changed rows are parsed together in one call to the fastest
+    available parser (selectolax, then lxml, then BeautifulSoup)
+Only quotes that actually changed are handed downstream.
+"""
+
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+LIVE_MARKET_URL = "https://www.nepalstock.com/live-market"
+
+# Header text (lower case, punctuation stripped) -> quote field
+HEADER_FIELDS = {
+    'symbol': 'symbol',
+    'stock symbol': 'symbol',
+    'ltp': 'price',
+    'last traded price': 'price',
+    'close': 'price',
+    'point change': 'change',
+    'change': 'change',
+    'change percent': 'change_percent',
+    'percent change': 'change_percent',
+    'change pct': 'change_percent',
+    'open': 'open',
+    'open price': 'open',
+    'high': 'high',
+    'high price': 'high',
+    'low': 'low',
+    'low price': 'low',
+    'volume': 'volume',
+    'qty': 'volume',
+    'total traded quantity': 'volume',
+    'previous closing': 'previous_close',
+    'previous close': 'previous_close',
+    'prev close': 'previous_close',
+    'turnover': 'turnover',
+    'total traded value': 'turnover',
+}
+
+NUMERIC_FIELDS = ('price', 'change', 'change_percent', 'open', 'high', 'low', 'previous_close', 'turnover')
+
+
+def _rows_selectolax(html: str) -> List[List[str]]:
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        # selectolax < 0.3 only ships the Modest backend
+        from selectolax.parser import HTMLParser
+    return [
+        [cell.text(strip=True) for cell in row.iter() if cell.tag in ('td', 'th')]
+        for row in HTMLParser(html).css('tr')
+    ]
+
+
+def _rows_lxml(html: str) -> List[List[str]]:
+    import lxml.html
+    return [
+        [cell.text_content().strip() for cell in row if cell.tag in ('td', 'th')]
+        for row in lxml.html.fromstring(html).iter('tr')
+    ]
+
+
+def _rows_bs4(html: str) -> List[List[str]]:
+    from bs4 import BeautifulSoup
+    return [
+        [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'], recursive=False)]
+        for row in BeautifulSoup(html, 'html.parser').find_all('tr')
+    ]
+
+
+# Parser backends, fastest first: name -> (module, html -> rows of cell texts)
+BACKENDS = {
+    'selectolax': ('selectolax', _rows_selectolax),
+    'lxml': ('lxml', _rows_lxml),
+    'bs4': ('bs4', _rows_bs4),
+}
+
+
+def available_backends() -> List[str]:
+    """Installed parser backends, fastest first"""
+    available = []
+    for name, (module, _) in BACKENDS.items():
+        try:
+            __import__(module)
+            available.append(name)
+        except ImportError:
+            pass
+    return available
+
+
+def extract_table(html: str, marker: str) -> Optional[str]:
+    """
+    The <table>...</table> region whose opening tag (or a preceding element)
+    contains `marker`, or None when the marker is not on the page
+    """
+    position = html.find(marker)
+    if position < 0:
+        return None
+    start = html.find('<table', html.rfind('<', 0, position))
+    if start < 0:
+        return None
+    end = html.find('</table>', start)
+    return html[start:end + len('</table>')] if end >= 0 else html[start:]
+
+
+def split_rows(table: str) -> List[str]:
+    """Raw '<tr ...>...</tr>' strings of a table region"""
+    rows = []
+    for chunk in table.split('<tr')[1:]:
+        # '<tr' also prefixes '<track'; real rows continue with '>' or whitespace
+        if chunk[:1] not in ('>', ' ', '\t', '\n', '\r'):
+            continue
+        end = chunk.find('</tr>')
+        rows.append('<tr' + (chunk[:end] if end >= 0 else chunk) + '</tr>')
+    return rows
+
+
+_NUMBER_JUNK = re.compile(r'[^0-9.\-]')
+
+
+def parse_number(text: str) -> Optional[float]:
+    """'1,100.50' -> 1100.5; '(2.5)' -> -2.5; '-' or '' -> None"""
+    text = text.strip()
+    negative = text.startswith('(') and text.endswith(')')
+    text = _NUMBER_JUNK.sub('', text)
+    if not text or text in ('-', '.'):
+        return None
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def header_columns(cells: List[str]) -> Dict[str, int]:
+    """{quote field: column index} from the header cells"""
+    columns = {}
+    for index, cell in enumerate(cells):
+        key = ' '.join(re.sub(r'[^a-z ]', ' ', cell.lower().replace('%', ' percent ')).split())
+        field = HEADER_FIELDS.get(key)
+        if field and field not in columns:
+            columns[field] = index
+    return columns
+
+
+class LiveMarketScraper:
+    """Incremental scraper for the live-market quote table"""
+
+    def __init__(self, url: str = LIVE_MARKET_URL, table_marker: str = '<table',
+                 backend: Optional[str] = None):
+        self.url = url
+        self.table_marker = table_marker
+        if backend is None:
+            available = available_backends()
+            if not available:
+                raise ImportError("No HTML parser installed (selectolax, lxml or beautifulsoup4)")
+            backend = available[0]
+        self.backend = backend
+        self._parse_rows: Callable[[str], List[List[str]]] = BACKENDS[backend][1]
+        self.columns: Dict[str, int] = {}
+        self._header_hash = None
+        self._row_symbols: Dict[int, str] = {}
+        self.quotes: Dict[str, Dict] = {}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, session, timeout: float = 10.0) -> Dict:
+        """Download the page with a requests-style session and apply it"""
+        response = session.get(self.url, timeout=timeout)
+        response.raise_for_status()
+        return self.update(response.text)
+
+    @metrics.timed('nepse_scrape_seconds')
+    def update(self, html: str) -> Dict:
+        """
+        Apply a freshly downloaded page
+        Returns {'changed': [quote, ...], 'removed': [symbol, ...]}; both are
+        empty when no row changed since the previous page
+        """
+        with self._lock:
+            return self._apply(html)
+
+    def _apply(self, html: str) -> Dict:
+        """Diff a page against the rows seen on the previous one"""
+        table = extract_table(html, self.table_marker)
+        if table is None:
+            raise ValueError("Live market table not found on page")
+
+        rows = split_rows(table)
+        body = []
+        for row in rows:
+            if '<th' in row:
+                row_hash = hash(row)
+                if row_hash != self._header_hash:
+                    parsed = self._parse_rows(f"<table>{row}</table>")
+                    self.columns = header_columns(parsed[0]) if parsed else {}
+                    self._header_hash = row_hash
+                    # A new layout invalidates every row seen so far
+                    self._row_symbols = {}
+            else:
+                body.append(row)
+        if 'symbol' not in self.columns or 'price' not in self.columns:
+            raise ValueError("Live market table has no Symbol/LTP columns")
+
+        hashes = [hash(row) for row in body]
+        new_rows = [(row, row_hash) for row, row_hash in zip(body, hashes) if row_hash not in self._row_symbols]
+        changed = []
+        parsed_symbols = {}
+        if new_rows:
+            html_rows = ''.join(row for row, _ in new_rows)
+            for cells, (_, row_hash) in zip(self._parse_rows(f"<table>{html_rows}</table>"), new_rows):
+                quote = self._quote(cells)
+                # Filler rows are remembered as '' so they are not parsed again
+                parsed_symbols[row_hash] = quote['symbol'] if quote else ''
+                # A shifted serial-number column alone does not make a quote change
+                if quote is not None and self.quotes.get(quote['symbol']) != quote:
+                    changed.append(quote)
+
+        row_symbols = {}
+        for row_hash in hashes:
+            symbol = self._row_symbols.get(row_hash, parsed_symbols.get(row_hash))
+            if symbol is not None:
+                row_symbols[row_hash] = symbol
+        present = set(row_symbols.values()) - {''}
+        removed = [symbol for symbol in self.quotes if symbol not in present]
+
+        for symbol in removed:
+            del self.quotes[symbol]
+        for quote in changed:
+            self.quotes[quote['symbol']] = quote
+        self._row_symbols = row_symbols
+
+        metrics.inc('nepse_scrape_rows_total', len(body))
+        metrics.inc('nepse_scrape_rows_changed_total', len(changed))
+        if changed or removed:
+            self.version += 1
+        return {'changed': changed, 'removed': removed}
+
+    def _quote(self, cells: List[str]) -> Optional[Dict]:
+        """Quote dict from the cells of one body row (None for filler rows)"""
+        columns = self.columns
+        if len(cells) <= max(columns.values()):
+            return None
+        symbol = cells[columns['symbol']].strip().upper()
+        if not symbol:
+            return None
+        quote = {'symbol': symbol}
+        for field in NUMERIC_FIELDS:
+            if field in columns:
+                quote[field] = parse_number(cells[columns[field]])
+        if 'volume' in columns:
+            volume = parse_number(cells[columns['volume']])
+            quote['volume'] = int(volume) if volume is not None else None
+        if quote['price'] is None:
+            return None
+        return quote
+
+    def snapshot(self) -> Dict:
+        """Full table in NepseDataFetcher.get_live_market_data() format"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'stocks': list(self.quotes.values()),
+            'market_status': 'OPEN' if 10 <= datetime.now().hour <= 15 else 'CLOSED',
+            'version': self.version
+        }
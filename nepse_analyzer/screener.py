@@ -0,0 +1,720 @@
+"""
+Expression language for the stock screener
+Screens such as
+
+    rsi(14) < 30 and close > sma(50) and sector == "Commercial Banks"
+
+are parsed once into a tree of hashable tuples and optimized:
+  - constant arithmetic is folded and nested and/or are flattened
+  - equal subtrees are equal keys, so a subexpression used twice (in one
+    screen or across screens on the same data) is evaluated once
+  - the operands of and/or run cheapest first, and each operand only runs
+    on the symbols the earlier ones left undecided
+Every node is evaluated vectorized over a ScreenData (a symbol x time price
+matrix); indicators come from indicators.py. Results are cached by
+expression and data version.
+
+Grammar (case-insensitive keywords):
+    expr       := and_expr ('or' and_expr)*
+    and_expr   := not_expr ('and' not_expr)*
+    not_expr   := 'not' not_expr | comparison
+    comparison := sum (('<' | '<=' | '>' | '>=' | '==' | '!=') sum | 'in' '(' constants ')')?
+    sum        := product (('+' | '-') product)*
+    product    := unary (('*' | '/') unary)*
+    unary      := '-' unary | number | "text" | name | name '(' numbers ')' | '(' expr ')'
+A missing value (e.g. sma(50) with fewer than 50 bars) never satisfies a
+comparison.
+"""
+
+import functools
+import itertools
+import operator
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import indicators
+import metrics
+
+# Bars of history an analyzer screen loads per symbol
+DEFAULT_DAYS = 250
+
+# Evaluated nodes kept per ScreenData before the cache starts over
+NODE_CACHE_SIZE = 1024
+
+# Indicators AdvancedNepseAnalyzer.analyze_stock() reports (expression -> result key);
+# screens over analyses use these values so matches agree with the rows shown
+ANALYSIS_INDICATORS = {
+    'rsi(14)': 'rsi',
+    'sma(10)': 'sma_10',
+    'sma(20)': 'sma_20',
+    'momentum(5)': 'momentum',
+    'volatility(20)': 'volatility',
+}
+
+# --- Fields and functions ---------------------------------------------------
+
+# Latest-bar numeric fields and text fields
+NUMERIC_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'change', 'change_percent')
+TEXT_FIELDS = ('symbol', 'sector')
+
+FIELD_ALIASES = {
+    'price': 'close',
+    'ltp': 'close',
+    'current_price': 'close',
+}
+
+
+def _last(values: np.ndarray) -> np.ndarray:
+    return values[:, -1] if values.shape[1] else np.full(len(values), np.nan)
+
+
+def _window(values: np.ndarray, n: int) -> Optional[np.ndarray]:
+    """Last n bars of every row, or None when the history is shorter"""
+    n = int(n)
+    return values[:, -n:] if 0 < n <= values.shape[1] else None
+
+
+def _mean(values: np.ndarray, n: int) -> np.ndarray:
+    window = _window(values, n)
+    return window.mean(axis=1) if window is not None else np.full(len(values), np.nan)
+
+
+def _sma(data, rows, n):
+    return _mean(data.close[rows], n)
+
+
+def _avg_volume(data, rows, n):
+    return _mean(data.volume[rows], n)
+
+
+def _ema(data, rows, n):
+    # Same smoothing as TechnicalAnalysis.calculate_ema
+    return _last(indicators.ema(data.close[rows], int(n), adjust=True, min_periods=int(n)))
+
+
+def _rsi(data, rows, n):
+    return _last(indicators.rsi(data.close[rows], int(n)))
+
+
+def _atr(data, rows, n):
+    return _last(indicators.atr(data.high[rows], data.low[rows], data.close[rows], int(n)))
+
+
+def _macd_line(key):
+    def macd(data, rows, fast, slow, signal):
+        return _last(indicators.macd(data.close[rows], int(fast), int(slow), int(signal))[key])
+    return macd
+
+
+def _band(sign):
+    def band(data, rows, n, k):
+        window = _window(data.close[rows], n)
+        if window is None:
+            return np.full(len(rows), np.nan)
+        return window.mean(axis=1) + sign * k * window.std(axis=1)
+    return band
+
+
+def _highest(data, rows, n):
+    window = _window(data.high[rows], n)
+    return window.max(axis=1) if window is not None else np.full(len(rows), np.nan)
+
+
+def _lowest(data, rows, n):
+    window = _window(data.low[rows], n)
+    return window.min(axis=1) if window is not None else np.full(len(rows), np.nan)
+
+
+def _momentum(data, rows, n):
+    """Percent change over n bars, as NepseAnalyzer.calculate_momentum"""
+    window = _window(data.close[rows], int(n) + 1)
+    if window is None:
+        return np.full(len(rows), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (window[:, -1] - window[:, 0]) / window[:, 0] * 100.0
+
+
+def _sector_rs(data, rows, n):
+    """Relative strength of each symbol's sector against the market over n bars (percent)"""
+    return data.sector_strength(int(n))[rows]
+
+
+def _volatility(data, rows, n):
+    """Annualized standard deviation of the last n returns, as NepseAnalyzer.calculate_volatility"""
+    window = _window(data.close[rows], int(n) + 1)
+    if window is None:
+        return np.full(len(rows), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(window, axis=1) / window[:, :-1]
+    return returns.std(axis=1) * np.sqrt(252.0)
+
+
+# name -> (default arguments, relative cost, implementation(data, rows, *args))
+FUNCTIONS = {
+    'sma': ((20,), 2, _sma),
+    'avg_volume': ((20,), 2, _avg_volume),
+    'highest': ((20,), 2, _highest),
+    'lowest': ((20,), 2, _lowest),
+    'momentum': ((5,), 2, _momentum),
+    'volatility': ((20,), 3, _volatility),
+    'sector_rs': ((20,), 4, _sector_rs),
+    'bb_upper': ((20, 2), 3, _band(1.0)),
+    'bb_lower': ((20, 2), 3, _band(-1.0)),
+    'ema': ((20,), 5, _ema),
+    'rsi': ((14,), 6, _rsi),
+    'atr': ((14,), 7, _atr),
+    'macd': ((12, 26, 9), 8, _macd_line('macd')),
+    'macd_signal': ((12, 26, 9), 8, _macd_line('signal')),
+    'macd_histogram': ((12, 26, 9), 8, _macd_line('histogram')),
+}
+
+_COMPARISONS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+_ARITHMETIC = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+# --- Parsing ----------------------------------------------------------------
+
+_TOKEN = re.compile(r'''\s*(?:
+    (?P<number>\d+(?:\.\d*)?|\.\d+)
+  | (?P<text>"[^"]*"|'[^']*')
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><=|>=|==|!=|<|>|[-+*/(),])
+)''', re.VERBOSE)
+
+_KEYWORDS = ('and', 'or', 'not', 'in')
+
+
+def tokenize(expression: str) -> List[tuple]:
+    """(kind, value) tokens; kind is number, text, name, keyword or op"""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f"Unexpected character at {position}: {expression[position:position + 10]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            value = float(value)
+        elif kind == 'text':
+            value = value[1:-1]
+        elif value.lower() in _KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing tuple trees"""
+
+    def __init__(self, expression: str):
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind or 'more input'
+            found = 'end of expression' if token[0] is None else repr(token[1])
+            raise ValueError(f"Expected {expected}, found {found}")
+        self.position += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.peek() == (kind, value):
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty expression")
+        node = self.expr()
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expr(self):
+        children = [self.and_expr()]
+        while self.accept('keyword', 'or'):
+            children.append(self.and_expr())
+        return children[0] if len(children) == 1 else ('or', tuple(children))
+
+    def and_expr(self):
+        children = [self.not_expr()]
+        while self.accept('keyword', 'and'):
+            children.append(self.not_expr())
+        return children[0] if len(children) == 1 else ('and', tuple(children))
+
+    def not_expr(self):
+        if self.accept('keyword', 'not'):
+            return ('not', self.not_expr())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.sum()
+        kind, value = self.peek()
+        if kind == 'op' and value in _COMPARISONS:
+            self.position += 1
+            return ('cmp', value, left, self.sum())
+        if self.accept('keyword', 'in'):
+            self.take('op', '(')
+            values = [self.constant()]
+            while self.accept('op', ','):
+                values.append(self.constant())
+            self.take('op', ')')
+            return ('in', left, tuple(values))
+        return left
+
+    def constant(self):
+        negative = self.accept('op', '-')
+        kind, value = self.take()
+        if kind == 'number':
+            return ('num', -value if negative else value)
+        if kind == 'text' and not negative:
+            return ('str', value)
+        raise ValueError(f"Expected a constant, found {value!r}")
+
+    def sum(self):
+        node = self.product()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('+', '-'):
+            node = ('arith', self.take()[1], node, self.product())
+        return node
+
+    def product(self):
+        node = self.unary()
+        while self.peek()[0] == 'op' and self.peek()[1] in ('*', '/'):
+            node = ('arith', self.take()[1], node, self.unary())
+        return node
+
+    def unary(self):
+        if self.accept('op', '-'):
+            return ('neg', self.unary())
+        kind, value = self.take()
+        if kind == 'number':
+            return ('num', value)
+        if kind == 'text':
+            return ('str', value)
+        if kind == 'op' and value == '(':
+            node = self.expr()
+            self.take('op', ')')
+            return node
+        if kind == 'name':
+            arguments = None
+            if self.accept('op', '('):
+                arguments = []
+                if not self.accept('op', ')'):
+                    arguments.append(self.number())
+                    while self.accept('op', ','):
+                        arguments.append(self.number())
+                    self.take('op', ')')
+            return _name(value, arguments)
+        raise ValueError(f"Unexpected {value!r}")
+
+    def number(self):
+        negative = self.accept('op', '-')
+        value = self.take('number')[1]
+        return -value if negative else value
+
+
+def _name(name: str, arguments: Optional[List[float]]):
+    """Field or function node for a name: `rsi` -> rsi(14), `sma_50` -> sma(50)"""
+    name = FIELD_ALIASES.get(name.lower(), name.lower())
+    if arguments is None:
+        if name in NUMERIC_FIELDS or name in TEXT_FIELDS:
+            return ('field', name)
+        # sma_50 style spelling of sma(50)
+        prefix, _, suffix = name.rpartition('_')
+        if prefix in FUNCTIONS and suffix.isdigit():
+            name, arguments = prefix, [float(suffix)]
+        else:
+            arguments = []
+    if name not in FUNCTIONS:
+        raise ValueError(f"Unknown field or function: {name}")
+    defaults = FUNCTIONS[name][0]
+    if len(arguments) > len(defaults):
+        raise ValueError(f"{name}() takes at most {len(defaults)} arguments")
+    return ('call', name, tuple(float(value) for value in arguments) + tuple(float(value) for value in defaults[len(arguments):]))
+
+
+# --- Optimization -----------------------------------------------------------
+
+def _type(node) -> str:
+    """'num', 'str' or 'bool'"""
+    kind = node[0]
+    if kind in ('num', 'call', 'neg', 'arith'):
+        return 'num'
+    if kind == 'str':
+        return 'str'
+    if kind == 'field':
+        return 'str' if node[1] in TEXT_FIELDS else 'num'
+    return 'bool'
+
+
+def _check(node, expected: str):
+    actual = _type(node)
+    if actual != expected:
+        raise ValueError(f"Expected a {_TYPE_NAMES[expected]}, found a {_TYPE_NAMES[actual]}: {render(node)}")
+
+
+_TYPE_NAMES = {'num': 'number', 'str': 'text', 'bool': 'condition'}
+
+
+def cost(node) -> int:
+    """Relative evaluation cost of a subtree"""
+    kind = node[0]
+    if kind in ('num', 'str', 'bool'):
+        return 0
+    if kind == 'field':
+        return 1
+    if kind == 'call':
+        return FUNCTIONS[node[1]][1]
+    if kind in ('and', 'or'):
+        return sum(cost(child) for child in node[1]) + 1
+    if kind == 'cmp':
+        return cost(node[2]) + cost(node[3]) + 1
+    if kind == 'arith':
+        return cost(node[2]) + cost(node[3]) + 1
+    return cost(node[1]) + 1
+
+
+def optimize(node):
+    """Type-checked, constant-folded tree with cheap-first and/or operands"""
+    kind = node[0]
+    if kind in ('num', 'str', 'field', 'call'):
+        return node
+    if kind == 'neg':
+        operand = optimize(node[1])
+        _check(operand, 'num')
+        return ('num', -operand[1]) if operand[0] == 'num' else ('neg', operand)
+    if kind == 'arith':
+        left, right = optimize(node[2]), optimize(node[3])
+        _check(left, 'num')
+        _check(right, 'num')
+        if left[0] == 'num' and right[0] == 'num':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return ('num', float(_ARITHMETIC[node[1]](np.float64(left[1]), np.float64(right[1]))))
+        return ('arith', node[1], left, right)
+    if kind == 'cmp':
+        left, right = optimize(node[2]), optimize(node[3])
+        if _type(left) == 'bool' or _type(right) == 'bool' or _type(left) != _type(right):
+            raise ValueError(f"Cannot compare {render(left)} with {render(right)}")
+        if _type(left) == 'str':
+            if node[1] not in ('==', '!='):
+                raise ValueError(f"Text only supports == and !=: {render(node)}")
+            left, right = _folded_text(left), _folded_text(right)
+        if left[0] in ('num', 'str') and right[0] in ('num', 'str'):
+            return ('bool', bool(_COMPARISONS[node[1]](left[1], right[1])))
+        return ('cmp', node[1], left, right)
+    if kind == 'in':
+        operand = optimize(node[1])
+        if _type(operand) == 'bool' or any(_type(value) != _type(operand) for value in node[2]):
+            raise ValueError(f"Values listed for {render(operand)} must all be {_TYPE_NAMES[_type(operand)]}")
+        values = tuple(sorted({_folded_text(value)[1] for value in node[2]}, key=str))
+        return ('in', _folded_text(operand), values)
+    if kind == 'not':
+        operand = optimize(node[1])
+        _check(operand, 'bool')
+        if operand[0] == 'bool':
+            return ('bool', not operand[1])
+        return operand[1] if operand[0] == 'not' else ('not', operand)
+    if kind in ('and', 'or'):
+        short_circuit = kind == 'or'
+        children = []
+        for child in (optimize(child) for child in node[1]):
+            _check(child, 'bool')
+            if child[0] == 'bool':
+                if child[1] == short_circuit:
+                    return child
+                continue
+            # Flatten nested and/or and drop repeated operands
+            for part in (child[1] if child[0] == kind else (child,)):
+                if part not in children:
+                    children.append(part)
+        if not children:
+            return ('bool', not short_circuit)
+        if len(children) == 1:
+            return children[0]
+        return (kind, tuple(sorted(children, key=cost)))
+    return node
+
+
+def _folded_text(node):
+    """Text constants compare case-insensitively"""
+    return ('str', node[1].casefold()) if node[0] == 'str' else node
+
+
+def render(node) -> str:
+    """Expression text of a tree (the optimized form shows evaluation order)"""
+    kind = node[0]
+    if kind == 'num':
+        return f"{node[1]:g}"
+    if kind == 'str':
+        return f'"{node[1]}"'
+    if kind == 'bool':
+        return 'true' if node[1] else 'false'
+    if kind == 'field':
+        return node[1]
+    if kind == 'call':
+        return f"{node[1]}({', '.join(f'{value:g}' for value in node[2])})"
+    if kind == 'neg':
+        return f"-{render(node[1])}"
+    if kind in ('arith', 'cmp'):
+        return f"({render(node[2])} {node[1]} {render(node[3])})"
+    if kind == 'in':
+        return f"{render(node[1])} in ({', '.join(render(_constant(value)) for value in node[2])})"
+    if kind == 'not':
+        return f"not {render(node[1])}"
+    return '(' + f" {kind} ".join(render(child) for child in node[1]) + ')'
+
+
+def _constant(value):
+    return ('str', value) if isinstance(value, str) else ('num', value)
+
+
+class Expression:
+    """A parsed and optimized screen expression"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tree = optimize(_Parser(text).parse())
+        self.type = _type(self.tree)
+
+    def __repr__(self):
+        return f"Expression({render(self.tree)})"
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(text: str) -> Expression:
+    """Parse and optimize an expression (cached by text); raises ValueError"""
+    return Expression(text)
+
+
+# --- Data -------------------------------------------------------------------
+
+_versions = itertools.count(1)
+
+
+def _stack(rows: List, width: int) -> np.ndarray:
+    """Right-aligned (symbol x time) matrix, shorter rows left-padded with NaN"""
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        row = np.asarray(row, dtype=np.float64)[-width:] if width else np.empty(0)
+        if len(row):
+            matrix[i, width - len(row):] = row
+    return matrix
+
+
+class ScreenData:
+    """Symbol x time price matrix a screen runs on (the last column is the latest bar)"""
+
+    def __init__(self, symbols: List[str], close, volume=None, high=None, low=None, open=None,
+                 sectors: Optional[Dict[str, str]] = None, version=None, master=None):
+        self.symbols = list(symbols)
+        # symbol_master.SymbolMaster supplying the share counts of sector indices
+        self.master = master
+        self.close = np.asarray(close, dtype=np.float64).reshape(len(self.symbols), -1)
+        missing = np.full(self.close.shape, np.nan)
+        self.volume = missing if volume is None else np.asarray(volume, dtype=np.float64).reshape(self.close.shape)
+        self.high = self.close if high is None else np.asarray(high, dtype=np.float64).reshape(self.close.shape)
+        self.low = self.close if low is None else np.asarray(low, dtype=np.float64).reshape(self.close.shape)
+        self.open = missing if open is None else np.asarray(open, dtype=np.float64).reshape(self.close.shape)
+        sectors = sectors or {}
+        self.text = {
+            'symbol': np.array([symbol.casefold() for symbol in self.symbols], dtype=object),
+            'sector': np.array([(sectors.get(symbol) or '').casefold() for symbol in self.symbols], dtype=object),
+        }
+        # Identifies this data in result caches; new data gets a new version
+        self.version = next(_versions) if version is None else version
+        # node -> (values for every symbol, which symbols are computed)
+        self._cache = {}
+        # node -> values supplied by set_values, never evicted
+        self._fixed = {}
+        # period -> sector relative strength of every symbol
+        self._sector_strength = {}
+
+    @classmethod
+    def from_series(cls, closes: Dict[str, List[float]], volumes: Optional[Dict[str, List[float]]] = None,
+                    sectors: Optional[Dict[str, str]] = None, days: Optional[int] = None,
+                    master=None) -> 'ScreenData':
+        """From per-symbol close (and volume) lists ending at the same bar"""
+        symbols = list(closes)
+        width = days or max((len(values) for values in closes.values()), default=0)
+        volume = _stack([(volumes or {}).get(symbol, ()) for symbol in symbols], width) if volumes else None
+        return cls(symbols, _stack([closes[symbol] for symbol in symbols], width), volume,
+                   sectors=sectors, master=master)
+
+    @classmethod
+    def from_frames(cls, frames: Dict, sectors: Optional[Dict[str, str]] = None, master=None) -> 'ScreenData':
+        """From OHLCV DataFrames (TechnicalAnalysis column layout) ending at the same bar"""
+        symbols = list(frames)
+        width = max((len(frame) for frame in frames.values()), default=0)
+        columns = {
+            field: _stack([frames[symbol][field.capitalize()].to_numpy() for symbol in symbols], width)
+            for field in ('open', 'high', 'low', 'close', 'volume')
+        }
+        return cls(symbols, sectors=sectors, master=master, **columns)
+
+    @classmethod
+    def from_analyzer(cls, analyzer, days: int = DEFAULT_DAYS) -> 'ScreenData':
+        """From a NepseAnalyzer's price history for every tracked symbol"""
+        closes, volumes = {}, {}
+        for symbol in analyzer.stocks:
+            data = analyzer.generate_sample_data(symbol, days)
+            closes[symbol] = data['prices']
+            volumes[symbol] = data['volumes']
+        return cls.from_series(closes, volumes, analyzer.symbol_master.sector_map(), days,
+                               master=analyzer.symbol_master)
+
+    def sector_strength(self, period: int) -> np.ndarray:
+        """SectorAnalytics.symbol_strength for every symbol, computed once per period"""
+        strength = self._sector_strength.get(period)
+        if strength is None:
+            import pandas as pd
+            from sector_analysis import SectorAnalytics
+
+            closes = pd.DataFrame(self.close.T, columns=self.symbols)
+            if len(closes) <= period:
+                strength = np.full(len(self.symbols), np.nan)
+            else:
+                strength = SectorAnalytics(closes, self.master).symbol_strength(period).to_numpy()
+            self._sector_strength[period] = strength
+        return strength
+
+    def set_values(self, expression: str, values):
+        """Use given per-symbol values (None = missing) for an expression instead of computing it"""
+        node = compile_expression(expression).tree
+        self._fixed[node] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    def field(self, name: str) -> np.ndarray:
+        """Latest-bar values of a field for every symbol"""
+        if name in self.text:
+            return self.text[name]
+        if name in ('change', 'change_percent'):
+            if self.close.shape[1] < 2:
+                return np.full(len(self.symbols), np.nan)
+            latest, previous = self.close[:, -1], self.close[:, -2]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return latest - previous if name == 'change' else (latest - previous) / latest * 100.0
+        return _last(getattr(self, name))
+
+    def evaluate(self, node, rows: np.ndarray) -> np.ndarray:
+        """Values of a node for the symbols at `rows`; each symbol is computed once per node"""
+        kind = node[0]
+        if kind in ('num', 'str', 'bool'):
+            return np.full(len(rows), node[1], dtype=object if kind == 'str' else None)
+        fixed = self._fixed.get(node)
+        if fixed is not None:
+            return fixed[rows]
+        entry = self._cache.get(node)
+        if entry is None:
+            if len(self._cache) >= NODE_CACHE_SIZE:
+                self._cache.clear()
+            node_type = _type(node)
+            values = (np.zeros(len(self.symbols), dtype=bool) if node_type == 'bool'
+                      else np.empty(len(self.symbols), dtype=object) if node_type == 'str'
+                      else np.full(len(self.symbols), np.nan))
+            entry = self._cache[node] = (values, np.zeros(len(self.symbols), dtype=bool))
+        values, computed = entry
+        missing = rows[~computed[rows]]
+        if len(missing):
+            values[missing] = self._compute(node, missing)
+            computed[missing] = True
+        return values[rows]
+
+    def _compute(self, node, rows: np.ndarray) -> np.ndarray:
+        kind = node[0]
+        if kind == 'field':
+            return self.field(node[1])[rows]
+        if kind == 'call':
+            return FUNCTIONS[node[1]][2](self, rows, *node[2])
+        if kind == 'neg':
+            return -self.evaluate(node[1], rows)
+        if kind == 'arith':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return _ARITHMETIC[node[1]](self.evaluate(node[2], rows), self.evaluate(node[3], rows))
+        if kind == 'cmp':
+            left, right = self.evaluate(node[2], rows), self.evaluate(node[3], rows)
+            if left.dtype == object or right.dtype == object:
+                return np.asarray(_COMPARISONS[node[1]](left, right), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                return _COMPARISONS[node[1]](left, right) & ~np.isnan(left) & ~np.isnan(right)
+        if kind == 'in':
+            return np.isin(self.evaluate(node[1], rows), list(node[2]))
+        if kind == 'not':
+            return ~self.evaluate(node[1], rows)
+        if kind in ('and', 'or'):
+            # Each operand only sees the symbols the previous ones left undecided
+            decided_value = kind == 'or'
+            result = np.full(len(rows), not decided_value)
+            undecided = np.arange(len(rows))
+            for child in node[1]:
+                passed = self.evaluate(child, rows[undecided])
+                decided = passed == decided_value
+                result[undecided[decided]] = decided_value
+                undecided = undecided[~decided]
+                if not len(undecided):
+                    break
+            return result
+        raise ValueError(f"Cannot evaluate {kind} node")
+
+
+# --- Screener ---------------------------------------------------------------
+
+class Screener:
+    """Runs screen expressions against ScreenData, caching results per data version"""
+
+    def __init__(self, data: ScreenData, cache_size: int = 256):
+        self.data = data
+        self.cache_size = cache_size
+        self._results = OrderedDict()
+
+    def set_data(self, data: ScreenData):
+        """Screen newer data from now on (older cached results are dropped)"""
+        self.data = data
+        self._results.clear()
+
+    def evaluate(self, expression: str) -> np.ndarray:
+        """Expression value for every symbol of the data (aligned with data.symbols)"""
+        compiled = compile_expression(expression)
+        return self.data.evaluate(compiled.tree, np.arange(len(self.data.symbols)))
+
+    @metrics.timed('nepse_screen_seconds', operation='expression')
+    def select(self, expression: str, use_cache: bool = True) -> List[str]:
+        """Symbols for which a condition expression holds, in data order"""
+        compiled = compile_expression(expression)
+        if compiled.type != 'bool':
+            raise ValueError(f"Not a condition: {expression}")
+        key = (compiled.tree, self.data.version)
+        if use_cache and key in self._results:
+            metrics.cache_hit('screener')
+            self._results.move_to_end(key)
+            return list(self._results[key])
+        metrics.cache_miss('screener')
+
+        passed = self.evaluate(expression)
+        symbols = [symbol for symbol, keep in zip(self.data.symbols, passed) if keep]
+        self._results[key] = symbols
+        if len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return list(symbols)
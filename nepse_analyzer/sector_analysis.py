@@ -0,0 +1,114 @@
+"""
+Sector-level analytics for NEPSE
+All calculations are group-bys over a date x symbol price matrix,
+so adding symbols does not add Python-level loops.
+Indices are chain-linked: each day's change only compares constituents
+priced on both days, which acts as an index divisor, so a newly listed
+or newly added symbol does not move the level.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from symbol_master import SymbolMaster
+
+
+class SectorAnalytics:
+    """Sector indices, relative strength and rotation tables"""
+
+    def __init__(self, closes: pd.DataFrame, master: Optional[SymbolMaster] = None,
+                 base_value: float = 1000.0):
+        """
+        closes: DataFrame indexed by date with one column per symbol
+        Symbols missing from the master are grouped under 'Others'
+        """
+        self.master = master or SymbolMaster.default()
+        # An untraded day keeps the last close instead of dropping out of the caps
+        self.closes = closes.sort_index().ffill()
+        self.base_value = base_value
+
+        sector_map = self.master.sector_map()
+        shares_map = self.master.shares_map()
+        self.sectors = pd.Series(
+            [sector_map.get(symbol, 'Others') for symbol in self.closes.columns],
+            index=self.closes.columns, name='sector'
+        )
+        self.shares = pd.Series(
+            [shares_map.get(symbol, 0) for symbol in self.closes.columns],
+            index=self.closes.columns, dtype='float64'
+        )
+        self._sector_caps = None
+        self._indices = None
+
+    def market_caps(self) -> pd.DataFrame:
+        """Date x symbol market capitalization"""
+        return self.closes.mul(self.shares, axis=1)
+
+    def sector_caps(self) -> pd.DataFrame:
+        """Date x sector market capitalization"""
+        if self._sector_caps is None:
+            self._sector_caps = self.market_caps().T.groupby(self.sectors).sum(min_count=1).T
+        return self._sector_caps
+
+    def _linked_index(self, caps: pd.DataFrame, groups) -> pd.DataFrame:
+        """Chain-linked cap-weighted index per group, base_value on the first date"""
+        previous = caps.shift(1)
+        # Only symbols priced yesterday and today count towards today's change
+        both = caps.notna() & previous.notna()
+        today = caps.where(both).T.groupby(groups).sum(min_count=1).T
+        yesterday = previous.where(both).T.groupby(groups).sum(min_count=1).T
+        # A group without comparable constituents keeps its level
+        link = (today / yesterday).fillna(1.0)
+        link.iloc[0] = 1.0
+        started = caps.T.groupby(groups).count().T.gt(0).cummax()
+        return (link.cumprod() * self.base_value).where(started)
+
+    def sector_indices(self) -> pd.DataFrame:
+        """Cap-weighted sector indices based at base_value on the first date"""
+        if self._indices is None:
+            self._indices = self._linked_index(self.market_caps(), self.sectors)
+        return self._indices
+
+    def market_index(self) -> pd.Series:
+        """Cap-weighted whole-market index on the same base"""
+        market = pd.Series('MARKET', index=self.closes.columns)
+        return self._linked_index(self.market_caps(), market)['MARKET'].rename('MARKET')
+
+    def relative_strength(self, period: int = 20) -> pd.Series:
+        """Sector return minus market return over the last period days (percent)"""
+        sector_returns = self.sector_indices().pct_change(period).iloc[-1]
+        market_return = self.market_index().pct_change(period).iloc[-1]
+        return ((sector_returns - market_return) * 100).round(2).sort_values(ascending=False)
+
+    def symbol_strength(self, period: int = 20) -> pd.Series:
+        """Relative strength of each symbol's sector (percent), indexed by symbol"""
+        return self.sectors.map(self.relative_strength(period)).astype('float64')
+
+    def rotation_table(self, periods: Iterable[int] = (5, 20, 60)) -> pd.DataFrame:
+        """Sector x lookback table of returns (percent), strongest first"""
+        indices = self.sector_indices()
+        table = pd.DataFrame({
+            f'{period}d': indices.pct_change(period).iloc[-1] * 100
+            for period in periods if period < len(indices)
+        })
+        if table.empty:
+            return table
+        return table.round(2).sort_values(table.columns[0], ascending=False)
+
+    def rotation_heatmap(self, freq=None) -> pd.DataFrame:
+        """Sector x period returns (percent) for a rotation heatmap (monthly by default)"""
+        # An offset object rather than 'M'/'ME', which differ across pandas versions
+        freq = freq or pd.offsets.MonthEnd()
+        periodic = self.sector_indices().resample(freq).last()
+        return (periodic.pct_change().iloc[1:] * 100).round(2).T
+
+    def sector_breadth(self) -> pd.DataFrame:
+        """Advancers/decliners per sector on the latest day"""
+        change = np.sign(self.closes.iloc[-1] - self.closes.iloc[-2])
+        return pd.DataFrame({
+            'advancing': (change > 0).groupby(self.sectors).sum(),
+            'declining': (change < 0).groupby(self.sectors).sum(),
+            'unchanged': (change == 0).groupby(self.sectors).sum()
+        })
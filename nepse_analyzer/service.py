@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+NEPSE Analysis Service
+A long-running process that keeps price history and analysis results
+warm in memory. cli.py, nepse_launcher.py and the web
+interface attach to it as thin clients over a small JSON RPC (local HTTP
+or a Unix socket), so cold-start work happens once per day instead of
+once per invocation.
+
+Start it with:
+    python service.py                      # http://127.0.0.1:8765
+    python service.py --unix /tmp/nepse.sock
+
+Clients find it through the NEPSE_SERVICE_URL environment variable
+(e.g. http://127.0.0.1:8765 or unix:///tmp/nepse.sock) or the default address.
+
+With --snapshot PATH the warm state is saved periodically and on shutdown,
+and a restarted service resumes from it instead of starting cold.
+"""
+
+import argparse
+import http.client
+import inspect
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import typing
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+import snapshot
+from cli import AdvancedNepseAnalyzer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+
+class WarmAnalyzer(AdvancedNepseAnalyzer):
+    """Analyzer that caches history and analysis results for the trading day"""
+
+    def __init__(self, analysis_ttl=60):
+        super().__init__()
+        self.analysis_ttl = analysis_ttl
+        self._day = date.today()
+        self._history = {}
+        self._analysis = {}
+
+    def _roll_day(self):
+        """Drop everything cached on a previous day"""
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._history.clear()
+            self._analysis.clear()
+            self.market = None
+            self.rankings = None
+
+    def generate_sample_data(self, symbol, days=30):
+        """History for a symbol, generated/fetched once per day"""
+        self._roll_day()
+        key = (symbol, days)
+        data = self._history.get(key)
+        if data is None:
+            metrics.cache_miss('service_history')
+            data = self._history[key] = super().generate_sample_data(symbol, days)
+        else:
+            metrics.cache_hit('service_history')
+        return data
+
+    def analyze_stock(self, symbol, detailed=False, data=None):
+        """Analysis result, recomputed at most once per analysis_ttl seconds"""
+        if data is not None:
+            # Analyses of given data are not the cached day's analysis
+            return super().analyze_stock(symbol, detailed, data)
+        self._roll_day()
+        key = (symbol, detailed)
+        cached = self._analysis.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.analysis_ttl:
+            metrics.cache_hit('service_analysis')
+            return cached[1]
+        metrics.cache_miss('service_analysis')
+        result = super().analyze_stock(symbol, detailed)
+        self._analysis[key] = (time.monotonic(), result)
+        return result
+
+    def analyze_many(self, symbols, detailed=False):
+        """Analyze several symbols against the warm caches"""
+        return [self.analyze_stock(symbol, detailed) for symbol in symbols]
+
+    def invalidate(self, symbol: str = None):
+        """Forget cached data for one symbol (or everything)"""
+        if symbol is None:
+            self._history.clear()
+            self._analysis.clear()
+            self.market = None
+            self.rankings = None
+            return
+        for cache in (self._history, self._analysis):
+            for key in [key for key in cache if key[0] == symbol]:
+                del cache[key]
+
+
+def _check_param(name, value, parameter):
+    """Raise TypeError when an RPC argument does not match the handler's annotation"""
+    expected = parameter.annotation
+    if expected is inspect.Parameter.empty or (value is None and parameter.default is None):
+        return
+    item = None
+    if typing.get_origin(expected) is list:
+        expected, item = list, typing.get_args(expected)[0]
+    # JSON true/false are not numbers
+    if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+        raise TypeError(f"'{name}' must be {expected.__name__}, not {type(value).__name__}")
+    if item is not None and not all(isinstance(element, item) for element in value):
+        raise TypeError(f"'{name}' must be a list of {item.__name__}")
+
+
+class AnalysisService:
+    """RPC method table over a shared WarmAnalyzer"""
+
+    def __init__(self, analyzer=None, snapshot_path=None):
+        self.analyzer = analyzer or WarmAnalyzer()
+        self.snapshot_path = snapshot_path
+        self.started = time.time()
+        self.requests = 0
+        self._lock = threading.RLock()
+        self.methods = {
+            'ping': self.ping,
+            'analyze': self.analyze,
+            'history': self.history,
+            'screen': self.screen,
+            'summary': self.summary,
+            'symbols': self.symbols,
+            'invalidate': self.invalidate,
+            'snapshot': self.save_snapshot,
+        }
+
+    def dispatch(self, method, params):
+        """Run one RPC call; returns a JSON-serializable response dict"""
+        handler = self.methods.get(method)
+        if handler is None:
+            return {'error': f"Unknown method: {method}"}
+        if params is not None and not isinstance(params, dict):
+            return {'error': f"Bad parameters for {method}: params must be an object"}
+        try:
+            signature = inspect.signature(handler)
+            call = signature.bind(**(params or {}))
+            for name, value in call.arguments.items():
+                _check_param(name, value, signature.parameters[name])
+        except TypeError as e:
+            return {'error': f"Bad parameters for {method}: {e}"}
+        with self._lock:
+            self.requests += 1
+            # Anything else a handler raises is an internal error, not the caller's
+            try:
+                return {'result': handler(*call.args, **call.kwargs)}
+            except ValueError as e:
+                return {'error': str(e)}
+
+    def ping(self):
+        return {'uptime': round(time.time() - self.started, 1), 'requests': self.requests}
+
+    def analyze(self, symbols: typing.List[str], detailed: bool = False):
+        return self.analyzer.analyze_many([symbol.upper() for symbol in symbols], detailed)
+
+    def history(self, symbol: str, days: int = 30):
+        return self.analyzer.generate_sample_data(symbol.upper(), days)
+
+    def screen(self, criteria: dict = None, expression: str = None):
+        return self.analyzer.screen_stocks(criteria or {}, expression)
+
+    def summary(self):
+        return self.analyzer.get_market_summary()
+
+    def symbols(self):
+        return self.analyzer.get_symbol_list()
+
+    def invalidate(self, symbol: str = None):
+        self.analyzer.invalidate(symbol.upper() if symbol else None)
+        return True
+
+    def save_snapshot(self, path: str = None):
+        path = path or self.snapshot_path
+        if not path:
+            raise ValueError("No snapshot path given or configured")
+        with self._lock:
+            return snapshot.save(self.analyzer, path)
+
+    def restore_snapshot(self, path=None):
+        """Resume from a snapshot; False when there is none or it is unusable"""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with self._lock:
+                restored = snapshot.restore(self.analyzer, path)
+        except snapshot.SnapshotError as e:
+            print(f"⚠️  Ignoring snapshot: {e}")
+            return False
+        print(f"♻️  Restored {restored['histories']} histories and {restored['analyses']} analyses "
+              f"from {path} ({restored['age']}s old)")
+        return True
+
+
+def create_rpc_handler(service):
+    """Request handler class bound to a service instance"""
+
+    class RPCHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            """Handle POST /rpc with {"method": ..., "params": {...}}"""
+            if self.path != '/rpc':
+                self._reply(404, {'error': 'Not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._reply(400, {'error': 'Invalid JSON'})
+                return
+            method = request.get('method')
+            try:
+                with metrics.timer('nepse_rpc_seconds', method=str(method)):
+                    response = service.dispatch(method, request.get('params'))
+            except Exception as e:
+                self._reply(500, {'error': f"Internal error in {method}: {e}"})
+                return
+            self._reply(200 if 'result' in response else 400, response)
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self):
+            # Unix socket peers have no (host, port) address
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            pass
+
+    return RPCHandler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server listening on a Unix domain socket"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        # Attributes BaseHTTPRequestHandler expects from HTTPServer
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection over a Unix domain socket"""
+
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ServiceError(Exception):
+    """Raised when the service rejects a call"""
+
+
+class ServiceClient:
+    """Minimal JSON RPC client for AnalysisService"""
+
+    def __init__(self, url=None, timeout=30.0):
+        self.url = url or os.environ.get('NEPSE_SERVICE_URL', DEFAULT_URL)
+        self.timeout = timeout
+
+    def _connection(self, timeout):
+        """Open a connection for the configured URL"""
+        if self.url.startswith('unix://'):
+            return _UnixHTTPConnection(self.url[len('unix://'):], timeout)
+        address = self.url.split('://', 1)[-1].rstrip('/')
+        host, _, port = address.partition(':')
+        return http.client.HTTPConnection(host, int(port or 80), timeout=timeout)
+
+    def call(self, method, timeout=None, **params):
+        """Call a service method and return its result"""
+        connection = self._connection(timeout or self.timeout)
+        try:
+            body = json.dumps({'method': method, 'params': params})
+            connection.request('POST', '/rpc', body, {'Content-Type': 'application/json'})
+            response = json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+        if 'error' in response:
+            raise ServiceError(response['error'])
+        return response['result']
+
+    def is_alive(self, timeout=0.25):
+        """True if a service answers at the configured address"""
+        try:
+            self.call('ping', timeout=timeout)
+            return True
+        except (OSError, ServiceError, ValueError):
+            return False
+
+
+class RemoteAnalyzer(AdvancedNepseAnalyzer):
+    """
+    Drop-in AdvancedNepseAnalyzer that forwards data-bearing calls to a
+    running service; cheap helpers and the portfolio stay local, so
+    clients do not share positions
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def generate_sample_data(self, symbol, days=30):
+        return self.client.call('history', symbol=symbol, days=days)
+
+    def analyze_stock(self, symbol, detailed=False, data=None):
+        if data is None and self.corporate_actions is not None:
+            # Local corporate actions: adjust and analyze the remote history here
+            data = self.generate_sample_data(symbol, 30)
+        if data is not None:
+            # Given data (e.g. remote history) is analyzed locally
+            return super().analyze_stock(symbol, detailed, data)
+        return self.client.call('analyze', symbols=[symbol], detailed=detailed)[0]
+
+    def analyze_many(self, symbols, detailed=False):
+        if self.corporate_actions is not None:
+            return [self.analyze_stock(symbol, detailed) for symbol in symbols]
+        return self.client.call('analyze', symbols=list(symbols), detailed=detailed)
+
+    def screen_stocks(self, criteria=None, expression=None):
+        if self.fundamentals is not None or self.corporate_actions is not None:
+            # Fundamentals or actions live in this process: screen locally over remote history
+            return super().screen_stocks(criteria, expression)
+        try:
+            return self.client.call('screen', criteria=criteria or {}, expression=expression)
+        except ServiceError as e:
+            # Keep the local contract: a bad expression is a ValueError
+            raise ValueError(str(e)) from e
+
+    def get_market_summary(self):
+        return self.client.call('summary')
+
+    def get_symbol_list(self):
+        return self.client.call('symbols')
+
+
+def connect(url=None):
+    """RemoteAnalyzer for a running service, or None when none is reachable"""
+    client = ServiceClient(url)
+    if client.is_alive():
+        return RemoteAnalyzer(client)
+    return None
+
+
+def _save_periodically(service, interval, stopped):
+    """Snapshot the service every `interval` seconds until stopped is set"""
+    while not stopped.wait(interval):
+        try:
+            service.save_snapshot()
+        except OSError as e:
+            print(f"⚠️  Snapshot failed: {e}")
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, warm=True,
+          snapshot_path=None, snapshot_interval=300, depth=False, corporate_actions=None):
+    """
+    Run the service until interrupted (with depth, order books feed the
+    recommendations; corporate_actions is a CSV whose actions adjust all history)
+    """
+    service = AnalysisService(snapshot_path=snapshot_path)
+    if corporate_actions:
+        from corporate_actions import CorporateActionStore
+        service.analyzer.corporate_actions = CorporateActionStore.from_csv(corporate_actions)
+    restored = service.restore_snapshot()
+    if depth:
+        service.analyzer.get_depth()
+    stopped = threading.Event()
+    if snapshot_path and snapshot_interval:
+        threading.Thread(target=_save_periodically, args=(service, snapshot_interval, stopped),
+                         name='nepse-snapshot', daemon=True).start()
+    if warm and not restored:
+        # Pay the cold start now rather than on the first client request
+        service.analyzer.get_market()
+        service.analyzer.analyze_many(service.analyzer.stocks)
+
+    handler = create_rpc_handler(service)
+    if unix_socket:
+        server = UnixHTTPServer(unix_socket, handler)
+        address = f"unix://{unix_socket}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{port}"
+
+    print(f"🛰️  NEPSE analysis service listening on {address}")
+    print(f"💡 Clients attach with NEPSE_SERVICE_URL={address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✅ Service stopped.")
+    finally:
+        server.server_close()
+        stopped.set()
+        if snapshot_path:
+            service.save_snapshot()
+        if unix_socket and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+
+
+def main(argv=None):
+    """Service command line entry point"""
+    parser = argparse.ArgumentParser(description="NEPSE resident analysis service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--no-warm', action='store_true', help="skip precomputing analyses at startup")
+    parser.add_argument('--snapshot', metavar='PATH', help="save warm state here and resume from it on restart")
+    parser.add_argument('--snapshot-interval', type=float, default=300,
+                        help="seconds between snapshots (0: only on shutdown)")
+    parser.add_argument('--depth', action='store_true', help="load order books so book pressure feeds recommendations")
+    parser.add_argument('--corporate-actions', metavar='CSV',
+                        help="bonus/rights/split/dividend actions; indicators use adjusted prices")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.unix, warm=not args.no_warm,
+          snapshot_path=args.snapshot, snapshot_interval=args.snapshot_interval, depth=args.depth,
+          corporate_actions=args.corporate_actions)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
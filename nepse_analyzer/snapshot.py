@@ -0,0 +1,279 @@
+"""
+Binary snapshots of analyzer state for fast warm restarts
+Saves what a running analyzer has built up during the session (price
+histories, cached analyses, last quotes and the portfolio) to one file,
+and restores it without re-fetching or recomputing anything.
+
+File layout (version 1):
+    magic b'NEPSNAP\\0' | format version (uint32) | header length (uint64)
+    header: UTF-8 JSON describing every entry
+    data:   8-byte aligned sections: float64/int64 arrays, fixed-width
+            text columns and JSON blobs
+Restoring reads only the header and memory-maps the data section; each
+history or analysis is decoded the first time it is used.
+Uses only built-in libraries.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import MutableMapping
+from datetime import date
+from typing import Callable, Dict
+
+import metrics
+
+MAGIC = b'NEPSNAP\0'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sIQ')
+
+# Analyzer attributes that map a key to a JSON-able value
+_JSON_MAPPINGS = ('current_data', 'historical_data')
+
+
+class SnapshotError(Exception):
+    """Raised for missing, corrupt or incompatible snapshot files"""
+
+
+def _aligned(size):
+    return size + (-size % 8)
+
+
+class LazyMapping(MutableMapping):
+    """Dict whose restored entries are decoded on first access"""
+
+    def __init__(self, pending, decode: Callable):
+        self._values = {}
+        self._pending = dict(pending)
+        self._decode = decode
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        raw = self._pending.pop(key)
+        value = self._values[key] = self._decode(raw)
+        if not self._pending:
+            # Everything is decoded; let the snapshot file be unmapped
+            self._decode = None
+        return value
+
+    def __setitem__(self, key, value):
+        self._pending.pop(key, None)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key in self._pending:
+            del self._pending[key]
+        else:
+            del self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values or key in self._pending
+
+    def __iter__(self):
+        return iter(list(self._values) + list(self._pending))
+
+    def __len__(self):
+        return len(self._values) + len(self._pending)
+
+    def clear(self):
+        self._values.clear()
+        self._pending.clear()
+        self._decode = None
+
+    def pending(self):
+        """Number of entries not decoded yet"""
+        return len(self._pending)
+
+
+class _Writer:
+    """Accumulates the data section and hands out references into it"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data: bytes, kind: str) -> list:
+        ref = [kind, self.size, len(data)]
+        self.chunks.append(data)
+        padding = _aligned(len(data)) - len(data)
+        if padding:
+            self.chunks.append(b'\0' * padding)
+        self.size += len(data) + padding
+        return ref
+
+    def add_json(self, value) -> list:
+        return self.add(json.dumps(value, separators=(',', ':')).encode('utf-8'), 'json')
+
+    def add_value(self, value) -> list:
+        """Packed reference for lists of floats, ints or strings; JSON otherwise"""
+        if not isinstance(value, list) or not value:
+            return ['value', value]
+        kinds = {type(item) for item in value}
+        try:
+            if kinds == {float}:
+                return self.add(array('d', value).tobytes(), 'f8')
+            if kinds == {int}:
+                return self.add(array('q', value).tobytes(), 'i8')
+        except OverflowError:
+            return self.add_json(value)
+        if kinds == {str}:
+            # Fixed-width column, e.g. 'YYYY-MM-DD' dates
+            encoded = [item.encode('utf-8') for item in value]
+            width = max(len(item) for item in encoded)
+            # A zero width (only empty strings) could not be split again on load
+            if width and b'\0' not in b''.join(encoded):
+                return self.add(b''.join(item.ljust(width, b'\0') for item in encoded), f's{width}')
+        return self.add_json(value)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file"""
+
+    def __init__(self, path):
+        try:
+            with open(path, 'rb') as f:
+                preamble = f.read(_PREAMBLE.size)
+                if len(preamble) < _PREAMBLE.size:
+                    raise SnapshotError(f"Truncated snapshot: {path}")
+                magic, version, header_size = _PREAMBLE.unpack(preamble)
+                if magic != MAGIC:
+                    raise SnapshotError(f"Not a NEPSE snapshot: {path}")
+                if version != FORMAT_VERSION:
+                    raise SnapshotError(f"Unsupported snapshot version {version} (expected {FORMAT_VERSION})")
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    raise SnapshotError(f"Truncated snapshot: {path}")
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            raise SnapshotError(f"Cannot open snapshot: {e}") from e
+        try:
+            self.header = json.loads(header)
+        except ValueError as e:
+            raise SnapshotError(f"Corrupt snapshot header: {e}") from e
+        self.data_offset = _aligned(_PREAMBLE.size + header_size)
+        self._swap = self.header.get('byteorder', 'little') != sys.byteorder
+
+    def _bytes(self, ref) -> bytes:
+        _, offset, length = ref
+        start = self.data_offset + offset
+        if start + length > len(self._map):
+            raise SnapshotError("Snapshot entry points past the end of the file")
+        return self._map[start:start + length]
+
+    def value(self, ref):
+        """Decode one reference made by _Writer.add_value"""
+        kind = ref[0]
+        if kind == 'value':
+            return ref[1]
+        if kind == 'json':
+            return self.json(ref)
+        if kind in ('f8', 'i8'):
+            values = array('d' if kind == 'f8' else 'q')
+            values.frombytes(self._bytes(ref))
+            if self._swap:
+                values.byteswap()
+            return values.tolist()
+        if kind.startswith('s'):
+            width = int(kind[1:])
+            raw = self._bytes(ref)
+            return [raw[i:i + width].rstrip(b'\0').decode('utf-8') for i in range(0, len(raw), width)]
+        raise SnapshotError(f"Unknown snapshot entry type: {kind}")
+
+    def json(self, ref):
+        """Decode a JSON blob"""
+        return json.loads(self._bytes(ref))
+
+
+@metrics.timed('nepse_snapshot_seconds', operation='save')
+def save(analyzer, path) -> Dict:
+    """Write the analyzer's state to path (atomically replaces an older snapshot)"""
+    writer = _Writer()
+    header = {
+        'version': FORMAT_VERSION,
+        'created': time.time(),
+        'byteorder': sys.byteorder,
+        'analyzer': type(analyzer).__name__,
+    }
+    for name in _JSON_MAPPINGS:
+        values = getattr(analyzer, name, None)
+        if values:
+            header[name] = [[key, writer.add_json(value)] for key, value in values.items()]
+    if getattr(analyzer, 'portfolio', None):
+        header['portfolio'] = writer.add_json(analyzer.portfolio)
+
+    # WarmAnalyzer caches: histories per (symbol, days) and analyses per (symbol, detailed)
+    if hasattr(analyzer, '_history'):
+        now = time.monotonic()
+        header['day'] = analyzer._day.isoformat()
+        header['history'] = [
+            [list(key), {field: writer.add_value(value) for field, value in data.items()}]
+            for key, data in analyzer._history.items()
+        ]
+        header['analysis'] = [
+            [list(key), now - stamp, writer.add_json(result)]
+            for key, (stamp, result) in analyzer._analysis.items()
+        ]
+
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        f.write(b'\0' * (_aligned(_PREAMBLE.size + len(encoded)) - _PREAMBLE.size - len(encoded)))
+        for chunk in writer.chunks:
+            f.write(chunk)
+    os.replace(temporary, path)
+    return {
+        'path': path,
+        'bytes': os.path.getsize(path),
+        'histories': len(header.get('history', ())),
+        'analyses': len(header.get('analysis', ())),
+    }
+
+
+@metrics.timed('nepse_snapshot_seconds', operation='restore')
+def restore(analyzer, path) -> Dict:
+    """
+    Load a snapshot into the analyzer; entries are decoded lazily
+    Raises SnapshotError when the file is missing, corrupt or of another version
+    """
+    snapshot = Snapshot(path)
+    header = snapshot.header
+    age = max(0.0, time.time() - header['created'])
+
+    for name in _JSON_MAPPINGS:
+        if name in header and hasattr(analyzer, name):
+            # JSON turns tuple keys into lists
+            pending = {tuple(key) if isinstance(key, list) else key: ref for key, ref in header[name]}
+            setattr(analyzer, name, LazyMapping(pending, snapshot.json))
+    if 'portfolio' in header and hasattr(analyzer, 'portfolio'):
+        analyzer.portfolio = snapshot.json(header['portfolio'])
+
+    if 'history' in header and hasattr(analyzer, '_history'):
+        # A snapshot from an earlier day is dropped by the analyzer's own day roll
+        analyzer._day = date.fromisoformat(header['day'])
+        analyzer._history = LazyMapping(
+            {tuple(key): fields for key, fields in header['history']},
+            lambda fields: {field: snapshot.value(ref) for field, ref in fields.items()}
+        )
+        # Analysis timestamps are monotonic; carry their age over the restart
+        now = time.monotonic()
+        analyzer._analysis = LazyMapping(
+            {tuple(key): (now - age - entry_age, ref) for key, entry_age, ref in header['analysis']},
+            lambda entry: (entry[0], snapshot.json(entry[1]))
+        )
+        analyzer.market = None
+        analyzer.rankings = None
+
+    return {
+        'path': path,
+        'created': header['created'],
+        'age': round(age, 1),
+        'histories': len(header.get('history', ())),
+        'analyses': len(header.get('analysis', ())),
+    }
@@ -0,0 +1,159 @@
+"""
+Symbol master for NEPSE listed companies
+Holds sector, shares outstanding and listing metadata per symbol.
+Uses only built-in libraries so basic_app and cli can rely on it.
+"""
+
+import csv
+
+# Sample listing data for demonstration; load the real master with
+# SymbolMaster.from_csv once an export from the exchange is available
+SAMPLE_LISTINGS = [
+    # symbol, name, sector, shares outstanding, listed date
+    ("NABIL", "Nabil Bank Limited", "Commercial Banks", 270_569_000, "1986-01-01"),
+    ("SCB", "Standard Chartered Bank Nepal Limited", "Commercial Banks", 94_320_000, "1988-01-01"),
+    ("EBL", "Everest Bank Limited", "Commercial Banks", 124_436_000, "1996-01-01"),
+    ("BOKL", "Bank of Kathmandu Limited", "Commercial Banks", 95_350_000, "1997-01-01"),
+    ("NICA", "NIC Asia Bank Limited", "Commercial Banks", 140_567_000, "1999-01-01"),
+    ("PRVU", "Prabhu Bank Limited", "Commercial Banks", 159_882_000, "2008-01-01"),
+    ("GBIME", "Global IME Bank Limited", "Commercial Banks", 343_612_000, "2008-01-01"),
+    ("CBL", "Civil Bank Limited", "Commercial Banks", 92_760_000, "2011-01-01"),
+    ("SANIMA", "Sanima Bank Limited", "Commercial Banks", 120_050_000, "2007-01-01"),
+    ("MBL", "Machhapuchchhre Bank Limited", "Commercial Banks", 108_480_000, "2002-01-01"),
+    ("KBL", "Kumari Bank Limited", "Commercial Banks", 227_130_000, "2003-01-01"),
+    ("ADBL", "Agricultural Development Bank Limited", "Commercial Banks", 134_045_000, "2006-01-01"),
+    ("NLIC", "Nepal Life Insurance Company Limited", "Life Insurance", 80_120_000, "2002-01-01"),
+    ("CHCL", "Chilime Hydropower Company Limited", "Hydro Power", 109_640_000, "2003-01-01"),
+    ("UPPER", "Upper Tamakoshi Hydropower Limited", "Hydro Power", 105_900_000, "2019-01-01"),
+    ("NTC", "Nepal Doorsanchar Company Limited", "Others", 180_000_000, "2008-01-01"),
+    ("SHL", "Soaltee Hotel Limited", "Hotels And Tourism", 105_120_000, "1994-01-01"),
+    ("NIFRA", "Nepal Infrastructure Bank Limited", "Investment", 216_000_000, "2021-01-01"),
+]
+
+# Public (free-float) share of the listed shares; promoter shares do not
+# trade, so float-weighted indices only count the public portion
+DEFAULT_FLOAT_RATIO = 0.49
+SECTOR_FLOAT_RATIOS = {
+    "Hydro Power": 0.30,
+    "Others": 0.30,
+}
+
+# Listed-share cut-off for the sensitive index; the exchange picks its
+# "A class" constituents by paid-up capital, which listed shares stand in for
+SENSITIVE_MIN_SHARES = 120_000_000
+
+
+class SymbolInfo:
+    """Listing metadata for one symbol"""
+
+    __slots__ = ('symbol', 'name', 'sector', 'shares_outstanding', 'listed_date')
+
+    def __init__(self, symbol, name, sector, shares_outstanding, listed_date=None):
+        self.symbol = symbol
+        self.name = name
+        self.sector = sector
+        self.shares_outstanding = shares_outstanding
+        self.listed_date = listed_date
+
+    def to_dict(self):
+        """Return the metadata as a plain dict"""
+        return {
+            'symbol': self.symbol,
+            'name': self.name,
+            'sector': self.sector,
+            'shares_outstanding': self.shares_outstanding,
+            'listed_date': self.listed_date
+        }
+
+
+class SymbolMaster:
+    """Lookup table of listed symbols with a sector index"""
+
+    def __init__(self, listings=()):
+        self._info = {}
+        self._by_sector = {}
+        for info in listings:
+            self.add(info)
+
+    @classmethod
+    def default(cls):
+        """Symbol master built from the bundled sample listings"""
+        return cls(SymbolInfo(*row) for row in SAMPLE_LISTINGS)
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Load a master from CSV
+        Expected columns: symbol, name, sector, shares_outstanding, listed_date
+        """
+        master = cls()
+        with open(path, newline='', encoding='utf-8') as handle:
+            for row in csv.DictReader(handle):
+                master.add(SymbolInfo(
+                    row['symbol'].strip().upper(),
+                    row.get('name', '').strip(),
+                    row.get('sector', '').strip() or 'Others',
+                    int(float(row.get('shares_outstanding') or 0)),
+                    row.get('listed_date') or None
+                ))
+        return master
+
+    def add(self, info):
+        """Add or replace a symbol"""
+        previous = self._info.get(info.symbol)
+        if previous is not None:
+            self._by_sector[previous.sector].remove(info.symbol)
+        self._info[info.symbol] = info
+        self._by_sector.setdefault(info.sector, []).append(info.symbol)
+
+    def get(self, symbol):
+        """SymbolInfo for a symbol, or None"""
+        return self._info.get(symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self._info
+
+    def __len__(self):
+        return len(self._info)
+
+    def symbols(self, sector=None):
+        """All symbols, or those in one sector, in listing order"""
+        if sector is None:
+            return list(self._info)
+        wanted = sector.strip().casefold()
+        for name, symbols in self._by_sector.items():
+            if name.casefold() == wanted:
+                return list(symbols)
+        return []
+
+    def sectors(self):
+        """Sector names that have at least one symbol"""
+        return [sector for sector, symbols in self._by_sector.items() if symbols]
+
+    def sector_of(self, symbol):
+        """Sector of a symbol, or None when unknown"""
+        info = self._info.get(symbol)
+        return info.sector if info else None
+
+    def sector_map(self):
+        """{symbol: sector} mapping, handy for pandas group-by"""
+        return {symbol: info.sector for symbol, info in self._info.items()}
+
+    def shares_map(self):
+        """{symbol: shares outstanding} mapping, usable as index weights"""
+        return {symbol: info.shares_outstanding for symbol, info in self._info.items()}
+
+    def float_map(self):
+        """{symbol: public float shares} from the sector float ratios, usable as float index weights"""
+        return {
+            symbol: int(info.shares_outstanding * SECTOR_FLOAT_RATIOS.get(info.sector, DEFAULT_FLOAT_RATIO))
+            for symbol, info in self._info.items()
+        }
+
+    def sensitive_map(self):
+        """{symbol: shares outstanding} of the large-cap symbols making up the sensitive index"""
+        return {
+            symbol: info.shares_outstanding
+            for symbol, info in self._info.items()
+            if info.shares_outstanding >= SENSITIVE_MIN_SHARES
+        }
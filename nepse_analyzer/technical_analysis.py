@@ -3,40 +3,122 @@ Technical Analysis module for NEPSE stocks
 Implements various technical indicators and analysis tools
 """
 
+import os
+
 import pandas as pd
 import numpy as np
-import ta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import indicators
+from metrics import timed
+
+# 'numpy' (native implementations in indicators.py) or 'ta' (the ta library)
+BACKENDS = ('numpy', 'ta')
+DEFAULT_BACKEND = os.environ.get('NEPSE_INDICATOR_BACKEND', 'numpy')
+
+def classify_trend(current_price: float, short_ma: float, long_ma: float) -> str:
+    """Trend label from the price and a short/long moving average"""
+    if current_price > short_ma > long_ma:
+        return "Strong Uptrend"
+    elif current_price > short_ma and short_ma > long_ma:
+        return "Uptrend"
+    elif current_price < short_ma < long_ma:
+        return "Strong Downtrend"
+    elif current_price < short_ma and short_ma < long_ma:
+        return "Downtrend"
+    else:
+        return "Sideways"
+
+def trading_signals(rsi: float, macd: float, macd_signal: float,
+                    current_price: float, sma_20: float) -> Dict[str, str]:
+    """RSI, MACD and moving-average signals from the latest indicator values"""
+    signals = {}
+    
+    # RSI signals
+    if rsi > 70:
+        signals['rsi'] = "Overbought - Consider Sell"
+    elif rsi < 30:
+        signals['rsi'] = "Oversold - Consider Buy"
+    else:
+        signals['rsi'] = "Neutral"
+    
+    # MACD signals
+    if macd > macd_signal:
+        signals['macd'] = "Bullish"
+    else:
+        signals['macd'] = "Bearish"
+    
+    # Moving Average signals
+    if current_price > sma_20:
+        signals['moving_average'] = "Above SMA-20 - Bullish"
+    else:
+        signals['moving_average'] = "Below SMA-20 - Bearish"
+    
+    return signals
 
 class TechnicalAnalysis:
     """Class for calculating technical indicators"""
     
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, copy: bool = True, backend: Optional[str] = None):
         """
         Initialize with OHLCV data
         Expected columns: Open, High, Low, Close, Volume
+        Pass copy=False for frames built over archive buffers
+        (see bulk_io.ArchiveReader.read_ohlcv) to avoid duplicating them
+        backend: 'numpy' (default) or 'ta' for RSI, MACD, Bollinger Bands,
+        Stochastic and ATR
         """
-        self.data = data.copy()
+        self.backend = backend or DEFAULT_BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown indicator backend: {self.backend}")
+        self.data = data.copy() if copy else data
         self.close = data['Close']
         self.high = data['High']
         self.low = data['Low']
         self.open = data['Open']
         self.volume = data['Volume']
     
+    def _series(self, values: np.ndarray) -> pd.Series:
+        """Wrap a native indicator array on the data's index"""
+        return pd.Series(values, index=self.close.index)
+    
+    @timed('nepse_indicator_seconds')
+    def calculate_all(self, names: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+        """Several indicators in one fused NumPy pass (see indicators.compute_all)"""
+        values = indicators.compute_all(self.high.to_numpy(), self.low.to_numpy(), self.close.to_numpy(),
+                                        self.volume.to_numpy(), names)
+        # One 2-D block is much cheaper to wrap than a column per indicator
+        return pd.DataFrame(np.column_stack(list(values.values())), columns=list(values), index=self.close.index)
+    
+    @timed('nepse_indicator_seconds')
     def calculate_sma(self, period: int = 20) -> pd.Series:
         """Calculate Simple Moving Average"""
         return self.close.rolling(window=period).mean()
     
+    @timed('nepse_indicator_seconds')
     def calculate_ema(self, period: int = 20) -> pd.Series:
         """Calculate Exponential Moving Average"""
+        if self.backend == 'numpy':
+            return self._series(indicators.ema(self.close.to_numpy(), period, adjust=True))
         return self.close.ewm(span=period).mean()
     
+    @timed('nepse_indicator_seconds')
     def calculate_rsi(self, period: int = 14) -> pd.Series:
         """Calculate Relative Strength Index"""
+        if self.backend == 'numpy':
+            return self._series(indicators.rsi(self.close.to_numpy(), period))
+        import ta
+        
         return ta.momentum.RSIIndicator(self.close, window=period).rsi()
     
+    @timed('nepse_indicator_seconds')
     def calculate_macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, pd.Series]:
         """Calculate MACD (Moving Average Convergence Divergence)"""
+        if self.backend == 'numpy':
+            lines = indicators.macd(self.close.to_numpy(), fast, slow, signal)
+            return {key: self._series(values) for key, values in lines.items()}
+        import ta
+        
         macd_indicator = ta.trend.MACD(self.close, window_slow=slow, window_fast=fast, window_sign=signal)
         return {
             'macd': macd_indicator.macd(),
@@ -44,8 +126,14 @@ class TechnicalAnalysis:
             'histogram': macd_indicator.macd_diff()
         }
     
+    @timed('nepse_indicator_seconds')
     def calculate_bollinger_bands(self, period: int = 20, std_dev: int = 2) -> Dict[str, pd.Series]:
         """Calculate Bollinger Bands"""
+        if self.backend == 'numpy':
+            bands = indicators.bollinger_bands(self.close.to_numpy(), period, std_dev)
+            return {key: self._series(values) for key, values in bands.items()}
+        import ta
+        
         bb_indicator = ta.volatility.BollingerBands(self.close, window=period, window_dev=std_dev)
         return {
             'upper': bb_indicator.bollinger_hband(),
@@ -53,8 +141,15 @@ class TechnicalAnalysis:
             'lower': bb_indicator.bollinger_lband()
         }
     
+    @timed('nepse_indicator_seconds')
     def calculate_stochastic(self, k_period: int = 14, d_period: int = 3) -> Dict[str, pd.Series]:
         """Calculate Stochastic Oscillator"""
+        if self.backend == 'numpy':
+            lines = indicators.stochastic(self.high.to_numpy(), self.low.to_numpy(), self.close.to_numpy(),
+                                          k_period, d_period)
+            return {key: self._series(values) for key, values in lines.items()}
+        import ta
+        
         stoch_indicator = ta.momentum.StochasticOscillator(
             self.high, self.low, self.close, 
             window=k_period, smooth_window=d_period
@@ -64,10 +159,17 @@ class TechnicalAnalysis:
             'd': stoch_indicator.stoch_signal()
         }
     
+    @timed('nepse_indicator_seconds')
     def calculate_atr(self, period: int = 14) -> pd.Series:
         """Calculate Average True Range"""
+        if self.backend == 'numpy':
+            return self._series(indicators.atr(self.high.to_numpy(), self.low.to_numpy(), self.close.to_numpy(),
+                                               period))
+        import ta
+        
         return ta.volatility.AverageTrueRange(self.high, self.low, self.close, window=period).average_true_range()
     
+    @timed('nepse_indicator_seconds')
     def calculate_volume_indicators(self) -> Dict[str, pd.Series]:
         """Calculate volume-based indicators"""
         return {
@@ -75,6 +177,7 @@ class TechnicalAnalysis:
             'volume_ratio': self.volume / self.volume.rolling(window=20).mean()
         }
     
+    @timed('nepse_indicator_seconds')
     def identify_support_resistance(self, window: int = 20) -> Dict[str, List[float]]:
         """Identify potential support and resistance levels"""
         # Find local minima (support) and maxima (resistance)
@@ -95,53 +198,26 @@ class TechnicalAnalysis:
             'resistance_levels': list(set(resistances))
         }
     
+    @timed('nepse_indicator_seconds')
     def calculate_trend_direction(self, short_period: int = 10, long_period: int = 30) -> str:
         """Determine overall trend direction"""
         short_ma = self.calculate_sma(short_period).iloc[-1]
         long_ma = self.calculate_sma(long_period).iloc[-1]
-        current_price = self.close.iloc[-1]
-        
-        if current_price > short_ma > long_ma:
-            return "Strong Uptrend"
-        elif current_price > short_ma and short_ma > long_ma:
-            return "Uptrend"
-        elif current_price < short_ma < long_ma:
-            return "Strong Downtrend"
-        elif current_price < short_ma and short_ma < long_ma:
-            return "Downtrend"
-        else:
-            return "Sideways"
+        return classify_trend(self.close.iloc[-1], short_ma, long_ma)
     
+    @timed('nepse_indicator_seconds')
     def generate_trading_signals(self) -> Dict[str, str]:
         """Generate basic trading signals based on multiple indicators"""
-        signals = {}
-        
-        # RSI signals
-        rsi = self.calculate_rsi().iloc[-1]
-        if rsi > 70:
-            signals['rsi'] = "Overbought - Consider Sell"
-        elif rsi < 30:
-            signals['rsi'] = "Oversold - Consider Buy"
-        else:
-            signals['rsi'] = "Neutral"
-        
-        # MACD signals
         macd_data = self.calculate_macd()
-        if macd_data['macd'].iloc[-1] > macd_data['signal'].iloc[-1]:
-            signals['macd'] = "Bullish"
-        else:
-            signals['macd'] = "Bearish"
-        
-        # Moving Average signals
-        sma_20 = self.calculate_sma(20).iloc[-1]
-        current_price = self.close.iloc[-1]
-        if current_price > sma_20:
-            signals['moving_average'] = "Above SMA-20 - Bullish"
-        else:
-            signals['moving_average'] = "Below SMA-20 - Bearish"
-        
-        return signals
+        return trading_signals(
+            self.calculate_rsi().iloc[-1],
+            macd_data['macd'].iloc[-1],
+            macd_data['signal'].iloc[-1],
+            self.close.iloc[-1],
+            self.calculate_sma(20).iloc[-1]
+        )
     
+    @timed('nepse_indicator_seconds')
     def calculate_volatility(self, period: int = 20) -> float:
         """Calculate price volatility"""
         returns = self.close.pct_change().dropna()
@@ -157,6 +233,7 @@ class PatternRecognition:
         self.close = data['Close']
         self.open = data['Open']
     
+    @timed('nepse_indicator_seconds')
     def identify_doji(self, threshold: float = 0.1) -> List[int]:
         """Identify Doji candlestick patterns"""
         doji_indices = []
@@ -170,6 +247,7 @@ class PatternRecognition:
         
         return doji_indices
     
+    @timed('nepse_indicator_seconds')
     def identify_hammer(self, threshold: float = 0.3) -> List[int]:
         """Identify Hammer candlestick patterns"""
         hammer_indices = []
@@ -191,6 +269,7 @@ class PatternRecognition:
         
         return hammer_indices
     
+    @timed('nepse_indicator_seconds')
     def identify_engulfing_patterns(self) -> Dict[str, List[int]]:
         """Identify bullish and bearish engulfing patterns"""
         bullish_engulfing = []
@@ -219,4 +298,145 @@ class PatternRecognition:
         return {
             'bullish_engulfing': bullish_engulfing,
             'bearish_engulfing': bearish_engulfing
-        }
\ No newline at end of file
+        }
+
+
+TIMEFRAMES = ('daily', 'weekly', 'monthly')
+
+def period_keys(index: pd.DatetimeIndex, timeframe: str, calendar: str = 'AD') -> np.ndarray:
+    """Integer period id of every bar for weekly or monthly resampling"""
+    if timeframe == 'weekly':
+        # NEPSE weeks start on Sunday (Saturday is the holiday) in both calendars
+        offsets = pd.to_timedelta((index.dayofweek.to_numpy() + 1) % 7, unit='D')
+        return (index.normalize() - offsets).asi8
+    if timeframe == 'monthly':
+        if calendar == 'BS':
+            from date_utils import DateConverter
+            
+            # Convert each distinct day once
+            codes, days = pd.factorize(index.normalize())
+            months = np.array([
+                year * 12 + month
+                for year, month, _ in (DateConverter.ad_to_bs(d.year, d.month, d.day) for d in days)
+            ])
+            return months[codes]
+        return (index.year * 12 + index.month).to_numpy()
+    raise ValueError(f"Unknown timeframe: {timeframe}")
+
+def resample_ohlcv(data: pd.DataFrame, timeframe: str, calendar: str = 'AD') -> pd.DataFrame:
+    """
+    Aggregate date-sorted OHLCV bars into weekly or monthly bars
+    Each bar is stamped with the last trading date of its period
+    """
+    if timeframe == 'daily':
+        return data
+    
+    keys = period_keys(data.index, timeframe, calendar)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    return pd.DataFrame({
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(data['Volume'].to_numpy(), starts)
+    }, index=data.index[ends])
+
+class MultiTimeframeAnalysis:
+    """Daily, weekly and monthly indicators from one base series, aligned on the base index"""
+    
+    def __init__(self, data: pd.DataFrame, timeframes: Tuple[str, ...] = TIMEFRAMES, calendar: str = 'AD'):
+        """
+        data: daily OHLCV frame with a DatetimeIndex
+        calendar: 'AD' or 'BS' month boundaries (weeks are the same in both)
+        """
+        if calendar not in ('AD', 'BS'):
+            raise ValueError(f"Unknown calendar: {calendar}")
+        base = data if data.index.is_monotonic_increasing else data.sort_index()
+        self.calendar = calendar
+        self.base_index = base.index
+        # Resample once from the base series; every timeframe reuses these bars
+        self.frames = {timeframe: resample_ohlcv(base, timeframe, calendar) for timeframe in timeframes}
+        self.analyses = {
+            timeframe: TechnicalAnalysis(frame, copy=False) for timeframe, frame in self.frames.items()
+        }
+        self._indicators = {}
+    
+    def indicators(self, timeframe: str) -> pd.DataFrame:
+        """Indicator set of one timeframe, computed once and reused"""
+        indicators = self._indicators.get(timeframe)
+        if indicators is None:
+            analysis = self.analyses[timeframe]
+            macd = analysis.calculate_macd()
+            bands = analysis.calculate_bollinger_bands()
+            volume = analysis.calculate_volume_indicators()
+            indicators = self._indicators[timeframe] = pd.DataFrame({
+                'close': analysis.close,
+                'sma_10': analysis.calculate_sma(10),
+                'sma_20': analysis.calculate_sma(20),
+                'sma_30': analysis.calculate_sma(30),
+                'ema_20': analysis.calculate_ema(20),
+                'rsi': analysis.calculate_rsi(),
+                'macd': macd['macd'],
+                'macd_signal': macd['signal'],
+                'macd_histogram': macd['histogram'],
+                'bb_upper': bands['upper'],
+                'bb_lower': bands['lower'],
+                'volume_ratio': volume['volume_ratio']
+            })
+        return indicators
+    
+    def summary(self, timeframe: str) -> Dict:
+        """Latest indicator values, trend and signals of one timeframe"""
+        indicators = self.indicators(timeframe)
+        latest = indicators.iloc[-1]
+        result = {
+            'bars': len(indicators),
+            'as_of': indicators.index[-1].strftime('%Y-%m-%d'),
+            'values': {key: (None if pd.isna(value) else round(float(value), 4)) for key, value in latest.items()}
+        }
+        # Trend and signals come from the values above rather than a second pass
+        if latest[['close', 'sma_10', 'sma_30']].notna().all():
+            result['trend'] = classify_trend(latest['close'], latest['sma_10'], latest['sma_30'])
+        else:
+            result['trend'] = "Insufficient data"
+        if latest[['rsi', 'macd', 'macd_signal', 'sma_20']].notna().all():
+            result['signals'] = trading_signals(
+                latest['rsi'], latest['macd'], latest['macd_signal'], latest['close'], latest['sma_20']
+            )
+        else:
+            result['signals'] = {}
+        return result
+    
+    def aligned(self) -> pd.DataFrame:
+        """
+        All timeframes on the base index, columns (timeframe, indicator)
+        Higher timeframes are forward filled, so each row only sees
+        bars that had closed (or the running bar) by that date
+        """
+        return pd.concat({
+            timeframe: self.indicators(timeframe).reindex(self.base_index, method='ffill')
+            for timeframe in self.frames
+        }, axis=1)
+    
+    def analyze(self) -> Dict:
+        """One result covering every timeframe plus a top-down confluence label"""
+        timeframes = {timeframe: self.summary(timeframe) for timeframe in self.frames}
+        trends = [summary['trend'] for summary in timeframes.values()]
+        if all(trend.endswith("Uptrend") for trend in trends):
+            confluence = "Aligned Uptrend"
+        elif all(trend.endswith("Downtrend") for trend in trends):
+            confluence = "Aligned Downtrend"
+        else:
+            confluence = "Mixed"
+        return {'calendar': self.calendar, 'timeframes': timeframes, 'confluence': confluence}
+
+def multi_timeframe_screen(data_by_symbol: Dict[str, pd.DataFrame], calendar: str = 'AD') -> pd.DataFrame:
+    """Trend per timeframe and confluence for many symbols (one table row each)"""
+    rows = {}
+    for symbol, data in data_by_symbol.items():
+        result = MultiTimeframeAnalysis(data, calendar=calendar).analyze()
+        row = {timeframe: summary['trend'] for timeframe, summary in result['timeframes'].items()}
+        row['confluence'] = result['confluence']
+        rows[symbol] = row
+    return pd.DataFrame.from_dict(rows, orient='index')
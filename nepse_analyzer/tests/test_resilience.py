@@ -0,0 +1,262 @@
+"""
+Fault-injection tests for resilience.py against a local stand-in server
+The stub serves JSON over HTTP and can be told to fail, to be slow, or to
+flap between failing and working, so the breaker, hedging, stale serving
+and coalescing are exercised over real sockets and threads.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resilience import CircuitBreaker, CircuitOpenError, EndpointPolicy, ResilientFetcher
+
+
+class StubUpstream:
+    """Local HTTP server whose behaviour is set per test"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.value = 1
+        self.fail = False
+        self.flap = False               # alternate failing and working responses
+        self.delays = []                # per-request delays, consumed in order
+        self.delay = 0.0                # delay once `delays` is used up
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.hits += 1
+                    hit = stub.hits
+                    delay = stub.delays.pop(0) if stub.delays else stub.delay
+                    failing = stub.fail or (stub.flap and hit % 2 == 0)
+                    value = stub.value
+                if delay:
+                    time.sleep(delay)
+                if failing:
+                    self.send_error(503, "Injected failure")
+                    return
+                body = json.dumps({'value': value, 'hit': hit}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/market"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def fetch(self):
+        """The loader under test: one upstream GET"""
+        with urllib.request.urlopen(self.url, timeout=5) as response:
+            return json.loads(response.read())
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeClock:
+    """Monotonic clock the tests move forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ResilienceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.upstream = StubUpstream()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.upstream.close()
+
+    def fetcher(self, **policy):
+        return ResilientFetcher({'market': EndpointPolicy(**policy)}, clock=self.clock)
+
+    def call(self, fetcher, key=None):
+        return fetcher.call('market', key, self.upstream.fetch)
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Condition not met in time")
+            time.sleep(0.01)
+
+
+class CircuitBreakerTests(ResilienceTestCase):
+
+    def test_trips_after_threshold_and_fails_fast(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0, failure_threshold=3, reset_timeout=30)
+        self.upstream.fail = True
+        for _ in range(3):
+            with self.assertRaises(urllib.error.HTTPError):
+                self.call(fetcher)
+        self.assertEqual(fetcher.breaker_states()['market'], CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            self.call(fetcher)
+        self.assertEqual(self.upstream.hits, 3)
+
+    def test_half_open_probe_recovers(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0, failure_threshold=2, reset_timeout=30)
+        self.upstream.fail = True
+        for _ in range(2):
+            with self.assertRaises(urllib.error.HTTPError):
+                self.call(fetcher)
+
+        self.upstream.fail = False
+        self.clock.advance(10)
+        with self.assertRaises(CircuitOpenError):
+            self.call(fetcher)
+
+        self.clock.advance(25)
+        self.assertEqual(self.call(fetcher)['value'], 1)
+        self.assertEqual(self.upstream.hits, 3)
+        self.assertEqual(fetcher.breaker_states()['market'], CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0, failure_threshold=2, reset_timeout=30)
+        self.upstream.fail = True
+        for _ in range(2):
+            with self.assertRaises(urllib.error.HTTPError):
+                self.call(fetcher)
+
+        self.clock.advance(31)
+        with self.assertRaises(urllib.error.HTTPError):
+            self.call(fetcher)
+        self.assertEqual(fetcher.breaker_states()['market'], CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.call(fetcher)
+        self.assertEqual(self.upstream.hits, 3)
+
+    def test_flapping_upstream_serves_last_good_value(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0, failure_threshold=3, reset_timeout=30)
+        self.upstream.flap = True
+        values = [self.call(fetcher)['hit'] for _ in range(6)]
+        # Failing (even) hits fall back to the previous good response
+        self.assertEqual(values, [1, 1, 3, 3, 5, 5])
+        # Each success resets the failure count, so flapping never opens the circuit
+        self.assertEqual(fetcher.breaker_states()['market'], CircuitBreaker.CLOSED)
+
+
+class HedgingTests(ResilienceTestCase):
+
+    def test_slow_primary_is_hedged(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0, hedge_after=0.1)
+        self.upstream.delays = [2.0]
+        start = time.monotonic()
+        result = self.call(fetcher)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(result['hit'], 2)
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(self.upstream.hits, 2)
+
+    def test_fast_primary_is_not_hedged(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0, hedge_after=0.5)
+        self.assertEqual(self.call(fetcher)['hit'], 1)
+        time.sleep(0.1)
+        self.assertEqual(self.upstream.hits, 1)
+
+
+class StaleWhileRevalidateTests(ResilienceTestCase):
+
+    def test_fresh_value_is_served_from_cache(self):
+        fetcher = self.fetcher(fresh_ttl=10, stale_ttl=60)
+        self.call(fetcher)
+        self.clock.advance(5)
+        self.assertEqual(self.call(fetcher)['hit'], 1)
+        self.assertEqual(self.upstream.hits, 1)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        fetcher = self.fetcher(fresh_ttl=10, stale_ttl=60)
+        self.assertEqual(self.call(fetcher)['value'], 1)
+
+        self.upstream.value = 2
+        self.upstream.delay = 0.2
+        self.clock.advance(15)
+        start = time.monotonic()
+        self.assertEqual(self.call(fetcher)['value'], 1)
+        self.assertLess(time.monotonic() - start, 0.15)
+
+        # The background refresh lands in the cache
+        self.wait_for(lambda: self.upstream.hits == 2)
+        self.wait_for(lambda: fetcher._cache[('market', None)][0]['value'] == 2)
+        self.assertEqual(self.call(fetcher)['value'], 2)
+        self.assertEqual(self.upstream.hits, 2)
+
+    def test_expired_value_is_served_when_upstream_fails(self):
+        fetcher = self.fetcher(fresh_ttl=10, stale_ttl=60, failure_threshold=10)
+        self.call(fetcher)
+        self.upstream.fail = True
+        self.clock.advance(100)
+        self.assertEqual(self.call(fetcher)['hit'], 1)
+        self.assertEqual(self.upstream.hits, 2)
+
+    def test_cold_failure_propagates(self):
+        fetcher = self.fetcher(fresh_ttl=10, stale_ttl=60)
+        self.upstream.fail = True
+        with self.assertRaises(urllib.error.HTTPError):
+            self.call(fetcher)
+
+
+class SingleFlightTests(ResilienceTestCase):
+
+    def test_concurrent_callers_share_one_upstream_call(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0)
+        self.upstream.delay = 0.3
+        callers = 8
+        barrier = threading.Barrier(callers)
+        results = [None] * callers
+
+        def worker(index):
+            barrier.wait()
+            results[index] = self.call(fetcher)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.upstream.hits, 1)
+        self.assertTrue(all(result == {'value': 1, 'hit': 1} for result in results))
+
+    def test_different_keys_are_not_coalesced(self):
+        fetcher = self.fetcher(fresh_ttl=0, stale_ttl=0)
+        self.upstream.delay = 0.2
+        threads = [threading.Thread(target=self.call, args=(fetcher, key)) for key in ('NABIL', 'SCB')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.upstream.hits, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,9 +6,28 @@ Quick launcher for all NEPSE analysis tools
 
 import os
 import sys
-import subprocess
 from datetime import datetime
 
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_package():
+    """
+    Import the nepse_analyzer package (which makes its modules importable
+    in-process). Tools then import only the modules they need, once.
+    """
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    import nepse_analyzer
+    return nepse_analyzer
+
+def run_profiled(name, func):
+    """Run a launcher tool, profiling it when NEPSE_PROFILE is set"""
+    load_package()
+    import profiling
+    
+    with profiling.maybe_profile(f"launcher-{name}"):
+        return func()
+
 def print_banner():
     """Print application banner"""
     print("=" * 70)
@@ -40,8 +59,11 @@ def run_web_interface():
     print("⏹️  Press Ctrl+C to stop the server")
     print()
     
+    load_package()
+    import basic_app
+    
     try:
-        subprocess.run([sys.executable, "basic_app.py"], cwd="nepse_analyzer")
+        basic_app.main()
     except KeyboardInterrupt:
         print("\\n✅ Web server stopped.")
 
@@ -51,8 +73,11 @@ def run_cli():
     print("📝 Type 'help' for available commands")
     print()
     
+    load_package()
+    import cli
+    
     try:
-        subprocess.run([sys.executable, "cli.py"], cwd="nepse_analyzer")
+        cli.interactive()
     except KeyboardInterrupt:
         print("\\n✅ CLI tool stopped.")
 
@@ -61,11 +86,11 @@ def quick_analysis():
     print("📊 NEPSE Quick Analysis")
     print("=" * 30)
     
-    # Import analyzer
-    sys.path.append('nepse_analyzer')
-    from cli import AdvancedNepseAnalyzer
+    load_package()
+    from cli import create_analyzer
     
-    analyzer = AdvancedNepseAnalyzer()
+    # Uses a running analysis service (NEPSE_SERVICE_URL) when available
+    analyzer = create_analyzer()
     
     # Show market summary
     summary = analyzer.get_market_summary()
@@ -85,7 +110,7 @@ def portfolio_demo():
     print("📈 Portfolio Management Demo")
     print("=" * 35)
     
-    sys.path.append('nepse_analyzer')
+    load_package()
     from cli import AdvancedNepseAnalyzer
     
     analyzer = AdvancedNepseAnalyzer()
@@ -112,10 +137,11 @@ def stock_screener():
     print("🔍 NEPSE Stock Screener")
     print("=" * 25)
     
-    sys.path.append('nepse_analyzer')
-    from cli import AdvancedNepseAnalyzer
+    load_package()
+    from cli import create_analyzer
     
-    analyzer = AdvancedNepseAnalyzer()
+    # Uses a running analysis service (NEPSE_SERVICE_URL) when available
+    analyzer = create_analyzer()
     
     print("📊 Screening stocks with RSI < 50 (potentially oversold)...")
     results = analyzer.screen_stocks({'max_rsi': 50})
@@ -168,9 +194,12 @@ def install_dependencies():
     print("📦 Installing required packages...")
     print("⚠️  This may take a few minutes...")
     
+    import subprocess
+    
     try:
         subprocess.run([
-            sys.executable, "-m", "pip", "install", "-r", "nepse_analyzer/requirements.txt"
+            sys.executable, "-m", "pip", "install", "-r",
+            os.path.join(ROOT_DIR, "nepse_analyzer", "requirements.txt")
         ], check=True)
         print("✅ Installation completed successfully!")
         print("🎉 You can now use the full Streamlit version:")
@@ -195,11 +224,11 @@ def main():
             elif choice == "2":
                 run_cli()
             elif choice == "3":
-                quick_analysis()
+                run_profiled("quick_analysis", quick_analysis)
             elif choice == "4":
-                portfolio_demo()
+                run_profiled("portfolio_demo", portfolio_demo)
             elif choice == "5":
-                stock_screener()
+                run_profiled("stock_screener", stock_screener)
             elif choice == "6":
                 show_documentation()
             elif choice == "7":
@@ -222,10 +251,14 @@ def main():
             input("\\n⏳ Press Enter to continue...")
 
 if __name__ == "__main__":
-    # Check if we're in the right directory
-    if not os.path.exists("nepse_analyzer"):
+    # Check that the package sits next to this script
+    if not os.path.exists(os.path.join(ROOT_DIR, "nepse_analyzer")):
         print("❌ Error: nepse_analyzer directory not found!")
-        print("💡 Please run this script from the repository root directory.")
+        print("💡 Please keep this script in the repository root directory.")
         sys.exit(1)
     
+    if '--profile' in sys.argv[1:]:
+        os.environ['NEPSE_PROFILE'] = '1'
+        print("⏱️  Profiling enabled (output in ./profiles)")
+    
     main()
\ No newline at end of file